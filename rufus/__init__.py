@@ -1,8 +1,24 @@
-from .client import RufusClient
-from .core import Crawler
-from .llms import generate_search_query
-from .search_engines import get_search_results
-from .content_rankers import rank_content
+from importlib import import_module
+
+# Public names and the modules defining them, imported on first access so that
+# "import rufus" stays cheap and heavy dependencies load only when used
+_LAZY_ATTRIBUTES = {
+    "RufusClient": "rufus.client",
+    "Crawler": "rufus.core.crawler",
+    "generate_search_query": "rufus.llms.method",
+    "get_search_results": "rufus.search_engines.method",
+    "rank_content": "rufus.content_rankers.method",
+}
+
+def __getattr__(name):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_LAZY_ATTRIBUTES[name]), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
 
 __all__ = [
     "RufusClient",
@@ -1,40 +1,210 @@
 import asyncio
+import json
+import os
 from rufus.core import Crawler
+from rufus.content_rankers.method import get_reranker
+from rufus.utils import read_jsonl
 class RufusClient:
-    def __init__(self, max_depth=2, delay=1.5, num_search_results=10, do_rank=True, structured_output=True, log_file="rufus.log", log_level="INFO", headers=None, **kwargs):
+    def __init__(self, max_depth=2, delay=1.5, num_search_results=10, do_rank=True, structured_output=True, log_file="rufus.log", log_level="INFO", headers=None, max_concurrency=10, max_pages=None, resume=False, **kwargs):
         """
         Initialize the RufusClient.
 
         :param max_depth: int, maximum depth to crawl
-        :param delay: float, delay between requests in seconds
+        :param delay: float, base delay in seconds for exponential backoff between retries
         :param num_search_results: int, number of search results to use
         :param do_rank: boolean, whether to do ranking or not
         :param structured_output: boolean, whether to return structured output or not
         :param log_file: string, path to log file
         :param log_level: string, log level
         :param headers: dict, headers to add to requests
+        :param max_concurrency: int, number of pages fetched concurrently across the whole crawl
+        :param max_pages: int, maximum number of pages fetched per crawl (None for unlimited)
+        :param resume: boolean, whether crawls resume from the checkpoint of an interrupted crawl of the same start URL and prompt
+        :param kwargs: additional crawler options, e.g. requests_per_second, burst and max_per_host for per-host rate limiting,
+            connection_limit, connection_limit_per_host, keepalive_timeout and dns_cache_ttl for the shared connection pool,
+            parse_executor ("process", "thread" or None) and parse_workers to parse pages off the event loop,
+            http_cache (path to a SQLite file), http_cache_max_bytes and http_cache_ttl for the on-disk response cache,
+            crawl_state (path to a SQLite file) and recrawl_interval for incremental recrawls that only reprocess changed pages,
+            checkpoint (path to a SQLite file) and checkpoint_interval to save the progress of crawls so that they can be resumed,
+            focused and focus_threshold to follow links best-first by their predicted relevance to the prompt,
+            link_scope (None, "host" or "subdomains"), include_patterns, exclude_patterns, skip_binary and content_types to filter links,
+            max_bytes to cap the size of downloaded bodies,
+            respect_robots, robots_ttl, use_sitemaps and max_sitemap_urls for robots.txt compliance and sitemap seeding,
+            seen_backend ("memory", "fingerprint" or "bloom"), canonicalize_urls and drop_query_params for URL deduplication,
+            dedup ("drop", "cluster" or None), dedup_threshold and dedup_shingle_size for near-duplicate page detection,
+            chunk_tokens, chunk_overlap, passage_aggregation ("max" or "mean") and top_passages to rank pages by their passages,
+            vector_index (a directory) and vector_index_type ("exact", "ivf" or "hnsw") to keep crawled documents in a persistent vector index,
+            max_total_requests to cap concurrent requests across all crawls (e.g. of scrape_many)
         """
         self.num_search_results = num_search_results
         self.do_rank = do_rank
         self.structured_output = structured_output
+        self.resume = resume
         self.crawler = Crawler(
             max_depth=max_depth,
             delay=delay,
             log_file=log_file,
             log_level=log_level,
             headers=headers,
-            num_search_results=num_search_results
+            num_search_results=num_search_results,
+            max_concurrency=max_concurrency,
+            max_pages=max_pages,
+            **kwargs
         )
+        self._loop = None # Event loop kept alive between scrape calls so pooled connections can be reused
     
     async def start(self, start_url, prompt, **kwargs):
         """Start crawling and ranking asynchronously."""
+        kwargs.setdefault("resume", self.resume)
         results = await self.crawler.start_crawl(start_url, prompt, **kwargs)
         
         return results
     
+    async def astream(self, start_url, prompt, **kwargs):
+        """
+        Crawl asynchronously, yielding each document as soon as it is processed.
+
+        Documents are dicts with the page "url", crawl "depth", cleaned "text" and "metadata".
+        Pass do_rank=True to rank them incrementally and add a "rank_score" to each document.
+        """
+        kwargs.setdefault("resume", self.resume)
+        async for doc in self.crawler.astream(start_url, prompt, **kwargs):
+            yield doc
+    
+    def iter_results(self, start_url, prompt, **kwargs):
+        """Crawl synchronously, yielding each document as soon as it is processed (see astream)."""
+        stream = self.astream(start_url, prompt, **kwargs)
+        try:
+            while True:
+                try:
+                    yield self._run(stream.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            self._run(stream.aclose())
+    
     def scrape(self, start_url, prompt, **kwargs):
         """Start crawling and ranking synchronously using asyncio event loop"""
         
-        return asyncio.run(self.start(start_url, prompt, **kwargs))
+        return self._run(self.start(start_url, prompt, **kwargs))
+    
+    async def astart_many(self, jobs, max_jobs=4, output_file=None, resume=False, **kwargs):
+        """
+        Crawl and rank many jobs concurrently, yielding each job's record as soon as it finishes.
+
+        All jobs share the crawler's connection pool, HTTP cache, politeness scheduler and the embedding
+        model client. Set max_total_requests on the client to bound requests across all running jobs.
+
+        :param jobs: iterable of dicts with the job's "url" (or "start_url") and "prompt", an optional "id"
+            (defaults to the job's position) and optional per-job options overriding kwargs
+        :param max_jobs: int, number of jobs crawled at once
+        :param output_file: string, path of a JSONL file every record is appended to as it finishes
+        :param resume: boolean, skip jobs that already have a successful record in output_file and resume
+            the crawls of interrupted jobs from their checkpoints
+        :param kwargs: options passed to every job, as for start
+        :return: async generator of records, dicts with the job "id", "start_url", "prompt" and either
+            its "result" or the "error" that made it fail
+        """
+        done_ids = set()
+        if resume and output_file and os.path.exists(output_file):
+            done_ids = {record["id"] for record in read_jsonl(output_file) if "error" not in record}
+
+        # One embedding model client for every job
+        if kwargs.get("do_rank", True) and kwargs.get("reranker") is None:
+            kwargs["reranker"] = get_reranker(**kwargs)
+
+        async def run_job(job_id, job):
+            record = {"id": job_id, "start_url": job.get("url", job.get("start_url")), "prompt": job.get("prompt")}
+            try:
+                # A malformed job fails on its own, the rest of the batch keeps running
+                if record["start_url"] is None or record["prompt"] is None:
+                    raise ValueError("A job needs a url (or start_url) and a prompt")
+                options = {key: value for key, value in job.items() if key not in ("id", "url", "start_url", "prompt")}
+                record["result"] = await self.start(record["start_url"], record["prompt"], **{"resume": resume, **kwargs, **options})
+            except Exception as e:
+                self.crawler.logger.error(f"Job {job_id} failed: {e}")
+                record["error"] = str(e)
+            return record
+
+        sink = open(output_file, "a" if resume else "w") if output_file else None
+        if sink is not None and sink.tell() > 0:
+            with open(output_file, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read() != b"\n":
+                    sink.write("\n")  # Terminate a record cut short by an interrupted run
+        jobs = iter(enumerate(jobs))
+        running = set()
+        try:
+            while True:
+                # Jobs are read lazily, so that only max_jobs of them are held in memory
+                for position, job in jobs:
+                    job_id = job.get("id", position)
+                    if job_id in done_ids:
+                        continue
+                    running.add(asyncio.ensure_future(run_job(job_id, job)))
+                    if len(running) >= max_jobs:
+                        break
+                if not running:
+                    break
+                finished, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    record = task.result()
+                    if sink is not None:
+                        sink.write(json.dumps(record, default=float) + "\n")
+                        sink.flush()
+                    yield record
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            if sink is not None:
+                sink.close()
+    
+    def scrape_many(self, jobs, **kwargs):
+        """Crawl and rank many jobs synchronously, yielding each job's record as soon as it finishes (see astart_many)."""
+        stream = self.astart_many(jobs, **kwargs)
+        try:
+            while True:
+                try:
+                    yield self._run(stream.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            self._run(stream.aclose())
+    
+    async def aquery(self, prompt, **kwargs):
+        """Rank the documents of the client's vector index against a prompt asynchronously, without crawling."""
+        return await self.crawler.query_index(prompt, **kwargs)
+    
+    def query(self, prompt, **kwargs):
+        """Rank the documents of the client's vector index against a prompt synchronously, without crawling."""
+        return self._run(self.aquery(prompt, **kwargs))
+    
+    def _run(self, coro):
+        """Run a coroutine on the client's own event loop, which is reused across calls."""
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coro)
+    
+    async def aclose(self):
+        """Close the crawler's pooled HTTP session."""
+        await self.crawler.close()
+    
+    def close(self):
+        """Close the pooled HTTP session and the client's event loop."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.run_until_complete(self.aclose())
+            self._loop.close()
+        self._loop = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    async def __aenter__(self):
+        return self
     
-    
\ No newline at end of file
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
@@ -1,4 +1,11 @@
-from .method import rank_content
+from .method import rank_content, arank_content, ascore_content, arank_passages, ascore_passages, aindex_content, aquery_index, get_vector_index
 
 __all__ = [
-    "rank_content"]
\ No newline at end of file
+    "rank_content",
+    "arank_content",
+    "ascore_content",
+    "arank_passages",
+    "ascore_passages",
+    "aindex_content",
+    "aquery_index",
+    "get_vector_index"]
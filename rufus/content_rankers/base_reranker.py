@@ -1,8 +1,64 @@
+import asyncio
+import logging
 from abc import ABC, abstractmethod
 
+from ..utils import backoff_delay
+
 class BaseReranker(ABC):
+    # Defaults for the batched embedding pipeline, override per reranker or per call
+    batch_size = 100
+    max_concurrent_batches = 4
+    batch_retries = 3
+
+    # config.yaml options identifying an instance, calls with the same values share one instance
+    config_keys = ()
+
+    @classmethod
+    def from_config(cls, **kwargs):
+        """Create the reranker from config.yaml options."""
+        return cls()
+
     @abstractmethod
     def get_embeddings(self, texts):
         """Obtain embeddings for the given list of texts."""
         pass
     
+    def embed_batch(self, texts):
+        """Obtain embeddings for one batch of texts, raising an exception on failure."""
+        embeddings = self.get_embeddings(texts)
+        if len(embeddings) != len(texts):
+            raise RuntimeError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+        return embeddings
+    
+    async def aget_embeddings(self, texts, batch_size=None, max_concurrency=None, retries=None, delay=1.0):
+        """
+        Obtain embeddings asynchronously, splitting the texts into batches embedded in worker threads.
+
+        :param texts: list of strings to embed
+        :param batch_size: int, number of texts per embedding request
+        :param max_concurrency: int, maximum number of batches in flight at once
+        :param retries: int, attempts per batch before giving up on it
+        :param delay: float, base delay in seconds for exponential backoff between attempts
+        :return: list of embeddings aligned with texts, None for texts whose batch failed every attempt
+        """
+        batch_size = batch_size or self.batch_size
+        retries = retries or self.batch_retries
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrent_batches)
+        logger = logging.getLogger("RUFUSLogger")
+
+        async def run_batch(batch):
+            async with semaphore:
+                for attempt in range(1, retries + 1):
+                    try:
+                        return await asyncio.to_thread(self.embed_batch, batch)
+                    except Exception as e:
+                        if attempt == retries:
+                            logger.error(f"Embedding batch of {len(batch)} texts failed after {attempt} attempts: {e}")
+                            return [None] * len(batch)
+                        logger.warning(f"Embedding batch attempt {attempt} failed: {e}")
+                        await asyncio.sleep(backoff_delay(attempt, base=delay))
+
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+        return [embedding for result in results for embedding in result]
+    
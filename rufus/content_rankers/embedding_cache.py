@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+
+import numpy as np
+
+# On-disk embedding store: one memory-mapped float32 matrix plus a JSON index per model
+class _DiskStore:
+    def __init__(self, directory, model_name):
+        slug = re.sub(r"[^\w.-]+", "_", model_name)
+        self.matrix_path = os.path.join(directory, f"{slug}.f32")
+        self.index_path = os.path.join(directory, f"{slug}.index.json")
+        self.rows = {}
+        self.dim = None
+        self._matrix = None
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+            self.dim = index["dim"]
+            self.rows = index["rows"]
+
+    def _num_rows(self):
+        if not os.path.exists(self.matrix_path):
+            return 0
+        return os.path.getsize(self.matrix_path) // (4 * self.dim)
+
+    def _open(self, row):
+        # Remap once the file has grown past the mapping, row numbers also count unindexed rows
+        if self._matrix is None or row >= len(self._matrix):
+            self._matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(self._num_rows(), self.dim))
+        return self._matrix
+
+    def get(self, key):
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        return np.array(self._open(row)[row])
+
+    def put(self, items):
+        """Append (key, vector) pairs to the matrix file and persist the index."""
+        items = [(key, vector) for key, vector in dict(items).items() if key not in self.rows]
+        if not items:
+            return
+        if self.dim is None:
+            self.dim = len(items[0][1])
+        items = [(key, vector) for key, vector in items if len(vector) == self.dim]
+        if not items:
+            return
+
+        # Rows are numbered from the file size, rows written without being indexed (e.g. after a crash) are skipped
+        start = self._num_rows()
+        with open(self.matrix_path, "ab") as f:
+            f.write(np.asarray([vector for _, vector in items], dtype=np.float32).tobytes())
+        for i, (key, _) in enumerate(items):
+            self.rows[key] = start + i
+
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"dim": self.dim, "rows": self.rows}, f)
+        os.replace(tmp_path, self.index_path)
+
+
+# Two-tier embedding cache keyed by (model name, sha256 of text)
+class EmbeddingCache:
+    def __init__(self, path=None, max_items=10000):
+        """
+        :param path: string, directory of the on-disk tier (None for an in-memory cache only)
+        :param max_items: int, number of embeddings kept in the in-memory LRU tier
+        """
+        self.path = path
+        self.max_items = max_items
+        self._memory = OrderedDict()
+        self._stores = {}
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def key(text):
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _store(self, model_name):
+        if self.path is None:
+            return None
+        if model_name not in self._stores:
+            self._stores[model_name] = _DiskStore(self.path, model_name)
+        return self._stores[model_name]
+
+    def _remember(self, model_name, key, vector):
+        self._memory[(model_name, key)] = vector
+        self._memory.move_to_end((model_name, key))
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+    def get(self, model_name, texts):
+        """Return cached embeddings for the texts, with None for every cache miss."""
+        store = self._store(model_name)
+        embeddings = []
+        for text in texts:
+            key = self.key(text)
+            vector = self._memory.get((model_name, key))
+            if vector is None and store is not None:
+                vector = store.get(key)
+            if vector is not None:
+                self._remember(model_name, key, vector)
+            embeddings.append(vector)
+        return embeddings
+
+    def put(self, model_name, texts, embeddings):
+        """Add the embeddings of the texts to both tiers."""
+        items = []
+        for text, embedding in zip(texts, embeddings):
+            key = self.key(text)
+            vector = np.asarray(embedding, dtype=np.float32)
+            self._remember(model_name, key, vector)
+            items.append((key, vector))
+        store = self._store(model_name)
+        if store is not None:
+            store.put(items)
+
+
+_caches = {}
+
+# Return a process-wide cache for a path, so the in-memory tier stays warm across rank_content calls
+def get_embedding_cache(path=None, max_items=10000):
+    """Get or create the embedding cache stored at `path` (None or ":memory:" for in-memory only)."""
+    if path == ":memory:":
+        path = None
+    if path not in _caches:
+        _caches[path] = EmbeddingCache(path, max_items=max_items)
+    return _caches[path]
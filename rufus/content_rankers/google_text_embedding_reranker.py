@@ -2,6 +2,12 @@ import google.generativeai as genai
 from .base_reranker import BaseReranker
 
 class GoogleTextEmbeddingReranker(BaseReranker):
+    config_keys = ("embd_model_api_key", "embd_model_name")
+
+    @classmethod
+    def from_config(cls, **kwargs):
+        return cls(kwargs.get("embd_model_api_key"), kwargs.get("embd_model_name"))
+
     def __init__(self, embd_model_api_key, embd_model_name):
         self.model_name = embd_model_name
         self.is_local_hosted = False
@@ -9,12 +15,14 @@ class GoogleTextEmbeddingReranker(BaseReranker):
     
     def get_embeddings(self, texts):
         try:
-            response = genai.embed_content(
-                model = self.model_name,
-                content = texts
-            )
-            return [embedding for embedding in response['embedding']]
+            return self.embed_batch(texts)
         except Exception as e:
             print(f"Error fetching embeddings from Google model: {e}")
             return []
-        
\ No newline at end of file
+    
+    def embed_batch(self, texts):
+        response = genai.embed_content(
+            model = self.model_name,
+            content = texts
+        )
+        return [embedding for embedding in response['embedding']]
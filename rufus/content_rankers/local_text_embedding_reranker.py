@@ -0,0 +1,94 @@
+import logging
+import re
+import zlib
+
+import numpy as np
+
+from .base_reranker import BaseReranker
+
+# Embed texts by hashing their words and word pairs into a fixed number of buckets
+def hashing_embeddings(texts, dim=1024):
+    """
+    Feature-hashed bag of unigrams and bigrams with sublinear term frequencies, L2-normalized.
+    Needs no model or vocabulary, so texts embedded at different times are always comparable.
+
+    :param texts: list of strings to embed
+    :param dim: int, number of hash buckets (embedding dimension)
+    """
+    embeddings = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        tokens = re.findall(r"\w+", text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        if not features:
+            continue
+        hashes = np.fromiter((zlib.crc32(feature.encode("utf-8")) for feature in features), dtype=np.uint32, count=len(features))
+        # The top bit picks the sign so that colliding features tend to cancel out instead of adding up
+        signs = np.where(hashes >> 31, -1.0, 1.0)
+        counts = np.bincount(hashes % dim, weights=signs, minlength=dim)
+        embeddings[row] = np.sign(counts) * np.log1p(np.abs(counts))
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.where(norms == 0, 1, norms)
+
+class LocalTextEmbeddingReranker(BaseReranker):
+    # Batches run one at a time, each using every intra-op thread
+    batch_size = 32
+    max_concurrent_batches = 1
+    batch_retries = 1
+    config_keys = ("embd_model_name", "embd_num_threads", "embd_quantize", "embd_dim")
+
+    @classmethod
+    def from_config(cls, **kwargs):
+        return cls(
+            kwargs.get("embd_model_name"),
+            num_threads=kwargs.get("embd_num_threads"),
+            quantize=kwargs.get("embd_quantize", False),
+            dim=kwargs.get("embd_dim", 1024),
+        )
+
+    def __init__(self, embd_model_name=None, num_threads=None, quantize=False, dim=1024):
+        """
+        Offline reranker running on CPU.
+
+        Uses a sentence-transformers model if embd_model_name is given and the package is installed,
+        a hashing embedder otherwise.
+
+        :param embd_model_name: string, name or path of a sentence-transformers model (None for the hashing embedder)
+        :param num_threads: int, number of intra-op threads used by torch (None for torch's default)
+        :param quantize: boolean, whether to quantize the model's linear layers to int8
+        :param dim: int, embedding dimension of the hashing embedder
+        """
+        self.is_local_hosted = True
+        self.device = "cpu"
+        self.dim = dim
+        self.model = None
+
+        # torch is only imported along with a sentence-transformers model, the hashing embedder does not need it
+        if embd_model_name:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError:
+                logging.getLogger("RUFUSLogger").warning(
+                    f"sentence-transformers is not installed, using the hashing embedder instead of {embd_model_name}"
+                )
+            else:
+                import torch
+
+                if num_threads:
+                    torch.set_num_threads(num_threads)
+                self.model = SentenceTransformer(embd_model_name, device="cpu")
+                self.model.eval()
+                if quantize:
+                    self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        if self.model is None:
+            self.model_name = f"hashing-{dim}"
+        else:
+            self.model_name = f"{embd_model_name}-int8" if quantize else embd_model_name
+
+    def get_embeddings(self, texts):
+        if self.model is None:
+            return hashing_embeddings(texts, self.dim)
+        import torch
+
+        with torch.inference_mode():
+            return self.model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True, normalize_embeddings=True)
@@ -1,50 +1,289 @@
-import torch
+import asyncio
+import logging
+import os
+import numpy as np
 from ..utils import cosine_similarity, pairwise_distance
-from .google_text_embedding_reranker import GoogleTextEmbeddingReranker
+from .embedding_cache import EmbeddingCache, get_embedding_cache
+from .vector_index import load_vector_index, make_vector_index
+from ..registry import ProviderRegistry
 
-# Compute similarity scores and return ranked content in descending order
-def rank_content(ref_txt, candidate_txt, similarity_metric="cosine", embd_model_provider="google",**kwargs):
-    # Initialize reranker
-    if embd_model_provider == "google":
-        reranker = GoogleTextEmbeddingReranker(kwargs.get("embd_model_api_key"), kwargs.get("embd_model_name"))
-    else:
-        raise ValueError(f"Unsupported embedding model provider: {embd_model_provider}")
-    
-    # Compute embeddings for input prompt and content text
-    ref_embeddings = reranker.get_embeddings(ref_txt)
-    candidate_embeddings = reranker.get_embeddings(candidate_txt)
-    
+# Embedding model providers by name, imported on first use
+RERANKERS = ProviderRegistry("embedding model provider", "rufus.rerankers", {
+    "google": "rufus.content_rankers.google_text_embedding_reranker:GoogleTextEmbeddingReranker",
+    "local": "rufus.content_rankers.local_text_embedding_reranker:LocalTextEmbeddingReranker",
+})
+
+# Initialize the reranker for the configured embedding model provider, shared by calls with the same configuration
+def get_reranker(embd_model_provider="google", **kwargs):
+    return RERANKERS.create(embd_model_provider, **kwargs)
+
+# Embed texts in batches, only calling the reranker for texts missing from the cache
+async def aembed_texts(reranker, texts, embedding_cache=None, **batch_kwargs):
+    """Return embeddings aligned with texts, None for texts that could not be embedded."""
+    if embedding_cache is None:
+        return await reranker.aget_embeddings(texts, **batch_kwargs)
+
+    model_name = getattr(reranker, "model_name", type(reranker).__name__)
+    embeddings = embedding_cache.get(model_name, texts)
+    misses = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if misses:
+        # Identical texts (e.g. boilerplate pages) are embedded once
+        miss_txt = list(dict.fromkeys(texts[i] for i in misses))
+        new_embeddings = await reranker.aget_embeddings(miss_txt, **batch_kwargs)
+        embedded = {text: embedding for text, embedding in zip(miss_txt, new_embeddings) if embedding is not None}
+        embedding_cache.put(model_name, list(embedded), list(embedded.values()))
+        for i in misses:
+            embeddings[i] = embedded.get(texts[i])
+    return embeddings
+
+# Type of the device a local reranker runs on, given as a torch.device or a plain string like "cpu"
+def _device_type(reranker):
+    return getattr(reranker.device, "type", reranker.device)
+
+# Select the similarity function for the reranker's device and the requested metric
+def get_similarity_func(reranker, similarity_metric="cosine"):
+    """Return a function scoring every query against every candidate, as a (num_queries, num_candidates) array."""
     # If reranker is hosted locally
     if reranker.is_local_hosted:
-        if reranker.device.type == "cuda":
-            # For GPU-optimized operations
+        if _device_type(reranker) == "cuda":
+            # For GPU-optimized operations, torch is only imported when a GPU reranker is used
+            import torch
+
             if similarity_metric == "cosine":
-                similarity_func = torch.nn.functional.cosine_similarity
+                return lambda q, c: torch.nn.functional.normalize(q, dim=-1) @ torch.nn.functional.normalize(c, dim=-1).T
             elif similarity_metric == "euclidean":
-                similarity_func = torch.nn.functional.pairwise_distance
+                return lambda q, c: 1 / (1 + torch.cdist(q, c))
             else:
                 raise ValueError(f"Unknown similarity metric: {similarity_metric}")
-        elif reranker.device.type == "cpu":
+        elif _device_type(reranker) == "cpu":
             # For CPU-optimized operations
             if similarity_metric == "cosine":
-                similarity_func = cosine_similarity
+                return cosine_similarity
             elif similarity_metric == "euclidean":
-                similarity_func = pairwise_distance
+                return pairwise_distance
             else:
                 raise ValueError(f"Unknown similarity metric: {similarity_metric}")
     else:
         # Reranker is cloud hosted / api access only
         # Use Numpy operations for performance
         if similarity_metric == "cosine":
-            similarity_func = cosine_similarity
+            return cosine_similarity
         elif similarity_metric == "euclidean":
-            similarity_func = pairwise_distance
+            return pairwise_distance
         else:
             raise ValueError(f"Unknown similarity metric: {similarity_metric}")
+
+# Score candidates against one or more queries, keeping each candidate's best score
+def score_candidates(reranker, query_embeddings, candidate_embeddings, similarity_metric="cosine"):
+    similarity_func = get_similarity_func(reranker, similarity_metric)
+    if reranker.is_local_hosted and _device_type(reranker) == "cuda":
+        import torch
+
+        queries = torch.as_tensor(np.asarray(query_embeddings, dtype=np.float32), device=reranker.device)
+        candidates = torch.as_tensor(np.asarray(candidate_embeddings, dtype=np.float32), device=reranker.device)
+        return similarity_func(queries, candidates).max(dim=0).values.cpu().numpy().astype(np.float64)
+
+    queries = np.asarray(query_embeddings, dtype=np.float32)
+    candidates = np.asarray(candidate_embeddings, dtype=np.float32)
+    return np.asarray(similarity_func(queries, candidates), dtype=np.float64).max(axis=0)
+
+# Indices of the highest scores in descending order
+def top_k_indices(scores, top_k=None):
+    """Return the indices of the top_k highest scores (all scores if None), best first."""
+    if top_k is None or top_k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    top = np.argpartition(-scores, top_k - 1)[:top_k]
+    return top[np.argsort(-scores[top], kind="stable")]
+
+# Compute similarity scores of every candidate asynchronously
+async def ascore_content(ref_txt, candidate_txt, similarity_metric="cosine", embd_model_provider="google", embedding_cache=None, reranker=None, **kwargs):
+    """
+    Score candidate texts by similarity to the reference texts without blocking the event loop.
+
+    ref_txt is a single query string or a small list of queries. Each distinct query is embedded once and
+    candidates are scored by their best match against any query. Returns a float64 array of scores aligned
+    with candidate_txt, with NaN for candidates that could not be embedded.
+
+    Embeddings are requested in batches of `embd_batch_size` texts, with at most `embd_max_concurrency`
+    batches in flight and `embd_retries` attempts per batch.
+
+    embedding_cache is an EmbeddingCache, or the directory of an on-disk cache (":memory:" for an in-memory
+    cache only). Cached embeddings are keyed by model name and content hash, so only new texts are embedded.
+
+    reranker is an already initialized BaseReranker, used instead of creating one for embd_model_provider.
+    """
+    scores = np.full(len(candidate_txt), np.nan)
+    if not candidate_txt:
+        return scores
+
+    if embedding_cache is not None and not isinstance(embedding_cache, EmbeddingCache):
+        embedding_cache = get_embedding_cache(embedding_cache, max_items=kwargs.get("embedding_cache_size", 10000))
+
+    # Initialize reranker
+    if reranker is None:
+        reranker = get_reranker(embd_model_provider, **kwargs)
+    
+    # Compute embeddings for input prompt and content text
+    batch_kwargs = {
+        "batch_size": kwargs.get("embd_batch_size"),
+        "max_concurrency": kwargs.get("embd_max_concurrency"),
+        "retries": kwargs.get("embd_retries"),
+    }
+    queries = [ref_txt] if isinstance(ref_txt, str) else list(dict.fromkeys(ref_txt))
+    query_embeddings = await aembed_texts(reranker, queries, embedding_cache, **batch_kwargs)
+    candidate_embeddings = await aembed_texts(reranker, candidate_txt, embedding_cache, **batch_kwargs)
+    if any(embedding is None for embedding in query_embeddings):
+        raise RuntimeError("Failed to embed the reference text")
     
-    # Compute selected similarity scores
-    scores = similarity_func(ref_embeddings, candidate_embeddings)
+    # Compute selected similarity scores for the candidates that could be embedded
+    keep = [i for i, embedding in enumerate(candidate_embeddings) if embedding is not None]
+    if keep:
+        scores[keep] = score_candidates(reranker, query_embeddings, [candidate_embeddings[i] for i in keep], similarity_metric)
+    return scores
+
+# Compute similarity scores asynchronously and return ranked content in descending order
+async def arank_content(ref_txt, candidate_txt, similarity_metric="cosine", embd_model_provider="google", top_k=None, **kwargs):
+    """
+    Rank candidate texts by similarity to the reference texts without blocking the event loop.
+
+    Takes the same arguments as ascore_content. Returns a list of (candidate, score) tuples in descending
+    order of score, limited to the top_k best candidates if top_k is given. Candidates that could not be
+    embedded are left out of the ranking instead of failing the whole call.
+    """
+    logger = logging.getLogger("RUFUSLogger")
+    scores = await ascore_content(ref_txt, candidate_txt, similarity_metric=similarity_metric, embd_model_provider=embd_model_provider, **kwargs)
+
+    # Leave out candidates that could not be embedded
+    keep = np.flatnonzero(~np.isnan(scores))
+    if len(keep) < len(candidate_txt):
+        logger.warning(f"Ranking without {len(candidate_txt) - len(keep)} candidates that could not be embedded")
     
-    ranked_content = sorted(zip(candidate_txt, scores), key=lambda x: x[1], reverse=True)
+    ranked_content = [(candidate_txt[keep[i]], scores[keep[i]]) for i in top_k_indices(scores[keep], top_k)]
     
     return ranked_content
+
+# Combine the scores of each document's passages into one score per document
+def aggregate_scores(scores, doc_ids, num_docs, aggregation="max"):
+    """
+    Aggregate passage scores per document, ignoring NaN scores. Documents without any scored passage get NaN.
+
+    :param scores: array, score of every passage
+    :param doc_ids: array, index of the document every passage belongs to
+    :param num_docs: int, number of documents
+    :param aggregation: string, "max" (best passage) or "mean" (average over passages)
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    doc_ids = np.asarray(doc_ids, dtype=np.intp)
+    valid = ~np.isnan(scores)
+    doc_scores = np.full(num_docs, np.nan)
+    if aggregation == "max":
+        np.fmax.at(doc_scores, doc_ids[valid], scores[valid])
+    elif aggregation == "mean":
+        sums = np.bincount(doc_ids[valid], weights=scores[valid], minlength=num_docs)
+        counts = np.bincount(doc_ids[valid], minlength=num_docs)
+        np.divide(sums, counts, out=doc_scores, where=counts > 0)
+    else:
+        raise ValueError(f"Unknown passage aggregation: {aggregation}")
+    return doc_scores
+
+# Score documents through their passages asynchronously
+async def ascore_passages(ref_txt, passages, aggregation="max", **kwargs):
+    """
+    Score every passage by similarity to the reference texts and aggregate the scores per document.
+
+    passages holds one list of passages per document, each passage a dict with its "text" (as returned by
+    rufus.core.extraction.chunk_text). Takes the same keyword arguments as ascore_content. Returns the float64
+    array of document scores and, for every document, the array of its passage scores (NaN where missing).
+    """
+    flat_txt = [passage["text"] for doc_passages in passages for passage in doc_passages]
+    doc_ids = np.repeat(np.arange(len(passages)), [len(doc_passages) for doc_passages in passages])
+    scores = await ascore_content(ref_txt, flat_txt, **kwargs)
+    doc_scores = aggregate_scores(scores, doc_ids, len(passages), aggregation)
+    offsets = np.cumsum([0] + [len(doc_passages) for doc_passages in passages])
+    return doc_scores, [scores[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+
+# Rank documents by their passages asynchronously
+async def arank_passages(ref_txt, passages, aggregation="max", top_k=None, top_passages=3, **kwargs):
+    """
+    Rank documents by the aggregated scores of their passages.
+
+    Takes the same arguments as ascore_passages. Returns a list of (document index, score, top passages)
+    tuples in descending order of score, limited to the top_k best documents if top_k is given. Top passages
+    are the document's top_passages best (passage, score) pairs. Documents without any embedded passage are
+    left out of the ranking.
+    """
+    doc_scores, passage_scores = await ascore_passages(ref_txt, passages, aggregation=aggregation, **kwargs)
+
+    ranked = []
+    keep = np.flatnonzero(~np.isnan(doc_scores))
+    for i in top_k_indices(doc_scores[keep], top_k):
+        doc = keep[i]
+        scored = np.flatnonzero(~np.isnan(passage_scores[doc]))
+        best = scored[top_k_indices(passage_scores[doc][scored], top_passages)]
+        ranked.append((doc, doc_scores[doc], [(passages[doc][j], passage_scores[doc][j]) for j in best]))
+    return ranked
+
+# Open the vector index stored at a path, or create an empty one
+def get_vector_index(path=None, index_type="exact", similarity_metric="cosine", **kwargs):
+    """Load the vector index saved at `path` if there is one, otherwise create an empty index (saved by the caller)."""
+    if path is not None and os.path.exists(os.path.join(path, "index.json")):
+        return load_vector_index(path)
+    return make_vector_index(index_type, metric=similarity_metric, **kwargs)
+
+# Embed documents and add them to a vector index asynchronously
+async def aindex_content(documents, index, embd_model_provider="google", embedding_cache=None, reranker=None, **kwargs):
+    """
+    Add documents (dicts with their "text", and usually their "url") to a vector index, embedding only
+    the documents that are not indexed yet or whose text changed. Documents that could not be embedded
+    are left out. Takes the same keyword arguments as ascore_content.
+    """
+    documents = [document for document in documents if document not in index]
+    if not documents:
+        return index
+
+    if embedding_cache is not None and not isinstance(embedding_cache, EmbeddingCache):
+        embedding_cache = get_embedding_cache(embedding_cache, max_items=kwargs.get("embedding_cache_size", 10000))
+    if reranker is None:
+        reranker = get_reranker(embd_model_provider, **kwargs)
+    model_name = getattr(reranker, "model_name", type(reranker).__name__)
+    if index.model_name is None:
+        index.model_name = model_name
+    elif index.model_name != model_name:
+        raise ValueError(f"Index holds {index.model_name} embeddings, cannot add {model_name} embeddings")
+
+    batch_kwargs = {
+        "batch_size": kwargs.get("embd_batch_size"),
+        "max_concurrency": kwargs.get("embd_max_concurrency"),
+        "retries": kwargs.get("embd_retries"),
+    }
+    embeddings = await aembed_texts(reranker, [document["text"] for document in documents], embedding_cache, **batch_kwargs)
+    keep = [i for i, embedding in enumerate(embeddings) if embedding is not None]
+    if keep:
+        index.add([embeddings[i] for i in keep], [documents[i] for i in keep])
+    return index
+
+# Rank the documents of a vector index asynchronously
+async def aquery_index(ref_txt, index, top_k=None, embd_model_provider="google", embedding_cache=None, reranker=None, **kwargs):
+    """
+    Return the top_k indexed documents (all if None) most similar to the reference texts, as (document, score)
+    pairs in descending order of score. Only the reference texts are embedded, so any number of prompts can be
+    answered against one crawl. Takes the same keyword arguments as ascore_content.
+    """
+    if embedding_cache is not None and not isinstance(embedding_cache, EmbeddingCache):
+        embedding_cache = get_embedding_cache(embedding_cache, max_items=kwargs.get("embedding_cache_size", 10000))
+    if reranker is None:
+        reranker = get_reranker(embd_model_provider, **kwargs)
+    model_name = getattr(reranker, "model_name", type(reranker).__name__)
+    if index.model_name is not None and index.model_name != model_name:
+        raise ValueError(f"Index holds {index.model_name} embeddings, cannot query it with {model_name}")
+
+    queries = [ref_txt] if isinstance(ref_txt, str) else list(dict.fromkeys(ref_txt))
+    query_embeddings = await aembed_texts(reranker, queries, embedding_cache, batch_size=kwargs.get("embd_batch_size"), retries=kwargs.get("embd_retries"))
+    if any(embedding is None for embedding in query_embeddings):
+        raise RuntimeError("Failed to embed the reference text")
+    return index.search(query_embeddings, top_k=top_k)
+
+# Compute similarity scores and return ranked content in descending order
+def rank_content(ref_txt, candidate_txt, similarity_metric="cosine", embd_model_provider="google", **kwargs):
+    """Synchronous wrapper of arank_content, use arank_content from within a running event loop."""
+    return asyncio.run(arank_content(ref_txt, candidate_txt, similarity_metric=similarity_metric, embd_model_provider=embd_model_provider, **kwargs))
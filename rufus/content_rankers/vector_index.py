@@ -0,0 +1,390 @@
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from ..utils import pairwise_distance
+
+# Base class for persistent indexes of document embeddings
+class BaseVectorIndex(ABC):
+    index_type = None
+
+    def __init__(self, metric="cosine", model_name=None, **kwargs):
+        """
+        :param metric: string, "cosine" or "euclidean"
+        :param model_name: string, embedding model of the indexed vectors, queries must use the same model
+        """
+        if metric not in ("cosine", "euclidean"):
+            raise ValueError(f"Unknown similarity metric: {metric}")
+        self.metric = metric
+        self.model_name = model_name
+        self.documents = []
+        self._positions = {}
+        self.generation = 0 # Incremented whenever documents are added or replaced
+
+    @staticmethod
+    def key(document):
+        """Documents are identified by their URL, or by their text if they have none."""
+        return document.get("url") or document["text"]
+
+    def _prepare(self, embeddings):
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        if self.metric == "cosine":
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1, norms)
+        return vectors
+
+    def add(self, embeddings, documents):
+        """
+        Index documents (JSON-serializable dicts with at least a "text") with their embeddings.
+
+        A document already in the index is skipped if its text is unchanged and replaced otherwise.
+        """
+        vectors = self._prepare(embeddings)
+        new_rows, new_positions, updated_rows, updated_positions = [], [], [], []
+        for row, document in enumerate(documents):
+            key = self.key(document)
+            position = self._positions.get(key)
+            if position is None:
+                self._positions[key] = position = len(self.documents)
+                self.documents.append(document)
+                new_rows.append(row)
+                new_positions.append(position)
+            elif self.documents[position]["text"] != document["text"]:
+                self.documents[position] = document
+                updated_rows.append(row)
+                updated_positions.append(position)
+        if new_rows:
+            self._add_vectors(vectors[new_rows], np.asarray(new_positions))
+        if updated_rows:
+            self._update_vectors(vectors[updated_rows], np.asarray(updated_positions))
+        if new_rows or updated_rows:
+            self.generation += 1
+
+    def __contains__(self, document):
+        key = self.key(document)
+        position = self._positions.get(key)
+        return position is not None and self.documents[position]["text"] == document["text"]
+
+    def __len__(self):
+        return len(self.documents)
+
+    def search(self, query_embeddings, top_k=10):
+        """
+        Return the top_k documents most similar to any of the queries, as (document, score) pairs, best first.
+        Scores are cosine similarities, or 1 / (1 + distance) for the euclidean metric.
+        """
+        if not self.documents:
+            return []
+        queries = self._prepare(query_embeddings)
+        positions, scores = self._search(queries, min(top_k or len(self.documents), len(self.documents)))
+        return [(self.documents[position], float(score)) for position, score in zip(positions, scores)]
+
+    def _similarity(self, queries, vectors):
+        """Best similarity of every vector to any query."""
+        if self.metric == "cosine":
+            return (queries @ vectors.T).max(axis=0)
+        return pairwise_distance(queries, vectors).max(axis=0)
+
+    def save(self, path):
+        """Save the index to a directory."""
+        os.makedirs(path, exist_ok=True)
+        self._save_vectors(path)
+        meta = {
+            "index_type": self.index_type,
+            "metric": self.metric,
+            "model_name": self.model_name,
+            "options": self._options(),
+            "documents": self.documents,
+        }
+        tmp_path = os.path.join(path, "index.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(path, "index.json"))
+
+    @classmethod
+    def _from_meta(cls, path, meta):
+        index = cls(metric=meta["metric"], model_name=meta["model_name"], **meta["options"])
+        index.documents = meta["documents"]
+        index._positions = {cls.key(document): position for position, document in enumerate(index.documents)}
+        index._load_vectors(path)
+        return index
+
+    def _options(self):
+        return {}
+
+    @abstractmethod
+    def _add_vectors(self, vectors, positions):
+        pass
+
+    @abstractmethod
+    def _update_vectors(self, vectors, positions):
+        pass
+
+    @abstractmethod
+    def _search(self, queries, top_k):
+        """Return the positions and scores of the top_k best vectors, best first."""
+        pass
+
+    @abstractmethod
+    def _save_vectors(self, path):
+        pass
+
+    @abstractmethod
+    def _load_vectors(self, path):
+        pass
+
+
+# Top-k selection over a stream of (positions, scores) blocks
+def _merge_top_k(best_positions, best_scores, positions, scores, top_k):
+    positions = np.concatenate([best_positions, positions])
+    scores = np.concatenate([best_scores, scores])
+    if len(scores) > top_k:
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        positions, scores = positions[top], scores[top]
+    return positions, scores
+
+
+# Brute-force search over every vector, in blocks so that memory stays bounded
+class ExactIndex(BaseVectorIndex):
+    index_type = "exact"
+
+    def __init__(self, metric="cosine", model_name=None, block_size=65536, **kwargs):
+        """
+        :param block_size: int, number of vectors scored at once
+        """
+        super().__init__(metric=metric, model_name=model_name)
+        self.block_size = block_size
+        self.vectors = None
+
+    def _options(self):
+        return {"block_size": self.block_size}
+
+    def _add_vectors(self, vectors, positions):
+        self.vectors = vectors if self.vectors is None else np.concatenate([self.vectors, vectors])
+
+    def _update_vectors(self, vectors, positions):
+        self.vectors[positions] = vectors
+
+    def _search_rows(self, queries, rows, top_k):
+        """Search the given rows, or every row (read as contiguous slices, without copies) if rows is None."""
+        if top_k < 1:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        best_positions, best_scores = np.empty(0, dtype=np.intp), np.empty(0)
+        num_rows = len(self.vectors) if rows is None else len(rows)
+        for start in range(0, num_rows, self.block_size):
+            if rows is None:
+                block = np.arange(start, min(start + self.block_size, num_rows))
+                vectors = self.vectors[start:start + self.block_size]
+            else:
+                block = rows[start:start + self.block_size]
+                vectors = self.vectors[block]
+            scores = self._similarity(queries, vectors)
+            best_positions, best_scores = _merge_top_k(best_positions, best_scores, block, scores, top_k)
+        order = np.argsort(-best_scores, kind="stable")
+        return best_positions[order], best_scores[order]
+
+    def _search(self, queries, top_k):
+        return self._search_rows(queries, None, top_k)
+
+    def _save_vectors(self, path):
+        np.save(os.path.join(path, "vectors.npy"), self.vectors if self.vectors is not None else np.empty((0, 0), dtype=np.float32))
+
+    def _load_vectors(self, path):
+        self.vectors = np.load(os.path.join(path, "vectors.npy"))
+        if not len(self.vectors):
+            self.vectors = None
+
+
+# Inverted file index: vectors are clustered with k-means and only the clusters closest to the query are scanned
+class IVFIndex(ExactIndex):
+    index_type = "ivf"
+
+    def __init__(self, metric="cosine", model_name=None, nlist=None, nprobe=8, min_train_size=1024, block_size=65536, **kwargs):
+        """
+        :param nlist: int, number of clusters (defaults to the square root of the number of vectors)
+        :param nprobe: int, number of clusters scanned per query, higher is slower and more accurate
+        :param min_train_size: int, below this number of vectors searches are exact
+        :param block_size: int, number of vectors assigned or scored at once
+        """
+        super().__init__(metric=metric, model_name=model_name, block_size=block_size)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.centroids = None
+        self.assignments = None
+        self._trained_size = 0
+
+    def _options(self):
+        return {"nlist": self.nlist, "nprobe": self.nprobe, "min_train_size": self.min_train_size, "block_size": self.block_size}
+
+    def _assign(self, vectors):
+        assignments = np.empty(len(vectors), dtype=np.intp)
+        for start in range(0, len(vectors), self.block_size):
+            block = vectors[start:start + self.block_size]
+            if self.metric == "cosine":
+                assignments[start:start + self.block_size] = (block @ self.centroids.T).argmax(axis=1)
+            else:
+                distances = (self.centroids ** 2).sum(axis=1)[None, :] - 2 * block @ self.centroids.T
+                assignments[start:start + self.block_size] = distances.argmin(axis=1)
+        return assignments
+
+    def train(self, iterations=10, seed=0):
+        """Cluster the indexed vectors with k-means."""
+        rng = np.random.default_rng(seed)
+        nlist = min(self.nlist or max(1, int(np.sqrt(len(self.vectors)))), len(self.vectors))
+        self.centroids = self.vectors[rng.choice(len(self.vectors), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            self.assignments = self._assign(self.vectors)
+            sums = np.zeros_like(self.centroids)
+            np.add.at(sums, self.assignments, self.vectors)
+            counts = np.bincount(self.assignments, minlength=nlist)
+            filled = counts > 0
+            self.centroids[filled] = sums[filled] / counts[filled, None]
+            if self.metric == "cosine":
+                self.centroids /= np.maximum(np.linalg.norm(self.centroids, axis=1, keepdims=True), 1e-12)
+        self.assignments = self._assign(self.vectors)
+        self._trained_size = len(self.vectors)
+
+    def _add_vectors(self, vectors, positions):
+        super()._add_vectors(vectors, positions)
+        if self.centroids is not None:
+            self.assignments = np.concatenate([self.assignments, self._assign(vectors)])
+
+    def _update_vectors(self, vectors, positions):
+        super()._update_vectors(vectors, positions)
+        if self.centroids is not None:
+            self.assignments[positions] = self._assign(vectors)
+
+    def _search(self, queries, top_k):
+        # Ranking every document (top_k None) needs every row anyway, clustering would only leave some out
+        if len(self.vectors) < self.min_train_size or top_k >= len(self.vectors):
+            return super()._search(queries, top_k)
+        # Clusters drift as vectors are added, retrain once the index has doubled
+        if self.centroids is None or len(self.vectors) >= 2 * self._trained_size:
+            self.train()
+
+        if self.metric == "cosine":
+            closeness = queries @ self.centroids.T
+        else:
+            closeness = 2 * queries @ self.centroids.T - (self.centroids ** 2).sum(axis=1)[None, :]
+        probes = np.argsort(-closeness, axis=1)
+        nprobe = self.nprobe
+        while True:
+            rows = np.flatnonzero(np.isin(self.assignments, np.unique(probes[:, :nprobe])))
+            # Probe more clusters until they hold at least top_k vectors
+            if len(rows) >= top_k or nprobe >= len(self.centroids):
+                break
+            nprobe *= 2
+        return self._search_rows(queries, rows, min(top_k, len(rows)))
+
+    def _save_vectors(self, path):
+        super()._save_vectors(path)
+        if self.centroids is not None:
+            np.save(os.path.join(path, "centroids.npy"), self.centroids)
+            np.save(os.path.join(path, "assignments.npy"), self.assignments)
+
+    def _load_vectors(self, path):
+        super()._load_vectors(path)
+        centroids_path = os.path.join(path, "centroids.npy")
+        if os.path.exists(centroids_path):
+            self.centroids = np.load(centroids_path)
+            self.assignments = np.load(os.path.join(path, "assignments.npy"))
+            self._trained_size = len(self.assignments)
+
+
+# Hierarchical navigable small world graph, requires the optional hnswlib package
+class HNSWIndex(BaseVectorIndex):
+    index_type = "hnsw"
+
+    def __init__(self, metric="cosine", model_name=None, M=16, ef_construction=200, ef=64, **kwargs):
+        """
+        :param M: int, number of graph neighbors per vector
+        :param ef_construction: int, candidate list size while inserting
+        :param ef: int, candidate list size while searching, higher is slower and more accurate
+        """
+        import hnswlib  # Optional dependency, checked by make_vector_index
+
+        super().__init__(metric=metric, model_name=model_name)
+        self._hnswlib = hnswlib
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef = ef
+        self.graph = None
+
+    def _options(self):
+        return {"M": self.M, "ef_construction": self.ef_construction, "ef": self.ef}
+
+    def _space(self):
+        return "cosine" if self.metric == "cosine" else "l2"
+
+    def _add_vectors(self, vectors, positions):
+        if self.graph is None:
+            self.graph = self._hnswlib.Index(space=self._space(), dim=vectors.shape[1])
+            self.graph.init_index(max_elements=max(1024, len(vectors)), M=self.M, ef_construction=self.ef_construction)
+        needed = self.graph.get_current_count() + len(vectors)
+        if needed > self.graph.get_max_elements():
+            self.graph.resize_index(max(needed, 2 * self.graph.get_max_elements()))
+        self.graph.add_items(vectors, positions)
+
+    def _update_vectors(self, vectors, positions):
+        # Adding an existing label replaces its vector
+        self.graph.add_items(vectors, positions)
+
+    def _search(self, queries, top_k):
+        self.graph.set_ef(max(self.ef, top_k))
+        labels, distances = self.graph.knn_query(queries, k=top_k)
+        if self.metric == "cosine":
+            scores = 1 - distances
+        else:
+            scores = 1 / (1 + np.sqrt(np.maximum(distances, 0)))
+        # Keep each document's best score over all queries
+        best = {}
+        for label, score in zip(labels.ravel().tolist(), scores.ravel().tolist()):
+            best[label] = max(score, best.get(label, -np.inf))
+        ranked = sorted(best.items(), key=lambda item: -item[1])[:top_k]
+        return [label for label, _ in ranked], [score for _, score in ranked]
+
+    def _save_vectors(self, path):
+        if self.graph is not None:
+            self.graph.save_index(os.path.join(path, "hnsw.bin"))
+            with open(os.path.join(path, "hnsw.dim"), "w") as f:
+                f.write(str(self.graph.dim))
+
+    def _load_vectors(self, path):
+        graph_path = os.path.join(path, "hnsw.bin")
+        if os.path.exists(graph_path):
+            with open(os.path.join(path, "hnsw.dim"), "r") as f:
+                dim = int(f.read())
+            self.graph = self._hnswlib.Index(space=self._space(), dim=dim)
+            self.graph.load_index(graph_path, max_elements=max(1024, len(self.documents)))
+
+
+VECTOR_INDEX_TYPES = {
+    "exact": ExactIndex,
+    "ivf": IVFIndex,
+    "hnsw": HNSWIndex,
+}
+
+# Create an empty vector index
+def make_vector_index(index_type="exact", metric="cosine", model_name=None, **kwargs):
+    """Create a vector index by type ("exact", "ivf" or "hnsw"), falling back to "ivf" if hnswlib is not installed."""
+    if index_type not in VECTOR_INDEX_TYPES:
+        raise ValueError(f"Unknown vector index type: {index_type}")
+    if index_type == "hnsw":
+        try:
+            import hnswlib  # noqa: F401
+        except ImportError:
+            logging.getLogger("RUFUSLogger").warning("hnswlib is not installed, using an IVF index instead")
+            index_type = "ivf"
+    return VECTOR_INDEX_TYPES[index_type](metric=metric, model_name=model_name, **kwargs)
+
+# Load a vector index saved with BaseVectorIndex.save
+def load_vector_index(path):
+    with open(os.path.join(path, "index.json"), "r") as f:
+        meta = json.load(f)
+    return VECTOR_INDEX_TYPES[meta["index_type"]]._from_meta(path, meta)
@@ -1,4 +1,9 @@
-from .crawler import Crawler
+def __getattr__(name):
+    # The crawler pulls in aiohttp, lxml and the ranking stack, only import it when it is used
+    if name == "Crawler":
+        from .crawler import Crawler
+        return Crawler
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__ = [
     "Crawler"
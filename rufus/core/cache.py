@@ -0,0 +1,176 @@
+import os
+import sqlite3
+import time
+import zlib
+from email.utils import parsedate_to_datetime
+
+from rufus.core.urls import canonicalize_url
+
+# Parse a Cache-Control header into a dict of directives
+def parse_cache_control(value):
+    """Return Cache-Control directives as a dict, directives without a value map to True."""
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else True
+    return directives
+
+# Disk-backed HTTP response cache with conditional revalidation
+class HTTPCache:
+    def __init__(self, path="rufus_cache.sqlite", max_bytes=512 * 1024 * 1024, default_ttl=0):
+        """
+        Store response bodies (zlib compressed) in SQLite together with their validators, so that
+        refetching an unchanged page costs a 304 instead of a full download.
+
+        :param path: string, path of the SQLite database file
+        :param max_bytes: int, maximum total size of compressed bodies, least recently used entries are evicted beyond it
+        :param default_ttl: float, seconds a response without freshness information is served without revalidation
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._db = None
+        self.total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    # SQLite connection, opened on first use so that the cache can be used again after close()
+    @property
+    def _conn(self):
+        if self._db is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    url TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    charset TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    expires_at REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+            self._db.commit()
+        return self._db
+
+    @staticmethod
+    def key(url):
+        """Cache key of a URL: its canonical form, keeping every query parameter and the trailing slash."""
+        return canonicalize_url(url, drop_params=(), strip_trailing_slash=False)
+
+    def _expires_at(self, headers, now):
+        cache_control = parse_cache_control(headers.get("Cache-Control"))
+        if "no-cache" in cache_control:
+            return 0.0
+        for directive in ("s-maxage", "max-age"):
+            if directive in cache_control:
+                try:
+                    return now + max(0, int(cache_control[directive]))
+                except ValueError:
+                    return 0.0
+        if headers.get("Expires"):
+            try:
+                return parsedate_to_datetime(headers["Expires"]).timestamp()
+            except (TypeError, ValueError):
+                return 0.0
+        return now + self.default_ttl
+
+    def get(self, url):
+        """Return the cached entry for a URL as a dict, or None if it is not cached."""
+        row = self._conn.execute(
+            "SELECT body, charset, etag, last_modified, expires_at FROM responses WHERE url = ?",
+            (self.key(url),),
+        ).fetchone()
+        if row is None:
+            return None
+        body, charset, etag, last_modified, expires_at = row
+        return {
+            "body": zlib.decompress(body),
+            "charset": charset,
+            "etag": etag,
+            "last_modified": last_modified,
+            "expires_at": expires_at,
+        }
+
+    def is_fresh(self, entry):
+        """Check if a cached entry can be served without revalidation."""
+        return entry["expires_at"] > time.time()
+
+    def conditional_headers(self, entry):
+        """Request headers used to revalidate a cached entry."""
+        headers = {}
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url, body, charset, headers):
+        """Store a 200 response, honoring Cache-Control: no-store."""
+        if "no-store" in parse_cache_control(headers.get("Cache-Control")):
+            self.delete(url)
+            self._conn.commit()
+            return
+        now = time.time()
+        expires_at = self._expires_at(headers, now)
+        etag, last_modified = headers.get("ETag"), headers.get("Last-Modified")
+        if not etag and not last_modified and expires_at <= now:
+            # Nothing to revalidate with and never fresh, storing it would only waste space
+            self.delete(url)
+            self._conn.commit()
+            return
+
+        compressed = zlib.compress(body)
+        self.delete(url)
+        self._conn.execute(
+            "INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.key(url), compressed, charset, etag, last_modified, expires_at, len(compressed), now),
+        )
+        self.total_bytes += len(compressed)
+        self._evict()
+        self._conn.commit()
+
+    def refresh(self, url, headers):
+        """Update freshness and recency of an entry after a 304 Not Modified response."""
+        now = time.time()
+        self._conn.execute(
+            "UPDATE responses SET expires_at = ?, accessed_at = ? WHERE url = ?",
+            (self._expires_at(headers, now), now, self.key(url)),
+        )
+        self._conn.commit()
+
+    def touch(self, url):
+        """Mark an entry as recently used."""
+        self._conn.execute("UPDATE responses SET accessed_at = ? WHERE url = ?", (time.time(), self.key(url)))
+        self._conn.commit()
+
+    def delete(self, url):
+        row = self._conn.execute("SELECT size FROM responses WHERE url = ?", (self.key(url),)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM responses WHERE url = ?", (self.key(url),))
+            self.total_bytes -= row[0]
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        while self.total_bytes > self.max_bytes:
+            rows = self._conn.execute("SELECT url, size FROM responses ORDER BY accessed_at LIMIT 64").fetchall()
+            if not rows:
+                break
+            for url, size in rows:
+                self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self.total_bytes -= size
+                if self.total_bytes <= self.max_bytes:
+                    break
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        """Close the database, it is opened again on next use."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+# Progress of interrupted crawls, so that they can be resumed without refetching their pages
+class CheckpointStore:
+    def __init__(self, path="rufus_checkpoints.sqlite", interval=5.0):
+        """
+        Record every URL scheduled by a crawl, and the extracted document of every URL processed, in SQLite.
+
+        Writes are committed at most every `interval` seconds, so checkpointing costs one transaction per
+        interval rather than one per page. An interrupted crawl loses at most the last interval of progress.
+
+        :param path: string, path of the SQLite database file
+        :param interval: float, seconds between commits
+        """
+        self.path = path
+        self.interval = interval
+        self._db = None
+        self._last_commit = time.monotonic()
+
+    # SQLite connection, opened on first use so that the store can be used again after close()
+    @property
+    def _conn(self):
+        if self._db is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS urls (
+                    job TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    depth INTEGER NOT NULL,
+                    priority REAL,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    document TEXT,
+                    PRIMARY KEY (job, url)
+                )"""
+            )
+            self._db.commit()
+        return self._db
+
+    @staticmethod
+    def job_key(start_url, prompt):
+        """Key of a crawl job, jobs with the same start URL and prompt share their checkpoint."""
+        return hashlib.sha256(f"{start_url}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def job(self, start_url, prompt):
+        """Return the checkpoint of a crawl job."""
+        return CrawlCheckpoint(self, self.job_key(start_url, prompt))
+
+    def _write(self, query, params):
+        self._conn.execute(query, params)
+        if time.monotonic() - self._last_commit >= self.interval:
+            self.commit()
+
+    def commit(self):
+        self._conn.commit()
+        self._last_commit = time.monotonic()
+
+    def close(self):
+        """Commit pending writes and close the database, it is opened again on next use."""
+        if self._db is not None:
+            self.commit()
+            self._db.close()
+            self._db = None
+
+# Checkpoint of a single crawl job in a CheckpointStore
+class CrawlCheckpoint:
+    def __init__(self, store, job):
+        self.store = store
+        self.job = job
+
+    def scheduled(self, url, depth, priority=None):
+        """Record a URL pushed to the frontier."""
+        self.store._write(
+            "INSERT OR IGNORE INTO urls (job, url, depth, priority) VALUES (?, ?, ?, ?)",
+            (self.job, url, depth, priority),
+        )
+
+    def done(self, url, document=None):
+        """Record a processed URL with its document (None if it could not be fetched)."""
+        self.store._write(
+            "UPDATE urls SET done = 1, document = ? WHERE job = ? AND url = ?",
+            (json.dumps(document) if document is not None else None, self.job, url),
+        )
+
+    def load(self):
+        """
+        Return the saved progress as a dict with the "seeds" of the crawl, every "scheduled" URL, the "pending"
+        (url, depth, priority) tuples in scheduling order, the number of URLs "done" and their "documents",
+        or None if there is none.
+        """
+        rows = self.store._conn.execute(
+            "SELECT url, depth, priority, done, document FROM urls WHERE job = ? ORDER BY rowid",
+            (self.job,),
+        ).fetchall()
+        if not rows:
+            return None
+        return {
+            "seeds": [url for url, depth, _, _, _ in rows if depth == 0],
+            "scheduled": [url for url, _, _, _, _ in rows],
+            "pending": [(url, depth, priority) for url, depth, priority, done, _ in rows if not done],
+            "done": sum(1 for row in rows if row[3]),
+            "documents": [json.loads(document) for _, _, _, done, document in rows if done and document is not None],
+        }
+
+    def clear(self):
+        """Forget the progress of the job, once it is complete or restarted from scratch."""
+        self.store._conn.execute("DELETE FROM urls WHERE job = ?", (self.job,))
+        self.store.commit()
@@ -1,23 +1,135 @@
-import aiohttp
 import asyncio
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+import functools
+import numpy as np
 
-from rufus.core.extraction import extract_text
-from rufus.llms import generate_search_query
-from rufus.search_engines import get_search_results
-from rufus.content_rankers import rank_content
+from rufus.core.cache import HTTPCache
+from rufus.core.checkpoint import CheckpointStore
+from rufus.core.dedup import NearDuplicateDetector
+from rufus.core.executor import ParseExecutor
+from rufus.core.extraction import chunk_text, process_page
+from rufus.core.filters import SCOPES, LinkFilter
+from rufus.core.focus import LinkScorer
+from rufus.core.frontier import Frontier
+from rufus.core.robots import RobotsCache, sitemap_urls, url_origin
+from rufus.core.scheduler import HostScheduler
+from rufus.core.seen import make_seen_set
+from rufus.core.session import SessionManager
+from rufus.core.state import CrawlState, content_hash
+from rufus.core.urls import TRACKING_PARAMS, canonicalize_url
+from rufus.llms import agenerate_search_query
+from rufus.search_engines import aget_search_results
+from rufus.content_rankers import aindex_content, aquery_index, arank_content, arank_passages, ascore_content, ascore_passages, get_vector_index
+from rufus.content_rankers.embedding_cache import EmbeddingCache
 from rufus.utils import setup_logging, persistent_request, is_valid_url, is_url_online, format_results
 
+# Content types fetched as pages, responses of any other type are skipped before their body is downloaded
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
 class Crawler:
-    def __init__(self, max_depth=2, delay=1.5, log_file="rufus.log", log_level="DEBUG", headers=None, num_search_results=10, **kwargs):
-        self.url_tracker = set()
+    def __init__(self, max_depth=2, delay=1.5, log_file="rufus.log", log_level="DEBUG", headers=None, num_search_results=10, max_concurrency=10, max_pages=None, **kwargs):
+        # URLs are deduplicated on their canonical form, in a seen-set created for each crawl
+        self.seen_backend = kwargs.get("seen_backend", "memory")
+        self.canonicalize_urls = kwargs.get("canonicalize_urls", True)
+        self.drop_query_params = tuple(TRACKING_PARAMS) + tuple(kwargs.get("drop_query_params") or ())
+        self.url_tracker = make_seen_set(self.seen_backend) # Seen-set of the latest crawl
         self.max_depth = max_depth
-        self.request_delay = delay # Delay between consequtive requests in seconds
+        self.request_delay = delay # Base delay in seconds for exponential backoff between retries
         self.logger = setup_logging(log_file=log_file, level=log_level)
         self.headers = headers # Option to add headers to requests
         self.num_search_results = num_search_results
         self.timeout = kwargs.get("timeout", 5)
+        self.max_concurrency = max_concurrency # Number of worker coroutines fetching pages concurrently
+        self.max_pages = max_pages # Maximum number of pages fetched per crawl (None for unlimited)
+        # Optional focused crawl: links are followed best-first by their predicted relevance to the prompt
+        # and links scoring below focus_threshold are pruned, max_pages then counts fetched pages
+        self.focused = kwargs.get("focused", False)
+        self.focus_threshold = kwargs.get("focus_threshold", 0.1)
+        # Links are filtered before being scheduled: non-http(s) schemes are always dropped, link_scope (None,
+        # "host" or "subdomains") keeps the crawl on the seed sites, include/exclude_patterns are URL regexes
+        self.link_scope = kwargs.get("link_scope")
+        if self.link_scope not in SCOPES:
+            raise ValueError(f"Unsupported link scope: {self.link_scope}")
+        self.include_patterns = kwargs.get("include_patterns")
+        self.exclude_patterns = kwargs.get("exclude_patterns")
+        self.skip_binary = kwargs.get("skip_binary", True)
+        self.content_types = kwargs.get("content_types", HTML_CONTENT_TYPES)
+        self.max_bytes = kwargs.get("max_bytes", 10 * 1024 * 1024) # Bodies are streamed and cut at this size (None for unlimited)
+        # Optional robots.txt compliance, rules are fetched once per site and reused across crawls
+        self.robots = None
+        if kwargs.get("respect_robots", False):
+            self.robots = RobotsCache(
+                functools.partial(self._fetch_resource, raise_statuses=RobotsCache.DENIED_STATUSES),
+                user_agent=(headers or {}).get("User-Agent", "RUFUS"),
+                ttl=kwargs.get("robots_ttl", 3600),
+            )
+        # Optional frontier seeding from the sitemaps of the seed sites
+        self.use_sitemaps = kwargs.get("use_sitemaps", False)
+        self.max_sitemap_urls = kwargs.get("max_sitemap_urls", 1000)
+        self.scheduler = HostScheduler(
+            requests_per_second=kwargs.get("requests_per_second"),
+            burst=kwargs.get("burst", 1),
+            max_per_host=kwargs.get("max_per_host"),
+            max_total=kwargs.get("max_total_requests"),
+        )
+        self.sessions = SessionManager(
+            limit=kwargs.get("connection_limit", 100),
+            limit_per_host=kwargs.get("connection_limit_per_host", 10),
+            keepalive_timeout=kwargs.get("keepalive_timeout", 30),
+            ttl_dns_cache=kwargs.get("dns_cache_ttl", 300),
+        )
+        # Optional on-disk response cache, given as an HTTPCache or a path to its SQLite file
+        http_cache = kwargs.get("http_cache")
+        self._owns_http_cache = isinstance(http_cache, str)
+        if self._owns_http_cache:
+            http_cache = HTTPCache(
+                http_cache,
+                max_bytes=kwargs.get("http_cache_max_bytes", 512 * 1024 * 1024),
+                default_ttl=kwargs.get("http_cache_ttl", 0),
+            )
+        self.http_cache = http_cache
+        # Optional incremental recrawl state, given as a CrawlState or a path to its SQLite file: unchanged
+        # pages are not processed again and their embeddings are reused
+        crawl_state = kwargs.get("crawl_state")
+        self._owns_crawl_state = isinstance(crawl_state, str)
+        if self._owns_crawl_state:
+            crawl_state = CrawlState(crawl_state, recrawl_interval=kwargs.get("recrawl_interval", 0))
+        self.crawl_state = crawl_state
+        # Optional checkpoints of the frontier, seen-set and documents of running crawls, given as a
+        # CheckpointStore or a path to its SQLite file, so that interrupted crawls can be resumed
+        checkpoints = kwargs.get("checkpoint")
+        self._owns_checkpoints = isinstance(checkpoints, str)
+        if self._owns_checkpoints:
+            checkpoints = CheckpointStore(checkpoints, interval=kwargs.get("checkpoint_interval", 5.0))
+        self.checkpoints = checkpoints
+        # Optional pool ("process" or "thread") that decodes and parses pages while the event loop keeps fetching
+        self.executor = ParseExecutor(
+            mode=kwargs.get("parse_executor"),
+            max_workers=kwargs.get("parse_workers"),
+            logger=self.logger,
+        )
+        # Optional near-duplicate stage between extraction and ranking: None, "drop" or "cluster"
+        self.dedup = kwargs.get("dedup")
+        if self.dedup not in (None, "drop", "cluster"):
+            raise ValueError(f"Unsupported dedup mode: {self.dedup}")
+        self.dedup_threshold = kwargs.get("dedup_threshold", 0.9)
+        self.dedup_shingle_size = kwargs.get("dedup_shingle_size", 3)
+        # Optional passage ranking: pages are split into chunks of up to chunk_tokens words, scored separately
+        self.chunk_tokens = kwargs.get("chunk_tokens")
+        self.chunk_overlap = kwargs.get("chunk_overlap", 32)
+        if self.chunk_tokens and not 0 <= self.chunk_overlap < self.chunk_tokens:
+            raise ValueError(f"chunk_overlap must be between 0 and chunk_tokens - 1, got chunk_overlap={self.chunk_overlap} for chunk_tokens={self.chunk_tokens}")
+        self.passage_aggregation = kwargs.get("passage_aggregation", "max")
+        self.top_passages = kwargs.get("top_passages", 3)
+        # Optional vector index of crawled documents reused across prompts, given as a BaseVectorIndex or a directory
+        vector_index = kwargs.get("vector_index")
+        self.vector_index_path = vector_index if isinstance(vector_index, str) else None
+        if self.vector_index_path is not None:
+            vector_index = get_vector_index(
+                self.vector_index_path,
+                index_type=kwargs.get("vector_index_type", "exact"),
+                similarity_metric=kwargs.get("similarity_metric", "cosine"),
+            )
+        self.vector_index = vector_index
         
     # Asynchronous page fetch method 
     async def _fetch_page(self, url, session, retries=3):
@@ -28,7 +140,30 @@ class Crawler:
             delay=self.request_delay,
             logger=self.logger,
             headers=self.headers, 
-            timeout=self.timeout
+            timeout=self.timeout,
+            scheduler=self.scheduler,
+            raw=True,
+            cache=self.http_cache,
+            content_types=self.content_types,
+            max_bytes=self.max_bytes
+        )
+
+    # Fetch a site resource (robots.txt, sitemap) of any content type, without retries
+    # A missing resource means no restrictions or no sitemap, so 404/410 are not reported as errors
+    async def _fetch_resource(self, url, session, raise_statuses=()):
+        return await persistent_request(
+            url,
+            session=session,
+            retries=1,
+            logger=self.logger,
+            headers=self.headers,
+            timeout=self.timeout,
+            scheduler=self.scheduler,
+            raw=True,
+            cache=self.http_cache,
+            max_bytes=self.max_bytes,
+            missing_ok=True,
+            raise_statuses=raise_statuses
         )
     
     # Validate url
@@ -37,100 +172,430 @@ class Crawler:
         return is_valid_url(url)
     
     # Check if URL resource is available
-    async def _check_url_online(self, url):
+    async def _check_url_online(self, url, session=None):
         """Check if the URL is online"""
-        return await is_url_online(url)
+        return await is_url_online(url, timeout=self.timeout, session=session)
     
-    # Link fetching from existing HTML content
-    def _parse_links(self, soup, curr_url):
-        """Find all valid links and return a list of valid links on current page
+    # Link fetching from an already processed page
+    def _parse_links(self, page, seen, link_filter=None):
+        """Return the links found on a processed page that pass the link filter and have not been visited yet, as (link, key) pairs
         """
         links = []
-        for link in soup.find_all("a", href=True):
-            url = urljoin(curr_url, link["href"])
-            if url not in self.url_tracker:
-                links.append(url)
+        for link in page["links"]:
+            if link_filter is not None and not link_filter.allows(link["url"]):
+                continue
+            key = self._url_key(link["url"])
+            if key not in seen:
+                links.append((link, key))
         return links
     
-    async def _crawl(self, url, depth=0, session=None):
-        """Recursively crawl the given URL and follow links up to max_depth asynchronously."""
-        if depth > self.max_depth or url in self.url_tracker:
-            return []  # Base case: Stop if the maximum depth is reached or URL is visited
+    # Key identifying a URL in the seen-set
+    def _url_key(self, url):
+        if not self.canonicalize_urls:
+            return url
+        return canonicalize_url(url, drop_params=self.drop_query_params)
+
+    # Check robots.txt before scheduling a URL
+    async def _robots_allow(self, url, session):
+        if self.robots is None or await self.robots.can_fetch(url, session):
+            return True
+        self.logger.info(f"Disallowed by robots.txt: {url}")
+        return False
+
+    # Push a URL to the frontier unless it was already seen, recording it in the crawl's checkpoint
+    def _schedule(self, frontier, seen, url, depth, priority=None, checkpoint=None):
+        if not seen.add(self._url_key(url)):
+            return False
+        frontier.push(url, depth, priority=priority)
+        if checkpoint is not None:
+            checkpoint.scheduled(url, depth, priority)
+        return True
+    
+    # Fetch and process a page, reusing the page stored by an earlier crawl if it has not changed
+    async def _load_page(self, url, session):
+        """Return a (page, changed) tuple, with None as page if the URL could not be fetched."""
+        record = self.crawl_state.get(url) if self.crawl_state is not None else None
+        if record is not None and self.crawl_state.is_fresh(record):
+            self.logger.info(f"Reusing: {url}")
+            return record["page"], False
 
         self.logger.info(f"Crawling: {url}")
-        self.url_tracker.add(url)
-        
+        response = await self._fetch_page(url, session)
+        if response is None:
+            return None, False
+
+        # Single parse for text, links and metadata, raw bytes are decoded by the parser
+        body, charset = response
+        if self.crawl_state is None:
+            return await self.executor.run(process_page, body, url, charset), True
+        digest = content_hash(body)
+        if record is not None and record["content_hash"] == digest:
+            self.crawl_state.touch(url)
+            return record["page"], False
+        page = await self.executor.run(process_page, body, url, charset)
+        self.crawl_state.put(url, digest, page)
+        return page, True
+
+    # Worker coroutine consuming URLs from the crawl frontier
+    async def _worker(self, frontier, session, output, seen, scorer=None, link_filter=None, checkpoint=None):
+        """
+        Fetch URLs from the frontier until cancelled, scheduling newly found links and putting processed pages on the output queue.
+
+        Links are scheduled breadth-first, or best-first by their LinkScorer score if a scorer is given.
+        """
+        while True:
+            url, depth = await frontier.pop()
+            try:
+                page, changed = await self._load_page(url, session)
+                if page is None:
+                    if checkpoint is not None:
+                        checkpoint.done(url)
+                    continue
+
+                if depth < self.max_depth:
+                    page_score = scorer.score_page(page["text"]) if scorer is not None else None
+                    for link, key in self._parse_links(page, seen, link_filter):
+                        if frontier.is_full():
+                            break
+                        priority = None
+                        if scorer is not None:
+                            link_score = scorer.score_link(link, page_score)
+                            # Pruned links stay out of the seen-set, another page may link them with better evidence
+                            if link_score < self.focus_threshold:
+                                continue
+                            priority = -link_score
+                        if not await self._robots_allow(link["url"], session):
+                            continue
+                        self._schedule(frontier, seen, link["url"], depth + 1, priority, checkpoint)
+
+                result = {"url": url, "depth": depth, "text": page["text"], "metadata": page["metadata"]}
+                if self.crawl_state is not None:
+                    result["changed"] = changed
+                if checkpoint is not None:
+                    checkpoint.done(url, result)
+                await output.put(result)
+            except Exception as e:
+                self.logger.error(f"Error while crawling {url}: {e}")
+                if checkpoint is not None:
+                    checkpoint.done(url)
+            finally:
+                frontier.task_done()
+
+    async def _crawl_pages(self, urls, session=None, scorer=None, checkpoint=None, restored=None):
+        """
+        Crawl the given seed URLs breadth-first up to max_depth using a fixed pool of workers,
+        yielding each page as soon as it is processed. With a LinkScorer, the crawl is best-first instead.
+
+        Pages are handed over through a bounded queue, so workers pause while the consumer is busy
+        and memory use does not grow with the size of the crawl.
+
+        Progress is recorded in the CrawlCheckpoint if given. A crawl restored from a checkpoint (see
+        CrawlCheckpoint.load) first yields the documents it already had, then carries on with its pending URLs.
+        """
         if not session:
             raise ValueError("A session is required for asynchronous crawling.")
 
-        html_content = await self._fetch_page(url, session)
-        if html_content is None:
-            return []
-        
-        cleaned_text = extract_text(html_content)
+        frontier = Frontier(max_pages=self.max_pages, count_fetched=scorer is not None)
+        seen = make_seen_set(self.seen_backend)
+        self.url_tracker = seen
+        link_filter = LinkFilter(
+            urls,
+            scope=self.link_scope,
+            include=self.include_patterns,
+            exclude=self.exclude_patterns,
+            skip_binary=self.skip_binary,
+        )
+        if restored is not None:
+            for url in restored["scheduled"]:
+                seen.add(self._url_key(url))
+            for url, depth, priority in restored["pending"]:
+                frontier.push(url, depth, priority=priority)
+            frontier.scheduled = len(restored["scheduled"])
+            frontier.fetched = restored["done"]
+            for page in restored["documents"]:
+                yield page
+        else:
+            for url in urls:
+                if frontier.is_full():
+                    break
+                if await self._robots_allow(url, session):
+                    self._schedule(frontier, seen, url, 0, checkpoint=checkpoint)
+            if self.use_sitemaps and self.max_depth > 0:
+                await self._seed_from_sitemaps(urls, frontier, seen, session, scorer, link_filter, checkpoint)
 
-        soup = BeautifulSoup(html_content, "lxml")
-        data = [cleaned_text]
+        output = asyncio.Queue(maxsize=2 * self.max_concurrency)
+        done = object()
 
-        links = self._parse_links(soup, url)
-        tasks = [self._crawl(link, depth + 1, session) for link in links]
-        results = await asyncio.gather(*tasks)
-        
-        for result in results:
-            data.extend(result)
-        
-        return data
+        async def close_output():
+            await frontier.join()
+            await output.put(done)
+
+        tasks = [
+            asyncio.create_task(self._worker(frontier, session, output, seen, scorer=scorer, link_filter=link_filter, checkpoint=checkpoint))
+            for _ in range(self.max_concurrency)
+        ]
+        tasks.append(asyncio.create_task(close_output()))
+        try:
+            while True:
+                page = await output.get()
+                if page is done:
+                    break
+                yield page
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Schedule the pages listed in the sitemaps of the seed sites, one link away from their seed
+    async def _seed_from_sitemaps(self, urls, frontier, seen, session, scorer=None, link_filter=None, checkpoint=None):
+        for origin in dict.fromkeys(url_origin(url) for url in urls):
+            for url in await sitemap_urls(origin, self._fetch_resource, session=session, robots=self.robots, max_urls=self.max_sitemap_urls):
+                if frontier.is_full():
+                    return
+                if link_filter is not None and not link_filter.allows(url):
+                    continue
+                priority = -scorer.score_link({"url": url, "text": ""}) if scorer is not None else None
+                if await self._robots_allow(url, session):
+                    self._schedule(frontier, seen, url, 1, priority, checkpoint)
+
+    async def _crawl(self, urls, session=None):
+        """Crawl the given seed URLs and return the text of every page."""
+        return [page["text"] async for page in self._crawl_pages(urls, session=session)]
+
+    async def close(self):
+        """Release the shared HTTP session, its connection pool, the parse executor and the HTTP cache, crawl state and checkpoints it opened. Each is reopened if the crawler is used again."""
+        await self.sessions.close()
+        self.executor.shutdown()
+        if self._owns_http_cache:
+            self.http_cache.close()
+        if self._owns_crawl_state:
+            self.crawl_state.close()
+        if self._owns_checkpoints:
+            self.checkpoints.close()
+
+    # Keep embeddings next to the crawl state unless another embedding cache is configured
+    def _use_state_embeddings(self, kwargs):
+        if self.crawl_state is not None and kwargs.get("embedding_cache") is None:
+            kwargs["embedding_cache"] = self.crawl_state.embeddings_path
+
+    # Passages of a crawled page
+    def _chunk_page(self, page):
+        return chunk_text(page["text"], url=page["url"], max_tokens=self.chunk_tokens, overlap=self.chunk_overlap)
 
-    async def start_crawl(self, start_url, prompt, do_rank=True, structured_output=True, **kwargs):
-        """Start crawling the given URL asynchronously, ranking optional, then return documents."""
+    # Find the URLs to start crawling from, falling back to web search for invalid or offline URLs
+    async def _resolve_seeds(self, start_url, prompt, session, **kwargs):
         if not self._validate_url(start_url):
             self.logger.error(f"Invalid URL: {start_url}")
-            query = generate_search_query(prompt, start_url)
-            self.logger.info(f"Generated Google Search query: {query}")
-            search_results = get_search_results(query, self.num_search_results, **kwargs)
-            self.logger.info(f"Using Google search results: {search_results}")
+        elif not await self._check_url_online(start_url, session=session):
+            self.logger.error(f"URL is not online: {start_url}")
         else:
-            is_online = await self._check_url_online(start_url)
-            if not is_online:
-                self.logger.error(f"URL is not online: {start_url}")
-                query = generate_search_query(prompt, start_url)
-                self.logger.info(f"Generated Google Search query: {query}")
-                search_results = get_search_results(query, self.num_search_results, **kwargs)
-                self.logger.info(f"Using Google search results: {search_results}")
+            return [start_url]
+
+        query = await agenerate_search_query(prompt, start_url, **kwargs)
+        self.logger.info(f"Generated search query: {query}")
+        search_results = await aget_search_results(query, num_results=self.num_search_results, **kwargs)
+        self.logger.info(f"Using search results: {search_results}")
+        return search_results
+
+    async def iter_pages(self, start_url, prompt, session=None, resume=False, **kwargs):
+        """
+        Crawl from the given URL asynchronously, yielding each page as a dict with its url, depth, text and metadata.
+
+        With dedup set, pages whose text is a near-duplicate of an earlier page are either dropped ("drop")
+        or yielded with the URL of that page in "duplicate_of" ("cluster").
+        With focused set, links are followed in order of their predicted relevance to the prompt.
+        With a crawl state, pages also have a "changed" flag, False for pages unchanged since an earlier crawl.
+
+        With checkpoints, the crawl's progress is saved as it goes and, if resume is set, a crawl of the same
+        start URL and prompt that was interrupted is resumed: its documents are yielded again without
+        refetching them, then the URLs it had not processed yet are crawled.
+        """
+        if session is None:
+            session = await self.sessions.get_session()
+
+        detector = None
+        if self.dedup is not None:
+            detector = NearDuplicateDetector(threshold=self.dedup_threshold, shingle_size=self.dedup_shingle_size)
+
+        scorer = None
+        if self.focused:
+            scorer = LinkScorer(prompt)
+            if not scorer.terms:
+                self.logger.warning("Prompt has no terms to focus the crawl on, crawling breadth-first")
+                scorer = None
+
+        checkpoint = restored = None
+        if self.checkpoints is not None:
+            checkpoint = self.checkpoints.job(start_url, prompt)
+            if resume:
+                restored = checkpoint.load()
             else:
-                search_results = [start_url]
-        
-        # Crawling function with semaphore
-        async def crawl_with_semaphore(url, session):
-            """Helper function to perform crawl with sempahore"""
-            async with semaphore:
-                return await self._crawl(url, session=session, depth=0)
-        
-        search_data = []
-        max_concurrent_tasks = 10 # Maximum number of concurrent tasks
-        semaphore = asyncio.Semaphore(max_concurrent_tasks)
-        
-        # Start crawling the available URLS in search results    
-        async with aiohttp.ClientSession() as session:
-            tasks = [
-                crawl_with_semaphore(url, session)
-                for url in search_results
-            ]
-            
-            results = await asyncio.gather(*tasks)
-        
-        # Extend search_data with results
-        for result in results:
-            if result:
-                search_data.extend(result)
+                checkpoint.clear()
+        elif resume:
+            self.logger.warning("No checkpoint configured, set the checkpoint option to resume crawls")
+
+        if restored is not None:
+            self.logger.info(
+                f"Resuming crawl of {start_url}: {len(restored['documents'])} documents restored, {len(restored['pending'])} URLs pending"
+            )
+            search_results = restored["seeds"]
+        else:
+            search_results = await self._resolve_seeds(start_url, prompt, session, **kwargs)
+        completed = False
+        try:
+            async for page in self._crawl_pages(search_results, session=session, scorer=scorer, checkpoint=checkpoint, restored=restored):
+                if detector is not None:
+                    duplicate_of = detector.add(page["url"], page["text"])
+                    if duplicate_of is not None:
+                        if self.dedup == "drop":
+                            self.logger.info(f"Dropping {page['url']}, near-duplicate of {duplicate_of}")
+                            continue
+                        page["duplicate_of"] = duplicate_of
+                yield page
+            completed = True
+        finally:
+            # A complete crawl has nothing left to resume, an interrupted one saves its latest progress
+            if checkpoint is not None:
+                if completed:
+                    checkpoint.clear()
+                else:
+                    self.checkpoints.commit()
+
+    async def astream(self, start_url, prompt, do_rank=False, rank_batch_size=8, session=None, **kwargs):
+        """
+        Crawl from the given URL asynchronously, yielding pages as soon as they are processed.
+
+        If do_rank is set, pages are ranked incrementally in batches of up to rank_batch_size and yielded with
+        their "rank_score". The prompt is embedded once per stream, so scores are comparable across batches.
+        Near-duplicates are not embedded, they share the score of the page they duplicate.
+        With chunk_tokens set, pages are scored through their passages and also yielded with their top "passages".
+        """
+        self._use_state_embeddings(kwargs)
+        top_passages = kwargs.pop("top_passages", self.top_passages)
+        pages = self.iter_pages(start_url, prompt, session=session, **kwargs)
+        if not do_rank:
+            async for page in pages:
+                yield page
+            return
+
+        if kwargs.get("embedding_cache") is None:
+            kwargs["embedding_cache"] = EmbeddingCache()
+
+        batch = []
+        scores_by_url = {}
+        async def score(batch):
+            originals = [page for page in batch if "duplicate_of" not in page]
+            try:
+                if not originals:
+                    scores = []
+                elif self.chunk_tokens:
+                    passages = [self._chunk_page(page) for page in originals]
+                    scores, passage_scores = await ascore_passages(prompt, passages, aggregation=self.passage_aggregation, **kwargs)
+                    for page, page_passages, page_scores in zip(originals, passages, passage_scores):
+                        page["passages"] = self._top_passages(page_passages, page_scores, top_passages)
+                else:
+                    scores = await ascore_content(prompt, [page["text"] for page in originals], **kwargs)
+            except RuntimeError as e:
+                self.logger.error(f"Ranking failed, yielding unranked pages: {e}")
+                scores = [None] * len(originals)
+            for page, rank_score in zip(originals, scores):
+                # Pages that could not be embedded are yielded without a score
+                page["rank_score"] = None if rank_score is None or np.isnan(rank_score) else rank_score
+                scores_by_url[page["url"]] = page["rank_score"]
+            for page in batch:
+                if "duplicate_of" in page:
+                    page["rank_score"] = scores_by_url.get(page["duplicate_of"])
+            return batch
+
+        async for page in pages:
+            batch.append(page)
+            if len(batch) >= rank_batch_size:
+                for ranked_page in await score(batch):
+                    yield ranked_page
+                batch = []
+        if batch:
+            for ranked_page in await score(batch):
+                yield ranked_page
+
+    # Best scored passages of a page, as dicts with their text, offsets and "rank_score"
+    def _top_passages(self, passages, scores, top_passages):
+        ranked = sorted((i for i in range(len(passages)) if not np.isnan(scores[i])), key=lambda i: -scores[i])
+        return [{**passages[i], "rank_score": scores[i]} for i in ranked[:top_passages]]
+
+    # Add crawled documents to the vector index, saving it if it is stored on disk
+    async def _index_documents(self, documents, **kwargs):
+        await aindex_content([{"url": page["url"], "text": page["text"]} for page in documents], self.vector_index, **kwargs)
+        if self.vector_index_path is not None:
+            self.vector_index.save(self.vector_index_path)
+
+    async def query_index(self, prompt, structured_output=True, **kwargs):
+        """
+        Rank the documents of the vector index against a prompt without crawling, only the prompt is embedded.
+        Pass top_k to return only the best documents.
+        """
+        if self.vector_index is None:
+            raise ValueError("No vector index configured, set the vector_index option")
+        ranked = await aquery_index(prompt, self.vector_index, **kwargs)
+        if not structured_output:
+            return [(document["text"], score) for document, score in ranked]
+        search_data = format_results([(document["text"], score) for document, score in ranked], prompt=prompt)
+        for result, (document, _) in zip(search_data["results"], ranked):
+            result["url"] = document.get("url")
+        return search_data
+
+    async def start_crawl(self, start_url, prompt, do_rank=True, structured_output=True, session=None, **kwargs):
+        """
+        Start crawling the given URL asynchronously, ranking optional, then return documents.
+
+        Fetches go through the crawler's shared, pooled session unless an aiohttp.ClientSession is provided.
+        Near-duplicate pages are never ranked, in "cluster" mode the structured results list the URLs of
+        each document's duplicates. With chunk_tokens set, documents are ranked by their passages and the
+        structured results include each document's top passages.
+
+        With a vector index, crawled documents are added to it and ranked through it. Only the documents of
+        this crawl are returned, documents indexed by earlier crawls are searched with query_index.
+
+        With a crawl state (incremental mode), pages unchanged since an earlier crawl are neither processed
+        nor embedded again, ranking reuses their stored embeddings and only embeds new or changed documents.
+        """
+        self._use_state_embeddings(kwargs)
+        pages = [page async for page in self.iter_pages(start_url, prompt, session=session, **kwargs)]
+        documents = [page for page in pages if "duplicate_of" not in page]
+        search_data = [page["text"] for page in documents]
         
+        extras = {page["text"]: {} for page in documents}
         if do_rank:
-            search_data = rank_content(ref_txt=[prompt]*len(search_data), candidate_txt=search_data, **kwargs)
+            try:
+                if self.vector_index is not None:
+                    await self._index_documents(documents, **kwargs)
+                    crawled = {page["url"] for page in documents}
+                    top_k = kwargs.pop("top_k", None)
+                    ranked = await aquery_index(prompt, self.vector_index, top_k=None, **kwargs)
+                    search_data = [(document["text"], score) for document, score in ranked if document.get("url") in crawled][:top_k]
+                elif self.chunk_tokens:
+                    ranked = await arank_passages(
+                        prompt,
+                        [self._chunk_page(page) for page in documents],
+                        aggregation=self.passage_aggregation,
+                        top_passages=kwargs.pop("top_passages", self.top_passages),
+                        **kwargs
+                    )
+                    search_data = [(documents[doc]["text"], score) for doc, score, _ in ranked]
+                    for doc, _, top_passages in ranked:
+                        extras[documents[doc]["text"]]["passages"] = [{**passage, "rank_score": score} for passage, score in top_passages]
+                else:
+                    search_data = await arank_content(ref_txt=prompt, candidate_txt=search_data, **kwargs)
+            except RuntimeError as e:
+                self.logger.error(f"Ranking failed, returning unranked documents: {e}")
         
         if structured_output:
-            search_data = format_results(search_data, start_url=start_url, prompt=prompt)
+            if self.dedup == "cluster":
+                duplicates = {}
+                for page in pages:
+                    if "duplicate_of" in page:
+                        duplicates.setdefault(page["duplicate_of"], []).append(page["url"])
+                for page in documents:
+                    extras[page["text"]].update(url=page["url"], duplicates=duplicates.get(page["url"], []))
+            search_data = format_results(search_data, start_url=start_url, prompt=prompt, extras=extras)
             
         return search_data
-    
-    
-        
\ No newline at end of file
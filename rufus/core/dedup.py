@@ -0,0 +1,82 @@
+import hashlib
+import re
+from collections import Counter
+
+import numpy as np
+
+_BIT_SHIFTS = np.arange(64, dtype=np.uint64)
+
+# 64-bit SimHash fingerprint of a text
+def simhash(text, shingle_size=3):
+    """
+    Compute the SimHash of a text from its word shingles. Near-identical texts get fingerprints
+    that differ in few bits.
+
+    :param text: string, text to fingerprint
+    :param shingle_size: int, number of consecutive words per shingle
+    """
+    tokens = re.findall(r"\w+", text.lower())
+    if len(tokens) > shingle_size:
+        shingles = Counter(" ".join(tokens[i:i + shingle_size]) for i in range(len(tokens) - shingle_size + 1))
+    else:
+        shingles = Counter(tokens)
+    if not shingles:
+        return 0
+
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little") for shingle in shingles],
+        dtype=np.uint64,
+    )
+    weights = np.array(list(shingles.values()), dtype=np.int64)
+    bits = ((hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)).astype(np.int64)
+    votes = weights @ (2 * bits - 1)
+    return int(np.sum(np.left_shift(np.uint64(1), _BIT_SHIFTS[votes > 0])))
+
+def hamming_distance(a, b):
+    return (a ^ b).bit_count()
+
+# Near-duplicate detector using SimHash fingerprints indexed by LSH bands
+class NearDuplicateDetector:
+    def __init__(self, threshold=0.9, shingle_size=3):
+        """
+        Two texts are near-duplicates when their fingerprints agree on at least `threshold` of their 64 bits.
+
+        Fingerprints are split into max_distance + 1 bands, so any near-duplicate shares at least one
+        band exactly with the text it duplicates, and only texts sharing a band are compared.
+
+        :param threshold: float, similarity in [0, 1] above which texts are near-duplicates
+        :param shingle_size: int, number of consecutive words per shingle
+        """
+        if not 0 <= threshold <= 1:
+            raise ValueError(f"Similarity threshold must be between 0 and 1, got {threshold}")
+        self.shingle_size = shingle_size
+        self.max_distance = int((1 - threshold) * 64)
+        num_bands = min(64, self.max_distance + 1)
+        edges = np.linspace(0, 64, num_bands + 1).astype(int).tolist()
+        self._bands = [((1 << (end - start)) - 1, start) for start, end in zip(edges[:-1], edges[1:])]
+        self._index = [{} for _ in self._bands]
+        self._fingerprints = []
+        self._keys = []
+
+    def add(self, key, text):
+        """
+        Fingerprint a text, returning the key of an earlier near-duplicate, or None if the text is new
+        (in which case it is indexed under `key`).
+        """
+        fingerprint = simhash(text, self.shingle_size)
+        band_values = [(fingerprint >> shift) & mask for mask, shift in self._bands]
+
+        for index, value in zip(self._index, band_values):
+            for candidate in index.get(value, ()):
+                if hamming_distance(fingerprint, self._fingerprints[candidate]) <= self.max_distance:
+                    return self._keys[candidate]
+
+        doc_id = len(self._fingerprints)
+        self._fingerprints.append(fingerprint)
+        self._keys.append(key)
+        for index, value in zip(self._index, band_values):
+            index.setdefault(value, []).append(doc_id)
+        return None
+
+    def __len__(self):
+        return len(self._fingerprints)
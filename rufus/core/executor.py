@@ -0,0 +1,52 @@
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Runs CPU-bound page processing off the event loop
+class ParseExecutor:
+    def __init__(self, mode=None, max_workers=None, logger=None):
+        """
+        :param mode: string, "process" for a process pool, "thread" for a thread pool, None to run inline on the event loop
+        :param max_workers: int, number of pool workers (defaults to the executor's own default, based on CPU count)
+        :param logger: logging.Logger, logger used to report pool fallbacks
+        """
+        if mode not in (None, "process", "thread"):
+            raise ValueError(f"Unknown parse executor mode: {mode}")
+        self.mode = mode
+        self.max_workers = max_workers
+        self.logger = logger or logging.getLogger("RUFUSLogger")
+        self._pool = None
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.mode == "process":
+                try:
+                    self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+                except (OSError, NotImplementedError, ImportError) as e:
+                    # Some platforms and sandboxes cannot spawn worker processes
+                    self.logger.warning(f"Process pool unavailable, falling back to threads: {e}")
+                    self.mode = "thread"
+            if self.mode == "thread":
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    async def run(self, func, *args):
+        """Run func(*args) in the pool and return its result without blocking the event loop."""
+        if self.mode is None:
+            return func(*args)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_pool(), func, *args)
+        except BrokenProcessPool as e:
+            self.logger.warning(f"Process pool broke, falling back to threads: {e}")
+            self.shutdown()
+            self.mode = "thread"
+            return await loop.run_in_executor(self._get_pool(), func, *args)
+
+    def shutdown(self):
+        """Shut down the worker pool, a new one is started on the next run."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -1,18 +1,147 @@
-from bs4 import BeautifulSoup
+import codecs
 import re
+from urllib.parse import urljoin
+
+import lxml.html
+from lxml import etree
+
+# Tags whose content is boilerplate rather than page text
+REMOVED_TAGS = ['style', 'script', 'nav', 'aside', 'footer', 'header']
+
+# Block elements whose text describes the links they contain
+CONTEXT_TAGS = {'p', 'li', 'td', 'th', 'dd', 'dt', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'figcaption', 'caption'}
+
+META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.IGNORECASE)
+
+def _clean_whitespace(text):
+    return re.sub(r'\s+', " ", text).strip()
+
+# Guess the charset of raw HTML from its first bytes
+def sniff_charset(head):
+    """Return the charset given by a BOM or a <meta> tag in the first bytes of a document, None if there is neither."""
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    match = META_CHARSET.search(head[:2048])
+    return match.group(1).decode("ascii", "ignore") if match else None
+
+def _decode(body, encoding=None):
+    """Decode raw HTML using the declared encoding, a BOM or a <meta> charset, falling back to UTF-8."""
+    if encoding is None:
+        encoding = sniff_charset(body) or "utf-8"
+    try:
+        return body.decode(encoding, errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+def _link_context(anchor, max_chars=300):
+    """Text of the closest enclosing block (paragraph, list item, cell...) of a link, empty if there is none nearby."""
+    element = anchor.getparent()
+    for _ in range(3):
+        if element is None:
+            break
+        if element.tag in CONTEXT_TAGS:
+            return _clean_whitespace(element.text_content())[:max_chars]
+        element = element.getparent()
+    return ""
+
+def _parse_html(html_data):
+    try:
+        return lxml.html.fromstring(html_data)
+    except ValueError:
+        # lxml refuses str input that carries an XML encoding declaration
+        return lxml.html.fromstring(html_data.encode("utf-8"))
+    except etree.ParserError:
+        return None
+
+# Parse a fetched page once and return its cleaned text, outgoing links and metadata
+def process_page(html_data, url=None, encoding=None):
+    """
+    Process raw HTML in a single lxml parse.
+
+    Accepts undecoded bytes so that decoding and parsing can both run in a worker process.
+
+    :param html_data: string or bytes, raw HTML of the page
+    :param url: string, URL the page was fetched from, used to resolve relative links
+    :param encoding: string, charset of `html_data` if given as bytes (sniffed from the document if None)
+    :return: dict with the page "url", cleaned "text", outgoing "links" (each a dict with the
+        absolute "url", anchor "text" and surrounding "context" text) and "metadata" (title, description,
+        language, canonical URL)
+    """
+    page = {"url": url, "text": "", "links": [], "metadata": {}}
+    if isinstance(html_data, bytes):
+        html_data = _decode(html_data, encoding)
+    doc = _parse_html(html_data) if html_data else None
+    if doc is None:
+        return page
+
+    base_url = url
+    base = doc.find(".//base[@href]")
+    if base is not None:
+        base_url = urljoin(url or "", base.get("href").strip())
+
+    # Links are collected before boilerplate removal, navigation menus are still worth following
+    for anchor in doc.iter("a"):
+        href = anchor.get("href")
+        if not href:
+            continue
+        page["links"].append({
+            "url": urljoin(base_url, href.strip()) if base_url else href.strip(),
+            "text": _clean_whitespace(anchor.text_content()),
+            "context": _link_context(anchor),
+        })
+
+    title = doc.find(".//title")
+    description = doc.find(".//meta[@name='description']")
+    canonical = doc.find(".//link[@rel='canonical']")
+    page["metadata"] = {
+        "title": _clean_whitespace(title.text_content()) if title is not None else None,
+        "description": description.get("content") if description is not None else None,
+        "language": doc.getroottree().getroot().get("lang"),
+        "canonical": urljoin(base_url or "", canonical.get("href", "")) if canonical is not None else None,
+    }
+
+    # Remove all unnecesary tags from the tree
+    if doc.tag in REMOVED_TAGS:
+        return page
+    for element in list(doc.iter(*REMOVED_TAGS)):
+        element.drop_tree()
+
+    page["text"] = _clean_whitespace(" ".join(doc.itertext()))
+    return page
 
 # Extract text from HTML data and return cleaned version
 def extract_text(html_data):
-    soup = BeautifulSoup(html_data, "html.parser")
-    
-    # Remove all unnecesary tags from soup
-    for data in soup(['style','script','nav','aside','footer','header']):
-        data.decompose()
-    
-    cleaned_txt = re.sub(r'\s+'," ",soup.get_text(separator=" "))
-    return cleaned_txt.strip()
+    return process_page(html_data)["text"]
+
+# Split page text into overlapping passages of bounded length
+def chunk_text(text, url=None, max_tokens=256, overlap=32):
+    """
+    Split text into passages of at most max_tokens whitespace-separated tokens, consecutive passages
+    sharing `overlap` tokens so that a sentence cut at a boundary is still whole in one of them.
+
+    Tokens are words, which embedding models split into roughly 1.3 subword tokens on average.
+
+    :param text: string, cleaned page text
+    :param url: string, URL of the page the text comes from
+    :param max_tokens: int, maximum number of tokens per passage
+    :param overlap: int, number of tokens shared by consecutive passages
+    :return: list of dicts with the source "url", passage "text" and its "start" and "end" character offsets in text
+    """
+    if max_tokens < 1 or not 0 <= overlap < max_tokens:
+        raise ValueError(f"Invalid chunking parameters: max_tokens={max_tokens}, overlap={overlap}")
+
+    spans = [match.span() for match in re.finditer(r"\S+", text)]
+    passages = []
+    for first in range(0, len(spans), max_tokens - overlap):
+        last = min(first + max_tokens, len(spans)) - 1
+        start, end = spans[first][0], spans[last][1]
+        passages.append({"url": url, "text": text[start:end], "start": start, "end": end})
+        if last == len(spans) - 1:
+            break
+    return passages
 
 # Methods to implement:
 # Extract data from tabular and embedded data, if better than HTML text extraction
 # Extract information about images (descriptions, metadata, etc)
-
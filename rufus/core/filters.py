@@ -0,0 +1,63 @@
+import posixpath
+import re
+from urllib.parse import urlsplit
+
+# File extensions of resources that are never worth fetching as text
+BINARY_EXTENSIONS = frozenset("""
+7z apk avi bin bmp bz2 csv dmg doc docx eot exe flac gif gz ico iso jar jpeg jpg m4a m4v mkv mov mp3 mp4 mpeg msi
+odp ods odt ogg otf pdf png ppt pptx psd rar rss svg tar tgz tif tiff ttf wav webm webp wmv woff woff2 xls xlsx xz zip
+""".split())
+
+# Link scopes relative to the hosts of the seed URLs
+SCOPES = (None, "host", "subdomains")
+
+# Host a URL belongs to, without the "www." prefix so that both spellings are one site
+def _site(host):
+    host = (host or "").lower().rstrip(".")
+    return host[4:] if host.startswith("www.") else host
+
+# Decide which discovered links are worth fetching, before any request is made
+class LinkFilter:
+    def __init__(self, seeds=(), scope=None, include=None, exclude=None, skip_binary=True):
+        """
+        Links are rejected if they are not http(s), point outside the crawl scope, do not match any
+        include pattern, match an exclude pattern or, with skip_binary, end with a binary file extension.
+
+        :param seeds: list of strings, seed URLs whose hosts define the scope
+        :param scope: string, None to follow links to any host, "host" to stay on the seed hosts,
+            "subdomains" to also follow links to their subdomains
+        :param include: list of regular expressions, URLs must match one of them (None to accept all)
+        :param exclude: list of regular expressions, URLs matching any of them are rejected
+        :param skip_binary: boolean, whether to reject URLs of images, archives, documents, media...
+        """
+        if scope not in SCOPES:
+            raise ValueError(f"Unsupported link scope: {scope}")
+        self.scope = scope
+        self.hosts = {_site(urlsplit(url).hostname) for url in seeds}
+        self.include = [re.compile(pattern) for pattern in include] if include else None
+        self.exclude = [re.compile(pattern) for pattern in exclude or ()]
+        self.skip_binary = skip_binary
+
+    def in_scope(self, host):
+        """Check if a host is within the crawl scope."""
+        if self.scope is None:
+            return True
+        host = _site(host)
+        if host in self.hosts:
+            return True
+        return self.scope == "subdomains" and any(host.endswith("." + seed) for seed in self.hosts)
+
+    def allows(self, url):
+        """Check if a link should be followed."""
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            return False
+        if not self.in_scope(parts.hostname):
+            return False
+        if self.skip_binary:
+            extension = posixpath.splitext(parts.path)[1][1:].lower()
+            if extension in BINARY_EXTENSIONS:
+                return False
+        if self.include is not None and not any(pattern.search(url) for pattern in self.include):
+            return False
+        return not any(pattern.search(url) for pattern in self.exclude)
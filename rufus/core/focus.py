@@ -0,0 +1,63 @@
+import re
+from urllib.parse import unquote, urlsplit
+
+# Words too common to say anything about relevance
+STOPWORDS = frozenset("""
+a about above after all also an and any are as at be been but by can could did do does for from had has have
+how i if in into is it its list me more most my no not of on or our out over so some such than that the their
+them then there these they this those to up us was we were what when where which who why will with would you your
+""".split())
+
+def tokenize(text):
+    """Lowercased words of a text without stopwords, with a naive plural stemming."""
+    tokens = []
+    for token in re.findall(r"[^\W_]+", text.lower()):
+        if token in STOPWORDS or len(token) < 2:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+# Cheap relevance estimate of links and pages against the crawl prompt, computed without fetching anything
+class LinkScorer:
+    # Weights of the link's own evidence, they sum to 1
+    anchor_weight = 0.5
+    url_weight = 0.3
+    context_weight = 0.2
+    # Share of the score inherited from the page the link was found on
+    page_weight = 0.3
+
+    def __init__(self, prompt):
+        """
+        Scores are the fraction of the prompt's terms found in each piece of evidence (anchor text,
+        URL path, text around the link), so they lie in [0, 1].
+
+        :param prompt: string, user prompt the crawl is focused on
+        """
+        self.terms = set(tokenize(prompt))
+
+    def _coverage(self, text):
+        if not self.terms or not text:
+            return 0.0
+        return len(self.terms.intersection(tokenize(text))) / len(self.terms)
+
+    def score_page(self, text):
+        """Fraction of the prompt's terms found in a page's text."""
+        return self._coverage(text)
+
+    def score_link(self, link, page_score=0.0):
+        """
+        Predict the relevance of a link before fetching it.
+
+        :param link: dict with the link "url", anchor "text" and optional "context", as returned by process_page
+        :param page_score: float, score of the page the link was found on
+        """
+        parts = urlsplit(link["url"])
+        url_text = unquote(f"{parts.path} {parts.query}")
+        link_score = (
+            self.anchor_weight * self._coverage(link.get("text", ""))
+            + self.url_weight * self._coverage(url_text)
+            + self.context_weight * self._coverage(link.get("context", ""))
+        )
+        return (1 - self.page_weight) * link_score + self.page_weight * page_score
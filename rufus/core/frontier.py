@@ -0,0 +1,58 @@
+import asyncio
+import itertools
+
+# Crawl frontier shared by the crawler's worker pool
+class Frontier:
+    def __init__(self, max_pages=None, count_fetched=False):
+        """
+        Priority queue of URLs waiting to be crawled.
+
+        Entries are ordered by priority, then by insertion order, so pushing with the
+        URL depth as priority gives a breadth-first crawl.
+
+        :param max_pages: int, maximum number of URLs that will ever be scheduled (None for unlimited)
+        :param count_fetched: boolean, whether max_pages limits the URLs popped for fetching instead of the
+            URLs scheduled, so that a budget spent in priority order is not used up by the first links found
+        """
+        self.max_pages = max_pages
+        self.count_fetched = count_fetched
+        self.scheduled = 0
+        self.fetched = 0
+        self._queue = asyncio.PriorityQueue()
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return self._queue.qsize()
+
+    def is_full(self):
+        """Check if the page budget has been used up."""
+        used = self.fetched if self.count_fetched else self.scheduled
+        return self.max_pages is not None and used >= self.max_pages
+
+    def push(self, url, depth, priority=None):
+        """Schedule a URL for crawling, returns False if the page budget is exhausted."""
+        if self.is_full():
+            return False
+        if priority is None:
+            priority = depth
+        self._queue.put_nowait((priority, next(self._counter), url, depth))
+        self.scheduled += 1
+        return True
+
+    async def pop(self):
+        """Wait for the next URL to crawl and return it as a (url, depth) tuple."""
+        while True:
+            _, _, url, depth = await self._queue.get()
+            if not (self.count_fetched and self.is_full()):
+                break
+            # Budget spent, the remaining URLs are discarded
+            self._queue.task_done()
+        self.fetched += 1
+        return url, depth
+
+    def task_done(self):
+        self._queue.task_done()
+
+    async def join(self):
+        """Wait until every scheduled URL has been processed."""
+        await self._queue.join()
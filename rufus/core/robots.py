@@ -0,0 +1,141 @@
+import asyncio
+import gzip
+import logging
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+from lxml import etree
+
+from rufus.utils import TTLCache
+
+# Origin (scheme and host) of a URL, robots.txt and sitemaps apply to a whole origin
+def url_origin(url):
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+# robots.txt rules of the crawled sites, fetched once per origin
+class RobotsCache:
+    # Responses denying access to robots.txt itself, the whole site is then off limits
+    DENIED_STATUSES = (401, 403)
+
+    def __init__(self, fetch, user_agent="RUFUS", ttl=3600, max_items=1024):
+        """
+        Sites whose robots.txt cannot be fetched (e.g. missing) are crawled without restrictions, sites
+        answering 401 or 403 for it are not crawled at all, as conventional crawlers do.
+
+        :param fetch: coroutine function taking a URL and an aiohttp.ClientSession and returning a (bytes, charset) tuple, None on failure, raising aiohttp.ClientResponseError for DENIED_STATUSES
+        :param user_agent: string, user agent the rules are matched against
+        :param ttl: float, seconds a robots.txt is reused before being fetched again
+        :param max_items: int, maximum number of origins kept in the cache
+        """
+        self.fetch = fetch
+        self.user_agent = user_agent
+        self._parsers = TTLCache(ttl=ttl, max_items=max_items)
+        self._pending = {}
+
+    async def _load(self, origin, session):
+        parser = RobotFileParser(origin + "/robots.txt")
+        try:
+            response = await self.fetch(origin + "/robots.txt", session)
+        except aiohttp.ClientResponseError as e:
+            if e.status not in self.DENIED_STATUSES:
+                raise
+            logging.getLogger("RUFUSLogger").info(f"robots.txt of {origin} answered {e.status}, not crawling the site")
+            parser.disallow_all = True
+            response = None
+        if response is None:
+            parser.parse([])
+        else:
+            body, charset = response
+            parser.parse(body.decode(charset or "utf-8", errors="replace").splitlines())
+        self._parsers.put(origin, parser)
+        return parser
+
+    async def get(self, url, session=None):
+        """Return the parsed robots.txt of a URL's origin, fetching it if needed."""
+        origin = url_origin(url)
+        parser = self._parsers.get(origin)
+        if parser is not None:
+            return parser
+        # Concurrent workers hitting a new site share a single robots.txt request
+        task = self._pending.get(origin)
+        if task is None:
+            task = self._pending[origin] = asyncio.ensure_future(self._load(origin, session))
+            task.add_done_callback(lambda _: self._pending.pop(origin, None))
+        return await asyncio.shield(task)
+
+    async def can_fetch(self, url, session=None):
+        """Check if robots.txt allows fetching a URL."""
+        parser = await self.get(url, session)
+        return parser.can_fetch(self.user_agent, url)
+
+    async def sitemaps(self, url, session=None):
+        """Sitemap URLs declared in the robots.txt of a URL's origin."""
+        parser = await self.get(url, session)
+        return parser.site_maps() or []
+
+# Extract page and nested sitemap URLs from a sitemap or sitemap index
+def parse_sitemap(body, base_url=None):
+    """
+    Parse a sitemap.xml (optionally gzipped), returning a (page_urls, sitemap_urls) tuple.
+
+    :param body: bytes, raw sitemap
+    :param base_url: string, URL of the sitemap, used to resolve relative locations
+    """
+    if body[:2] == b"\x1f\x8b":
+        try:
+            body = gzip.decompress(body)
+        except (OSError, EOFError):
+            return [], []
+    parser = etree.XMLParser(recover=True, resolve_entities=False, no_network=True)
+    try:
+        root = etree.fromstring(body, parser)
+    except etree.XMLSyntaxError:
+        return [], []
+    pages, sitemaps = [], []
+    if root is None:
+        return pages, sitemaps
+    for loc in root.iter("{*}loc"):
+        if not loc.text or not loc.text.strip():
+            continue
+        location = urljoin(base_url or "", loc.text.strip())
+        parent = loc.getparent()
+        if parent is not None and etree.QName(parent).localname == "sitemap":
+            sitemaps.append(location)
+        else:
+            pages.append(location)
+    return pages, sitemaps
+
+# Collect the page URLs listed in a site's sitemaps
+async def sitemap_urls(url, fetch, session=None, robots=None, max_urls=1000, max_sitemaps=10):
+    """
+    Read the sitemaps of a URL's origin, following sitemap indexes, and return the page URLs they list.
+
+    Sitemaps are taken from robots.txt if a RobotsCache is given and it declares any, /sitemap.xml otherwise.
+
+    :param url: string, any URL of the site
+    :param fetch: coroutine function taking a URL and an aiohttp.ClientSession and returning a (bytes, charset) tuple, None on failure
+    :param session: aiohttp.ClientSession passed to fetch
+    :param robots: RobotsCache, source of the sitemaps declared in robots.txt
+    :param max_urls: int, maximum number of page URLs returned
+    :param max_sitemaps: int, maximum number of sitemap files fetched
+    """
+    queue = await robots.sitemaps(url, session) if robots is not None else []
+    if not queue:
+        queue = [url_origin(url) + "/sitemap.xml"]
+    fetched = set()
+    pages = []
+    while queue and len(fetched) < max_sitemaps and len(pages) < max_urls:
+        sitemap = queue.pop(0)
+        if sitemap in fetched:
+            continue
+        fetched.add(sitemap)
+        response = await fetch(sitemap, session)
+        if response is None:
+            continue
+        found, nested = parse_sitemap(response[0], base_url=sitemap)
+        pages.extend(found[:max_urls - len(pages)])
+        queue.extend(nested)
+    logging.getLogger("RUFUSLogger").info(f"Found {len(pages)} URLs in {len(fetched)} sitemaps of {url_origin(url)}")
+    return pages
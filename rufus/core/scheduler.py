@@ -0,0 +1,92 @@
+import asyncio
+import contextlib
+import time
+from urllib.parse import urlparse
+
+# Token bucket that hands out reservations instead of blocking
+class TokenBucket:
+    def __init__(self, rate, capacity=1):
+        """
+        :param rate: float, tokens added per second
+        :param capacity: int, maximum number of tokens that can accumulate (burst size)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self):
+        """Take a token and return the number of seconds to wait before using it."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+
+class _HostState:
+    def __init__(self, requests_per_second, burst, max_per_host):
+        self.bucket = TokenBucket(requests_per_second, burst) if requests_per_second else None
+        self.semaphore = asyncio.Semaphore(max_per_host) if max_per_host else None
+        self.paused_until = 0.0
+
+
+# Per-host politeness scheduler shared by every fetch of a crawl
+class HostScheduler:
+    def __init__(self, requests_per_second=None, burst=1, max_per_host=None, max_total=None):
+        """
+        Rate-limit requests per host (netloc) so that many domains can be crawled at full speed
+        without hammering any single origin.
+
+        :param requests_per_second: float, sustained request rate allowed per host (None for unlimited)
+        :param burst: int, number of requests a host may receive back to back before rate limiting applies
+        :param max_per_host: int, maximum number of concurrent requests per host (None for unlimited)
+        :param max_total: int, maximum number of concurrent requests across all hosts and crawls (None for unlimited)
+        """
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_per_host = max_per_host
+        self.max_total = max_total
+        self._total = None
+        self._hosts = {}
+        self._loop = None
+
+    def _bind_loop(self):
+        """Create the semaphores for the running event loop, they cannot be shared with another loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Rate limits and pauses carry over, only the concurrency limits are recreated
+            self._total = asyncio.Semaphore(self.max_total) if self.max_total else None
+            for host in self._hosts.values():
+                host.semaphore = asyncio.Semaphore(self.max_per_host) if self.max_per_host else None
+            self._loop = loop
+
+    def _host(self, url):
+        netloc = urlparse(url).netloc.lower()
+        host = self._hosts.get(netloc)
+        if host is None:
+            host = _HostState(self.requests_per_second, self.burst, self.max_per_host)
+            self._hosts[netloc] = host
+        return host
+
+    def pause(self, url, seconds):
+        """Hold back every request to the URL's host for the given number of seconds (e.g. from Retry-After)."""
+        host = self._host(url)
+        host.paused_until = max(host.paused_until, time.monotonic() + seconds)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, url):
+        """Wait for a connection slot and a rate-limit token for the URL's host, then for a global slot."""
+        self._bind_loop()
+        host = self._host(url)
+        semaphore = host.semaphore or contextlib.nullcontext()
+        total = self._total or contextlib.nullcontext()
+        async with semaphore:
+            wait = host.bucket.reserve() if host.bucket else 0.0
+            wait = max(wait, host.paused_until - time.monotonic())
+            if wait > 0:
+                await asyncio.sleep(wait)
+            async with total:
+                yield
@@ -0,0 +1,179 @@
+import hashlib
+import math
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+# Base class for the set of URLs already scheduled in a crawl
+class BaseSeenSet(ABC):
+    @abstractmethod
+    def add(self, key):
+        """Add a key, returning True if it was not in the set yet."""
+        pass
+
+    @abstractmethod
+    def __contains__(self, key):
+        pass
+
+    @abstractmethod
+    def __len__(self):
+        pass
+
+
+# Exact set of URL strings
+class MemorySeenSet(BaseSeenSet):
+    def __init__(self, **kwargs):
+        self._keys = set()
+
+    def add(self, key):
+        if key in self._keys:
+            return False
+        self._keys.add(key)
+        return True
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def clear(self):
+        self._keys.clear()
+
+
+# Open-addressing hash table of 64-bit URL fingerprints, about 16 bytes per URL
+class FingerprintSeenSet(BaseSeenSet):
+    def __init__(self, capacity=1024, **kwargs):
+        """
+        Store 64-bit hashes instead of strings. Two distinct URLs share a fingerprint with
+        probability ~n/2^64, which is negligible even for billions of URLs.
+
+        :param capacity: int, expected number of URLs, the table grows beyond it
+        """
+        self._table = np.zeros(1 << max(4, math.ceil(math.log2(capacity * 2))), dtype=np.uint64)
+        self._count = 0
+
+    @staticmethod
+    def fingerprint(key):
+        fingerprint = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+        return fingerprint or 1  # 0 marks empty slots
+
+    def _slot(self, table, fingerprint):
+        mask = len(table) - 1
+        slot = fingerprint & mask
+        while table[slot] != 0 and table[slot] != fingerprint:
+            slot = (slot + 1) & mask  # Linear probing
+        return slot
+
+    def _grow(self):
+        fingerprints = self._table[self._table != 0]
+        self._table = np.zeros(len(self._table) * 2, dtype=np.uint64)
+        for fingerprint in fingerprints.tolist():
+            self._table[self._slot(self._table, fingerprint)] = fingerprint
+
+    def add(self, key):
+        fingerprint = self.fingerprint(key)
+        slot = self._slot(self._table, fingerprint)
+        if self._table[slot] == fingerprint:
+            return False
+        self._table[slot] = fingerprint
+        self._count += 1
+        if self._count * 2 > len(self._table):
+            self._grow()
+        return True
+
+    def __contains__(self, key):
+        fingerprint = self.fingerprint(key)
+        return bool(self._table[self._slot(self._table, fingerprint)] == fingerprint)
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        self._table[:] = 0
+        self._count = 0
+
+
+class _BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = np.zeros((self.num_bits + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def positions(self, h1, h2):
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, hashes):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self.positions(*hashes))
+
+    def add(self, hashes):
+        for p in self.positions(*hashes):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+
+# Scalable Bloom filter, a few bits per URL at the cost of rare false positives
+class BloomSeenSet(BaseSeenSet):
+    def __init__(self, capacity=100000, error_rate=0.001, growth=2, tightening=0.5, **kwargs):
+        """
+        A false positive makes the crawler skip a URL it has not visited, with probability below
+        `error_rate` overall. When a filter is full a larger one with a tighter error rate is added.
+
+        :param capacity: int, number of URLs the first filter holds
+        :param error_rate: float, target false positive probability
+        :param growth: int, capacity multiplier of each new filter
+        :param tightening: float, error rate multiplier of each new filter
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.clear()
+
+    @staticmethod
+    def _hashes(key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+    def add(self, key):
+        hashes = self._hashes(key)
+        if any(hashes in bloom for bloom in self._filters):
+            return False
+        bloom = self._filters[-1]
+        if bloom.count >= bloom.capacity:
+            bloom = _BloomFilter(
+                bloom.capacity * self.growth,
+                self.error_rate * (1 - self.tightening) * self.tightening ** len(self._filters),
+            )
+            self._filters.append(bloom)
+        bloom.add(hashes)
+        self._count += 1
+        return True
+
+    def __contains__(self, key):
+        hashes = self._hashes(key)
+        return any(hashes in bloom for bloom in self._filters)
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        # Error rates of the filters form a geometric series summing to error_rate
+        self._filters = [_BloomFilter(self.capacity, self.error_rate * (1 - self.tightening))]
+        self._count = 0
+
+
+SEEN_SET_BACKENDS = {
+    "memory": MemorySeenSet,
+    "fingerprint": FingerprintSeenSet,
+    "bloom": BloomSeenSet,
+}
+
+# Create an empty seen-set for a crawl
+def make_seen_set(backend="memory", **kwargs):
+    """Create a seen-set backend by name ("memory", "fingerprint" or "bloom")."""
+    if backend not in SEEN_SET_BACKENDS:
+        raise ValueError(f"Unknown seen-set backend: {backend}")
+    return SEEN_SET_BACKENDS[backend](**kwargs)
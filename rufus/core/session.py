@@ -0,0 +1,43 @@
+import asyncio
+import aiohttp
+
+# Long-lived HTTP session shared by every fetch path of a crawler
+class SessionManager:
+    def __init__(self, limit=100, limit_per_host=10, keepalive_timeout=30, ttl_dns_cache=300):
+        """
+        Lazily create a pooled aiohttp.ClientSession and hand out the same one on every call,
+        so TLS connections and DNS lookups are reused across seeds, liveness checks, retries and crawls.
+
+        :param limit: int, maximum number of open connections in the pool
+        :param limit_per_host: int, maximum number of open connections per host
+        :param keepalive_timeout: float, seconds an idle connection is kept open for reuse
+        :param ttl_dns_cache: int, seconds DNS results are cached (None to cache forever)
+        """
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        self._session = None
+        self._loop = None
+
+    async def get_session(self):
+        """Return the shared session, creating it if needed for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            # Sessions are bound to the loop they were created on, so a new loop needs a new pool
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.ttl_dns_cache,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._loop = loop
+        return self._session
+
+    async def close(self):
+        """Close the shared session and its connection pool."""
+        if self._session is not None and not self._session.closed and self._loop is asyncio.get_running_loop():
+            await self._session.close()
+        self._session = None
+        self._loop = None
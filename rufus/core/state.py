@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from rufus.core.urls import canonicalize_url
+
+# Fingerprint of a response body, pages with the same fingerprint are not processed again
+def content_hash(body):
+    return hashlib.sha256(body).hexdigest()
+
+# Pages of earlier crawls, used to only reprocess what changed since then
+class CrawlState:
+    def __init__(self, path="rufus_state.sqlite", recrawl_interval=0):
+        """
+        Store, for every crawled URL, the hash of its body, when it was last fetched and its processed page
+        (text, links, metadata). Embeddings of the page texts are kept in an on-disk EmbeddingCache next to
+        the database, at `embeddings_path`.
+
+        :param path: string, path of the SQLite database file
+        :param recrawl_interval: float, seconds during which a stored page is reused without fetching it again
+        """
+        self.path = path
+        self.recrawl_interval = recrawl_interval
+        self.embeddings_path = os.path.splitext(path)[0] + "_embeddings"
+        self._db = None
+
+    # SQLite connection, opened on first use so that the state can be used again after close()
+    @property
+    def _conn(self):
+        if self._db is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS pages (
+                    url TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    page TEXT NOT NULL
+                )"""
+            )
+            self._db.commit()
+        return self._db
+
+    @staticmethod
+    def key(url):
+        """State key of a URL: its canonical form, keeping every query parameter."""
+        return canonicalize_url(url, drop_params=())
+
+    def get(self, url):
+        """Return the stored record of a URL as a dict with its content_hash, fetched_at and page, or None."""
+        row = self._conn.execute(
+            "SELECT content_hash, fetched_at, page FROM pages WHERE url = ?",
+            (self.key(url),),
+        ).fetchone()
+        if row is None:
+            return None
+        content_hash, fetched_at, page = row
+        return {"content_hash": content_hash, "fetched_at": fetched_at, "page": json.loads(page)}
+
+    def is_fresh(self, record):
+        """Check if a stored page is recent enough to be reused without fetching it."""
+        return record["fetched_at"] + self.recrawl_interval > time.time()
+
+    def put(self, url, content_hash, page):
+        """Store the processed page of a URL fetched just now."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?)",
+            (self.key(url), content_hash, time.time(), json.dumps(page)),
+        )
+        self._conn.commit()
+
+    def touch(self, url):
+        """Record that a URL was fetched just now and found unchanged."""
+        self._conn.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), self.key(url)))
+        self._conn.commit()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def close(self):
+        """Close the database, it is opened again on next use."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,60 @@
+from fnmatch import fnmatchcase
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track visitors and never change the page content
+TRACKING_PARAMS = (
+    "utm_*",
+    "gclid",
+    "dclid",
+    "fbclid",
+    "msclkid",
+    "yclid",
+    "mc_cid",
+    "mc_eid",
+    "_ga",
+    "_gl",
+    "_hsenc",
+    "_hsmi",
+)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Canonical form of a URL used to detect already visited pages
+def canonicalize_url(url, drop_params=TRACKING_PARAMS, strip_trailing_slash=True):
+    """
+    Normalize a URL so that variants of the same page compare equal.
+
+    Lowercases the scheme and host, removes default ports and the fragment, drops query parameters
+    matching any of the `drop_params` glob patterns, sorts the remaining parameters and, optionally,
+    removes the trailing slash of non-root paths.
+
+    :param url: string, absolute URL
+    :param drop_params: iterable of glob patterns of query parameter names to remove
+    :param strip_trailing_slash: boolean, whether "/docs/" and "/docs" are the same page
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+
+    netloc = (parts.hostname or "").rstrip(".")
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port is not None and port != DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{port}"
+    if parts.username is not None:
+        userinfo = parts.username if parts.password is None else f"{parts.username}:{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+
+    path = parts.path or "/"
+    if strip_trailing_slash and len(path) > 1:
+        path = path.rstrip("/") or "/"
+
+    params = [
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not any(fnmatchcase(name.lower(), pattern) for pattern in drop_params)
+    ]
+    query = urlencode(sorted(params))
+
+    return urlunsplit((scheme, netloc, path, query, ""))
@@ -1,4 +1,5 @@
-from .method import generate_search_query
+from .method import generate_search_query, agenerate_search_query
 
 __all__ = [
-    "generate_search_query"]
\ No newline at end of file
+    "generate_search_query",
+    "agenerate_search_query"]
\ No newline at end of file
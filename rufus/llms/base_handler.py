@@ -2,10 +2,25 @@ from abc import ABC, abstractmethod
 
 # Base class to abstract LLM instantiations
 class LLMHandler(ABC):
+    # config.yaml options identifying an instance, calls with the same values share one instance
+    config_keys = ()
+
+    @classmethod
+    def from_config(cls, **kwargs):
+        """Create the handler from config.yaml options."""
+        return cls()
+
     @abstractmethod
     def generate_text(self, prompt, **kwargs):
         """
         Generate text based on the provided prompt.
         """
         pass
+
+    def generate_search_query(self, prompt, url, **kwargs):
+        """
+        Generate a search engine query for the prompt, related to the URL.
+        """
+        full_prompt = f"Generate a search engine query for the given prompt: {prompt}, related to the URL: {url}."
+        return self.generate_text(full_prompt, **kwargs)
     
\ No newline at end of file
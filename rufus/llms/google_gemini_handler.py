@@ -9,6 +9,12 @@ gemini_system_instructions = """Do not visit any URLs provided in the user promp
 """
 
 class GoogleGeminiHandler(LLMHandler):
+    config_keys = ("llm_api_key", "llm_name")
+
+    @classmethod
+    def from_config(cls, **kwargs):
+        return cls(api_key=kwargs.get("llm_api_key"), model_name=kwargs.get("llm_name"))
+
     def __init__(self, api_key, model_name):
         self.model_name = model_name
         self.is_safety_set = False
@@ -1,4 +1,19 @@
-from .google_gemini_handler import GoogleGeminiHandler
+import asyncio
+from ..registry import ProviderRegistry
+from ..utils import TTLCache, normalize_text
+
+# LLM providers by name, imported on first use
+LLM_PROVIDERS = ProviderRegistry("LLM provider", "rufus.llms", {
+    "google": "rufus.llms.google_gemini_handler:GoogleGeminiHandler",
+    "template": "rufus.llms.template_handler:TemplateQueryHandler",
+})
+
+# Generated queries by (provider, model, template, prompt, url)
+query_cache = TTLCache(ttl=3600, max_items=4096)
+
+# Get the handler of an LLM provider, creating and configuring it only once per configuration
+def get_llm_handler(llm_provider="google", **kwargs):
+    return LLM_PROVIDERS.create(llm_provider, **kwargs)
 
 # The only method that should be called by RUFUS
 def generate_search_query(prompt, url, llm_provider="google", **kwargs):
@@ -8,11 +23,23 @@ def generate_search_query(prompt, url, llm_provider="google", **kwargs):
         - Google
             -- Gemini Flash
             -- Gemini Pro
+        - Template (offline, fills query_template with the prompt and the URL's domain)
+
+    Queries are cached for `query_cache_ttl` seconds (1 hour by default, 0 to disable), keyed by the
+    provider, model or query template, the prompt (ignoring case and spacing) and URL.
     """
-    if llm_provider == "google":
-        handler = GoogleGeminiHandler(api_key=kwargs.get("llm_api_key"), model_name=kwargs.get("llm_name"))
-    else:
-        raise ValueError(f"Unsupported LLM provider: {llm_provider}")
-    
-    full_prompt = f"Generate a search engine query for the given prompt: {prompt}, related to the URL: {url}."
-    return handler.generate_text(full_prompt, **kwargs)
\ No newline at end of file
+    cache_key = (llm_provider, kwargs.get("llm_name"), kwargs.get("query_template"), normalize_text(prompt), url)
+    query = query_cache.get(cache_key)
+    if query is not None:
+        return query
+
+    handler = get_llm_handler(llm_provider, **kwargs)
+    query = handler.generate_search_query(prompt, url, **kwargs)
+    if query and kwargs.get("query_cache_ttl", 3600):
+        query_cache.put(cache_key, query, ttl=kwargs.get("query_cache_ttl", 3600))
+    return query
+
+# Asynchronous wrapper running the LLM call in a worker thread
+async def agenerate_search_query(prompt, url, llm_provider="google", **kwargs):
+    """Same as generate_search_query, without blocking the event loop."""
+    return await asyncio.to_thread(generate_search_query, prompt, url, llm_provider=llm_provider, **kwargs)
\ No newline at end of file
@@ -0,0 +1,27 @@
+from urllib.parse import urlparse
+from .base_handler import LLMHandler
+
+# Offline query generator filling a template instead of calling an LLM
+class TemplateQueryHandler(LLMHandler):
+    config_keys = ("query_template",)
+
+    @classmethod
+    def from_config(cls, **kwargs):
+        return cls(kwargs.get("query_template") or "{prompt} site:{domain}")
+
+    def __init__(self, template="{prompt} site:{domain}"):
+        """
+        :param template: string, query template with {prompt}, {domain} and {url} placeholders, the
+            " site:{domain}" part is left out when the URL has no domain
+        """
+        self.template = template
+
+    def generate_text(self, prompt, **kwargs):
+        return " ".join(prompt.split())
+
+    def generate_search_query(self, prompt, url, **kwargs):
+        domain = urlparse(url).hostname if "//" in (url or "") else None
+        template = self.template
+        if not domain:
+            template = template.replace(" site:{domain}", "")
+        return " ".join(template.format(prompt=prompt, domain=domain or "", url=url or "").split())
\ No newline at end of file
@@ -0,0 +1,64 @@
+from importlib import import_module
+from importlib.metadata import entry_points
+
+# Registry of provider classes selectable by name from config.yaml
+class ProviderRegistry:
+    def __init__(self, kind, group, builtins=None):
+        """
+        Providers are registered as classes or as "module:attribute" paths, which are only imported when
+        the provider is first used. Other packages can add providers through the `group` entry point group,
+        e.g. in their setup.py:
+
+            entry_points={"rufus.search_engines": ["bing = my_package.bing:BingSearchHandler"]}
+
+        :param kind: string, what the providers are, used in error messages (e.g. "LLM provider")
+        :param group: string, entry point group of third-party providers
+        :param builtins: dict, provider name to class or "module:attribute" path
+        """
+        self.kind = kind
+        self.group = group
+        self._providers = dict(builtins or {})
+        self._instances = {}
+
+    def register(self, name, provider=None):
+        """Register a provider class or "module:attribute" path under a name, usable as a class decorator."""
+        if provider is None:
+            return lambda cls: self.register(name, cls)
+        self._providers[name] = provider
+        return provider
+
+    def _entry_points(self):
+        return {entry_point.name: entry_point for entry_point in entry_points(group=self.group)}
+
+    def names(self):
+        """Names of the registered and installed providers."""
+        return sorted(set(self._providers) | set(self._entry_points()))
+
+    def get(self, name):
+        """Return the provider class registered under a name, importing it if needed."""
+        provider = self._providers.get(name)
+        if provider is None:
+            entry_point = self._entry_points().get(name)
+            if entry_point is None:
+                raise ValueError(f"Unsupported {self.kind}: {name}")
+            provider = entry_point.load()
+        elif isinstance(provider, str):
+            module, _, attribute = provider.partition(":")
+            provider = getattr(import_module(module), attribute)
+        self._providers[name] = provider
+        return provider
+
+    def create(self, name, **kwargs):
+        """
+        Return a provider instance for the given config.yaml options, created with the provider's from_config.
+        Instances are kept alive and shared by every call with the same values of the provider's config_keys.
+        """
+        provider = self.get(name)
+        key = (name,) + tuple(repr(kwargs.get(option)) for option in getattr(provider, "config_keys", ()))
+        if key not in self._instances:
+            self._instances[key] = provider.from_config(**kwargs)
+        return self._instances[key]
+
+    def clear(self):
+        """Drop every shared provider instance."""
+        self._instances.clear()
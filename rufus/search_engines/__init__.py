@@ -1,4 +1,5 @@
-from .method import get_search_results
+from .method import get_search_results, aget_search_results
 
 __all__ = [
-    "get_search_results"]
\ No newline at end of file
+    "get_search_results",
+    "aget_search_results"]
\ No newline at end of file
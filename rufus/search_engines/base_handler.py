@@ -2,6 +2,14 @@ from abc import ABC, abstractmethod
 
 # Base class to abstract search engine instantiations
 class SearchEngineHandler(ABC):
+    # config.yaml options identifying an instance, calls with the same values share one instance
+    config_keys = ()
+
+    @classmethod
+    def from_config(cls, **kwargs):
+        """Create the handler from config.yaml options."""
+        return cls()
+
     @abstractmethod
     def get_search_results(self, query, **kwargs):
         """
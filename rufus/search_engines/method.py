@@ -1,10 +1,38 @@
-from .google_search_handler import GoogleSearchHandler
+import asyncio
+from ..registry import ProviderRegistry
+from ..utils import TTLCache, normalize_text
+
+# Search engines by name, imported on first use
+SEARCH_ENGINES = ProviderRegistry("search engine", "rufus.search_engines", {
+    "google": "rufus.search_engines.google_search_handler:GoogleSearchHandler",
+    "offline": "rufus.search_engines.offline_search_handler:OfflineSearchHandler",
+})
+
+# Result URLs by (search engine, query, number of results)
+results_cache = TTLCache(ttl=3600, max_items=4096)
+
+# Get the handler of a search engine, creating it only once per configuration
+def get_search_handler(search_engine="google", **kwargs):
+    return SEARCH_ENGINES.create(search_engine, **kwargs)
 
 def get_search_results(query, search_engine="google", num_results=10, **kwargs):
-    if search_engine == "google":
-        handler = GoogleSearchHandler()
-    else:
-        # Add more search engines
-        raise ValueError(f"Unsupported search engine: {search_engine}")
+    """
+    Search the web for the query and return the result URLs.
+
+    Results are cached for `search_cache_ttl` seconds (1 hour by default, 0 to disable).
+    """
+    cache_key = (search_engine, normalize_text(query), num_results)
+    results = results_cache.get(cache_key)
+    if results is not None:
+        return list(results)
+
+    handler = get_search_handler(search_engine, **kwargs)
+    results = handler.get_search_results(query, num_results=num_results)
+    if results and kwargs.get("search_cache_ttl", 3600):
+        results_cache.put(cache_key, list(results), ttl=kwargs.get("search_cache_ttl", 3600))
+    return results
 
-    return handler.get_search_results(query, num_results=num_results)
+# Asynchronous wrapper running the search in a worker thread
+async def aget_search_results(query, search_engine="google", num_results=10, **kwargs):
+    """Same as get_search_results, without blocking the event loop."""
+    return await asyncio.to_thread(get_search_results, query, search_engine=search_engine, num_results=num_results, **kwargs)
\ No newline at end of file
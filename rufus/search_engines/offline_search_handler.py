@@ -0,0 +1,78 @@
+# Offline Search Handler
+
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from .base_handler import SearchEngineHandler
+
+
+class OfflineSearchHandler(SearchEngineHandler):
+    """Search previously crawled pages stored in a vector index (see the vector_index option) with BM25."""
+    config_keys = ("offline_search_index", "vector_index")
+
+    @classmethod
+    def from_config(cls, **kwargs):
+        index = kwargs.get("offline_search_index") or kwargs.get("vector_index")
+        if index is None:
+            raise ValueError("The offline search engine needs offline_search_index, a vector index of crawled pages")
+        return cls(index)
+
+    def __init__(self, index, k1=1.5, b=0.75):
+        """
+        :param index: BaseVectorIndex, or directory of a saved one, the index is reread when the saved copy changes
+        :param k1: float, BM25 term frequency saturation
+        :param b: float, BM25 document length normalization
+        """
+        self.index = index
+        self.k1 = k1
+        self.b = b
+        self._version = None
+
+    @staticmethod
+    def _tokens(text):
+        return re.findall(r"\w+", text.lower())
+
+    def _documents(self):
+        if not isinstance(self.index, str):
+            return self.index.documents, self.index.generation
+        from ..content_rankers.vector_index import load_vector_index
+
+        path = os.path.join(self.index, "index.json")
+        if not os.path.exists(path):
+            return [], None
+        version = os.path.getmtime(path)
+        if version != self._version:
+            self._loaded = load_vector_index(self.index).documents
+        return self._loaded, version
+
+    def _build(self):
+        """Build the inverted index if the indexed documents changed since it was last built."""
+        documents, version = self._documents()
+        if version == self._version and version is not None:
+            return
+        self._urls = [document.get("url") for document in documents]
+        self._lengths = []
+        self._postings = defaultdict(list)
+        for doc_id, document in enumerate(documents):
+            counts = Counter(self._tokens(document["text"]))
+            self._lengths.append(sum(counts.values()))
+            for term, count in counts.items():
+                self._postings[term].append((doc_id, count))
+        self._average_length = sum(self._lengths) / len(self._lengths) if self._lengths else 0
+        self._version = version
+
+    def get_search_results(self, query, num_results=10):
+        """Get the URLs of the crawled pages best matching the query."""
+        self._build()
+        scores = defaultdict(float)
+        for term in set(self._tokens(query)):
+            postings = self._postings.get(term, ())
+            if not postings:
+                continue
+            idf = math.log(1 + (len(self._urls) - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, count in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / self._average_length)
+                scores[doc_id] += idf * count * (self.k1 + 1) / (count + norm)
+        ranked = sorted(scores, key=lambda doc_id: -scores[doc_id])
+        return [self._urls[doc_id] for doc_id in ranked if self._urls[doc_id]][:num_results]
\ No newline at end of file
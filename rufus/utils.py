@@ -1,6 +1,14 @@
 # Utility functions for RUFUS
 import logging
+import codecs
+import contextlib
+import random
+import threading
+import time
+from collections import OrderedDict
 import numpy as np
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 from urllib.parse import urlparse
 import aiohttp, asyncio
 import yaml, json
@@ -25,7 +33,12 @@ def setup_logging(log_file="rufus.log", level="DEBUG"):
     return logger
 
 # Method to structure output of crawl/ranked crawl
-def format_results(output, start_url=None, prompt=None):
+def format_results(output, start_url=None, prompt=None, extras=None):
+    """
+    Structure crawled documents, ranked or not, as a dict.
+
+    :param extras: dict, optional mapping of document text to extra fields added to its result
+    """
     structured_data = {
         "start_url": start_url,
         "prompt": prompt,
@@ -45,10 +58,56 @@ def format_results(output, start_url=None, prompt=None):
     else:
         # Unexpected data format in search results
         structured_data['results'] = output
+        return structured_data
+
+    if extras:
+        for result in structured_data['results']:
+            result.update(extras.get(result["doc"], {}))
 
     return structured_data
 
 
+# In-memory cache whose entries expire after a fixed time
+class TTLCache:
+    def __init__(self, ttl=3600, max_items=1024):
+        """
+        :param ttl: float, seconds an entry stays valid (None to never expire)
+        :param max_items: int, maximum number of entries, least recently used entries are evicted beyond it
+        """
+        self.ttl = ttl
+        self.max_items = max_items
+        self._entries = OrderedDict()
+        # Handlers read and fill their caches from asyncio.to_thread workers
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl if ttl is not None else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Cache key of a free-text prompt, so that prompts differing only in case or spacing share an entry
+def normalize_text(text):
+    return " ".join(str(text).lower().split())
+
 # Load YAML Config File
 def load_config(filename="config.yaml"):
     """Load YAML config file."""
@@ -79,6 +138,18 @@ def save_dict_to_json(data, filename="data.json"):
     except (IOError, TypeError) as e:
         print(f"Error saving dictionary to JSON file: {e}")
 
+# Read records from a JSONL file
+def read_jsonl(filename):
+    """Yield one dict per non-empty line of a JSONL file, skipping lines that are not valid JSON (e.g. cut by a crash)."""
+    with open(filename, "r") as jsonl_file:
+        for line in jsonl_file:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
 def is_ranked(obj):
     if isinstance(obj, list):
         if all(isinstance(item, str) for item in obj):
@@ -96,80 +167,309 @@ def is_valid_url(url):
     return bool(parsed_url.scheme in ["http", "https"] and parsed_url.netloc)
 
 # Async bool method to check if a URL is online
-async def is_url_online(url, timeout=5):
-    """Check if the URL is online by sending a HEAD request."""
+async def is_url_online(url, timeout=5, session=None):
+    """Check if the URL is online by sending a HEAD request, using an aiohttp.ClientSession object if provided."""
     try:
-        async with aiohttp.ClientSession() as session:
+        if session:
             async with session.head(url, timeout=timeout) as response:
                 return response.status == 200
+        async with aiohttp.ClientSession() as temp_session:
+            async with temp_session.head(url, timeout=timeout) as response:
+                return response.status == 200
     except (aiohttp.ClientError, asyncio.TimeoutError):
         return False
 
+# Status codes worth retrying, any other 4xx response is final
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+# Exponential backoff with full jitter
+def backoff_delay(attempt, base=1.5, max_delay=60.0):
+    """
+    Compute the wait before the next retry.
+
+    :param attempt: int, number of failed attempts so far (starting at 1)
+    :param base: float, delay in seconds for the first retry
+    :param max_delay: float, upper bound on the delay in seconds
+    """
+    return random.uniform(0, min(max_delay, base * 2 ** (attempt - 1)))
+
+# Parse the Retry-After header of a 429/503 response
+def parse_retry_after(value):
+    """Return the number of seconds requested by a Retry-After header, or None if missing or invalid."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+# Stream a response body in chunks under a size cap
+async def read_body(response, max_bytes=None, decode=False, chunk_size=64 * 1024, logger=None):
+    """
+    Read the body of an aiohttp response chunk by chunk, so that at most max_bytes are ever held in memory.
+
+    The charset is the one declared in the Content-Type header, or sniffed from a BOM or <meta> tag in the
+    first chunk (None if neither). Bodies declaring a Content-Length above max_bytes are not downloaded and
+    None is returned, bodies of unknown length are truncated at max_bytes.
+
+    :param response: aiohttp.ClientResponse
+    :param max_bytes: int, maximum number of (decompressed) bytes read (None for unlimited)
+    :param decode: boolean, whether to decode chunks as they arrive and return text instead of bytes
+    :param chunk_size: int, number of bytes read at a time
+    :return: (bytes or string, charset) tuple, or None if the body is too large
+    """
+    if logger is None:
+        logger = logging.getLogger("RUFUSLogger")
+    if max_bytes is not None and response.content_length is not None and response.content_length > max_bytes:
+        logger.info(f"Skipping {response.url}, Content-Length {response.content_length} exceeds {max_bytes} bytes")
+        return None
+
+    from rufus.core.extraction import sniff_charset
+
+    charset = response.charset
+    decoder = None
+    chunks = []
+    size = 0
+    async for chunk in response.content.iter_chunked(chunk_size):
+        if max_bytes is not None and size + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - size]
+            logger.warning(f"Truncating {response.url} at {max_bytes} bytes")
+        if not chunk:
+            break
+        if size == 0 and charset is None:
+            charset = sniff_charset(chunk)
+        if decode and decoder is None:
+            try:
+                decoder = codecs.getincrementaldecoder(charset or "utf-8")(errors="replace")
+            except LookupError:
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        size += len(chunk)
+        chunks.append(decoder.decode(chunk) if decode else chunk)
+        if max_bytes is not None and size >= max_bytes:
+            break
+    if decode:
+        if decoder is not None:
+            chunks.append(decoder.decode(b"", final=True))
+        return "".join(chunks), charset
+    return b"".join(chunks), charset
+
 # Async method for handling retries in requests
-async def persistent_request(url, session=None, retries=3, delay=1.5, headers=None, timeout=5, logger=None):
-    """Attempts to fetch the content of a webpage using an async GET request, using an aiohttp.ClientSession object if provided."""
+async def persistent_request(url, session=None, retries=3, delay=1.5, headers=None, timeout=5, logger=None, scheduler=None, raw=False, cache=None, content_types=None, max_bytes=None, missing_ok=False, raise_statuses=()):
+    """
+    Attempts to fetch the content of a webpage using an async GET request, using an aiohttp.ClientSession object if provided.
+
+    Returns the decoded text of the page, or a (bytes, charset) tuple with the undecoded body and the
+    charset declared in the Content-Type header (None if missing) when `raw` is True.
+
+    Failed attempts are retried with exponential backoff and jitter, starting from `delay` seconds.
+    A Retry-After header on 429/503 responses overrides the backoff. If a scheduler (see
+    rufus.core.scheduler.HostScheduler) is given, every attempt waits for a slot on the URL's host,
+    and Retry-After pauses the whole host rather than only this request.
+
+    If a cache (see rufus.core.cache.HTTPCache) is given, fresh cached responses are returned without
+    a request, stale ones are revalidated with If-None-Match/If-Modified-Since and reused on 304.
+
+    If content_types is given, responses declaring any other Content-Type (e.g. images or PDFs) are
+    skipped without downloading their body and None is returned. Bodies are streamed under the max_bytes
+    cap (see read_body), responses declaring a larger Content-Length are skipped too.
+
+    If missing_ok is True, a 404 or 410 response is an expected outcome (e.g. a site without robots.txt)
+    and is logged at DEBUG rather than ERROR. Statuses in raise_statuses raise their aiohttp.ClientResponseError
+    instead of returning None, for callers that handle them differently from other failures.
+    """
     if logger is None:
         logger = logging.getLogger("RUFUSLogger")
 
-    attempts = 0
-    while attempts < retries:
+    def result(body, charset):
+        if raw:
+            return body, charset
+        return body.decode(charset or "utf-8", errors="replace")
+
+    entry = cache.get(url) if cache is not None else None
+    if entry is not None:
+        if cache.is_fresh(entry):
+            cache.touch(url)
+            return result(entry["body"], entry["charset"])
+        headers = {**(headers or {}), **cache.conditional_headers(entry)}
+
+    retry_after = None
+
+    async def fetch(client):
+        nonlocal retry_after
+        slot = scheduler.slot(url) if scheduler else contextlib.nullcontext()
+        async with slot:
+            async with client.get(url, headers=headers, timeout=timeout) as response:
+                if response.status == 304 and entry is not None:
+                    cache.refresh(url, response.headers)
+                    return result(entry["body"], entry["charset"])
+                if response.status in (429, 503):
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                response.raise_for_status()
+                if content_types is not None and "Content-Type" in response.headers and response.content_type not in content_types:
+                    logger.info(f"Skipping {url}, unsupported content type {response.content_type}")
+                    return None
+                body = await read_body(response, max_bytes=max_bytes, decode=not raw and cache is None, logger=logger)
+                if body is None:
+                    return None
+                if not raw and cache is None:
+                    return body[0]
+                body, charset = body
+                if cache is not None:
+                    cache.put(url, body, charset, response.headers)
+                return result(body, charset)
+
+    for attempt in range(1, retries + 1):
+        retry_after = None
         try:
             if session:
-                async with session.get(url, headers=headers, timeout=timeout) as response:
-                    response.raise_for_status()
-                    return await response.text()
-            else:
-                async with aiohttp.ClientSession() as temp_session:
-                    async with temp_session.get(url, headers=headers, timeout=timeout) as response:
-                        response.raise_for_status()
-                        return await response.text()
-        except aiohttp.ClientError as e:
-            attempts += 1
-            logger.warning(f"Attempt {attempts} for {url} failed: {e}")
-            await asyncio.sleep(delay)
+                return await fetch(session)
+            async with aiohttp.ClientSession() as temp_session:
+                return await fetch(temp_session)
+        except aiohttp.ClientResponseError as e:
+            if e.status in raise_statuses:
+                raise
+            if e.status not in RETRYABLE_STATUSES:
+                level = logging.DEBUG if missing_ok and e.status in (404, 410) else logging.ERROR
+                logger.log(level, f"Request for {url} failed with status {e.status}")
+                return None
+            error = e
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = e
+
+        if attempt == retries:
+            logger.warning(f"Attempt {attempt} for {url} failed: {error}")
+            break
+
+        if retry_after is not None:
+            wait = retry_after
+            if scheduler:
+                scheduler.pause(url, retry_after)
+        else:
+            wait = backoff_delay(attempt, base=delay)
+        logger.warning(f"Attempt {attempt} for {url} failed: {error}, retrying in {wait:.2f}s")
+        await asyncio.sleep(wait)
     
-    logger.error(f"All {attempts} attempts failed for {url}")
+    logger.error(f"All {retries} attempts failed for {url}")
     return None
 
 
+# Convert embeddings (arrays or lists of lists) to a 2D floating point array, float32 unless already float64
+def _as_matrix(x):
+    if not (isinstance(x, np.ndarray) and x.dtype in (np.float32, np.float64)):
+        x = np.asarray(x, dtype=np.float32)
+    return x[np.newaxis, :] if x.ndim == 1 else x
+
+def _output_buffer(out, a, b):
+    shape = (len(a), len(b))
+    if out is None:
+        return np.empty(shape, dtype=np.result_type(a, b))
+    if out.shape != shape:
+        raise ValueError(f"Output buffer has shape {out.shape}, expected {shape}")
+    return out
+
+def _row_norms(x):
+    norms = np.sqrt(np.einsum("ij,ij->i", x, x))
+    norms[norms == 0] = 1
+    return norms
+
 # Cosine similarity computation using Numpy, works better than PyTorch on CPU tensors/arrays
-def cosine_similarity(a, b) -> np.ndarray:
+def cosine_similarity(a, b, block_size=4096, out=None) -> np.ndarray:
     """
-    Computes the pairwise cosine similarity between two n-dimensional tensors.
+    Computes the cosine similarity between every row of `a` and every row of `b`.
+
+    Rows of `b` are processed in blocks of `block_size` with one matrix multiplication each, so memory
+    beyond the output stays bounded by the block size. Zero vectors have a similarity of 0.
 
     Parameters:
-    a: A tensor/array of shape (..., d).
-    b: A tensor/array of shape (..., d).
+    a: An array (or list of lists) of shape (n, d), or a single vector of shape (d,).
+    b: An array (or list of lists) of shape (m, d), or a single vector of shape (d,).
+    block_size: Number of rows of `b` processed at once.
+    out: Optional array of shape (n, m) to write the result to.
 
     Returns:
-    An array of cosine similarities with shape matching the batch dimensions of `a` and `b`.
+    An array of cosine similarities of shape (n, m).
     """
-    # Normalize along the last dimension
-    a_norm = a / np.linalg.norm(a, axis=-1, keepdims=True)
-    b_norm = b / np.linalg.norm(b, axis=-1, keepdims=True)
-    
-    # Compute cosine similarity along the last dimension
-    similarity = np.sum(a_norm * b_norm, axis=-1)
-    return similarity
+    a, b = _as_matrix(a), _as_matrix(b)
+    out = _output_buffer(out, a, b)
+    a_norm = a / _row_norms(a)[:, np.newaxis]
+    for start in range(0, len(b), block_size):
+        block = b[start:start + block_size]
+        target = out[:, start:start + block_size]
+        np.matmul(a_norm, block.T, out=target)
+        target /= _row_norms(block)
+    return out
 
 # Euclidean distance computation using Numpy
-def pairwise_distance(a, b) -> np.ndarray:
+def pairwise_distance(a, b, block_size=4096, out=None) -> np.ndarray:
     """
-    Computes the pairwise Euclidean similarity between two n-dimensional tensors.
+    Computes the Euclidean similarity, 1 / (1 + distance), between every row of `a` and every row of `b`.
+
+    Squared distances are expanded as ||a||^2 + ||b||^2 - 2ab, so each block of `block_size` rows of `b`
+    costs one matrix multiplication and no (n, m, d) difference tensor is allocated.
 
     Parameters:
-    a: A tensor/array of shape (..., d).
-    b: A tensor/array of shape (..., d).
+    a: An array (or list of lists) of shape (n, d), or a single vector of shape (d,).
+    b: An array (or list of lists) of shape (m, d), or a single vector of shape (d,).
+    block_size: Number of rows of `b` processed at once.
+    out: Optional array of shape (n, m) to write the result to.
 
     Returns:
-    An array of Euclidean similarities with shape matching the batch dimensions of `a` and `b`.
+    An array of Euclidean similarities of shape (n, m).
     """
-    # Expand dimensions to enable broadcasting
-    diff = a[..., np.newaxis, :] - b[np.newaxis, ...]
-    
-    # Calculate squared differences, sum across the last dimension, and then take the square root
-    distances = np.sqrt(np.sum(diff ** 2, axis=-1))
-    
-    # Convert distances to similarity (1 / (1 + distance))
-    similarity = 1 / (1 + distances)
-    return similarity
\ No newline at end of file
+    a, b = _as_matrix(a), _as_matrix(b)
+    out = _output_buffer(out, a, b)
+    a_squared = np.einsum("ij,ij->i", a, a)[:, np.newaxis]
+    for start in range(0, len(b), block_size):
+        block = b[start:start + block_size]
+        target = out[:, start:start + block_size]
+        np.matmul(a, block.T, out=target)
+        target *= -2
+        target += a_squared
+        target += np.einsum("ij,ij->i", block, block)
+        # Rounding can make squared distances of near-identical vectors slightly negative
+        np.maximum(target, 0, out=target)
+        np.sqrt(target, out=target)
+        target += 1
+        np.reciprocal(target, out=target)
+    return out
+
+SIMILARITY_FUNCTIONS = {
+    "cosine": cosine_similarity,
+    "euclidean": pairwise_distance,
+}
+
+# Most similar rows of `b` for every row of `a`
+def top_k_similarity(a, b, k, similarity_metric="cosine", block_size=4096):
+    """
+    Find the k rows of `b` most similar to each row of `a` without computing the full similarity matrix.
+
+    Returns (indices, scores), two arrays of shape (n, min(k, m)) sorted by descending similarity.
+    """
+    if similarity_metric not in SIMILARITY_FUNCTIONS:
+        raise ValueError(f"Unknown similarity metric: {similarity_metric}")
+    similarity_func = SIMILARITY_FUNCTIONS[similarity_metric]
+    a, b = _as_matrix(a), _as_matrix(b)
+    k = min(k, len(b))
+    dtype = np.result_type(a, b)
+    best_indices = np.empty((len(a), 0), dtype=np.intp)
+    best_scores = np.empty((len(a), 0), dtype=dtype)
+    buffer = np.empty((len(a), min(block_size, len(b))), dtype=dtype)
+    for start in range(0, len(b), block_size):
+        block = b[start:start + block_size]
+        scores = similarity_func(a, block, block_size=block_size, out=buffer[:, :len(block)])
+        indices = np.broadcast_to(np.arange(start, start + len(block)), scores.shape)
+        candidates = np.concatenate([best_scores, scores], axis=1)
+        candidate_indices = np.concatenate([best_indices, indices], axis=1)
+        if candidates.shape[1] > k:
+            top = np.argpartition(-candidates, k - 1, axis=1)[:, :k]
+            candidates = np.take_along_axis(candidates, top, axis=1)
+            candidate_indices = np.take_along_axis(candidate_indices, top, axis=1)
+        best_scores, best_indices = candidates, candidate_indices
+    order = np.argsort(-best_scores, axis=1, kind="stable")
+    return np.take_along_axis(best_indices, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
@@ -7,10 +7,13 @@ setup(
     include_package_data=True,
     install_requires=[
         "aiohttp",
-        "beautifulsoup4",
+        "lxml",
         "pyyaml",
         "google-generativeai",
     ],
+    extras_require={
+        "local": ["torch", "sentence-transformers"],
+    },
     entry_points={
         "console_scripts": [
         ],
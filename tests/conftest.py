@@ -0,0 +1,68 @@
+import contextlib
+from collections import Counter
+from types import SimpleNamespace
+
+import pytest
+from aiohttp import web
+
+from rufus.content_rankers.base_reranker import BaseReranker
+
+class StubReranker(BaseReranker):
+    """Embeds texts offline with a function of each text, recording every text sent to the model."""
+    def __init__(self, embed, model_name):
+        self.embed = embed
+        self.model_name = model_name
+        self.is_local_hosted = False
+        self.embedded = []
+
+    def get_embeddings(self, texts):
+        self.embedded.extend(texts)
+        return [self.embed(text) for text in texts]
+
+@pytest.fixture
+def stub_reranker():
+    """
+    Factory for offline rerankers. By default texts are embedded as their counts of each of `keywords`,
+    pass `embed`, a function of a text returning its embedding, to embed them differently.
+    """
+    def make(keywords=("mango", "apple"), embed=None, model_name="keywords"):
+        if embed is None:
+            embed = lambda text: [text.count(word) + 0.1 for word in keywords]
+        return StubReranker(embed, model_name)
+
+    return make
+
+@pytest.fixture
+def local_site():
+    """
+    Factory for a throwaway HTTP server on localhost.
+
+    Pages map a path to either an HTML string or an aiohttp handler. The yielded
+    site exposes its base `url` and a `hits` counter of requests per path.
+    """
+    @contextlib.asynccontextmanager
+    async def serve(pages):
+        hits = Counter()
+
+        async def handle(request):
+            hits[request.path] += 1
+            page = pages.get(request.path)
+            if page is None:
+                raise web.HTTPNotFound()
+            if callable(page):
+                return await page(request)
+            return web.Response(text=page, content_type="text/html")
+
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        try:
+            yield SimpleNamespace(url=f"http://127.0.0.1:{port}", hits=hits)
+        finally:
+            await runner.cleanup()
+
+    return serve
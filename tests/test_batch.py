@@ -0,0 +1,70 @@
+import asyncio
+import json
+
+import pytest
+from aiohttp import web
+
+from rufus import RufusClient
+from rufus.utils import read_jsonl
+
+def _pages(n):
+    return {f"/{i}": f"<p>page {i} about mango</p>" for i in range(n)}
+
+@pytest.mark.asyncio
+async def test_astart_many_runs_jobs_concurrently(local_site, tmp_path):
+    in_flight = 0
+    peak = 0
+
+    async def slow(request):
+        nonlocal in_flight, peak
+        if request.method == "GET":  # Liveness checks of the start URLs are not rate limited
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.05)
+            in_flight -= 1
+        return web.Response(text=f"<p>{request.path}</p>", content_type="text/html")
+
+    pages = {f"/{i}": slow for i in range(8)}
+    output_file = tmp_path / "results.jsonl"
+    async with local_site(pages) as site:
+        client = RufusClient(max_depth=0, delay=0, log_file=None, max_total_requests=3)
+        jobs = [{"url": f"{site.url}/{i}", "prompt": "mango"} for i in range(8)]
+        records = [record async for record in client.astart_many(jobs, max_jobs=8, output_file=str(output_file), do_rank=False)]
+        await client.aclose()
+
+    assert sorted(record["id"] for record in records) == list(range(8))
+    assert all(record["result"]["results"][0]["doc"] == f"/{record['id']}" for record in records)
+    assert peak == 3  # Jobs overlap, but never beyond the global request budget
+    assert sorted(r["id"] for r in read_jsonl(output_file)) == list(range(8))
+
+@pytest.mark.asyncio
+async def test_astart_many_resumes(local_site, tmp_path):
+    output_file = tmp_path / "results.jsonl"
+    async with local_site(_pages(4)) as site:
+        jobs = [{"id": f"job-{i}", "url": f"{site.url}/{i}", "prompt": "mango"} for i in range(4)]
+        # A previous run finished two jobs, failed one and was interrupted while writing
+        with open(output_file, "w") as f:
+            f.write(json.dumps({"id": "job-0", "result": {}}) + "\n")
+            f.write(json.dumps({"id": "job-1", "result": {}}) + "\n")
+            f.write(json.dumps({"id": "job-2", "error": "timeout"}) + "\n")
+            f.write('{"id": "job-3", "res')
+
+        client = RufusClient(max_depth=0, delay=0, log_file=None)
+        records = [record async for record in client.astart_many(jobs, output_file=str(output_file), resume=True, do_rank=False)]
+        await client.aclose()
+
+    assert sorted(record["id"] for record in records) == ["job-2", "job-3"]
+    assert set(site.hits) == {"/2", "/3"}
+    done = {record["id"] for record in read_jsonl(output_file) if "error" not in record}
+    assert done == {"job-0", "job-1", "job-2", "job-3"}
+
+@pytest.mark.asyncio
+async def test_astart_many_reports_malformed_jobs(local_site):
+    async with local_site(_pages(2)) as site:
+        jobs = [{"url": f"{site.url}/0", "prompt": "mango"}, {"url": f"{site.url}/1"}, {"prompt": "mango"}]
+        client = RufusClient(max_depth=0, delay=0, log_file=None)
+        records = {record["id"]: record async for record in client.astart_many(jobs, do_rank=False)}
+        await client.aclose()
+
+    assert "result" in records[0]
+    assert "prompt" in records[1]["error"] and "url" in records[2]["error"]
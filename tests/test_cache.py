@@ -0,0 +1,64 @@
+import aiohttp
+import pytest
+from aiohttp import web
+
+from rufus.core.cache import HTTPCache, parse_cache_control
+from rufus.core.crawler import Crawler
+from rufus.utils import persistent_request
+
+def test_parse_cache_control():
+    assert parse_cache_control('max-age=60, no-cache, private="x"') == {"max-age": "60", "no-cache": True, "private": "x"}
+
+def test_cache_lru_eviction(tmp_path):
+    cache = HTTPCache(str(tmp_path / "cache.sqlite"), max_bytes=300)
+    for i in range(5):
+        cache.put(f"http://a.test/{i}", bytes(range(256)) * 4, "utf-8", {"ETag": f'"{i}"'})
+    assert cache.total_bytes <= 300
+    assert cache.get("http://a.test/4") is not None
+    assert cache.get("http://a.test/0") is None
+    assert cache.get("HTTP://A.TEST/4#section") is not None  # Keys ignore host case and fragments
+
+@pytest.mark.asyncio
+async def test_conditional_revalidation(local_site, tmp_path):
+    statuses = []
+
+    async def etag_page(request):
+        if request.headers.get("If-None-Match") == '"v1"':
+            statuses.append(304)
+            return web.Response(status=304)
+        statuses.append(200)
+        return web.Response(text="<p>cached</p>", content_type="text/html", headers={"ETag": '"v1"'})
+
+    async def fresh_page(request):
+        return web.Response(text="fresh", headers={"Cache-Control": "max-age=3600"})
+
+    async def private_page(request):
+        return web.Response(text="private", headers={"Cache-Control": "no-store", "ETag": '"p"'})
+
+    cache = HTTPCache(str(tmp_path / "cache.sqlite"))
+    async with local_site({"/etag": etag_page, "/fresh": fresh_page, "/private": private_page}) as site:
+        async with aiohttp.ClientSession() as session:
+            for _ in range(2):
+                assert await persistent_request(site.url + "/etag", session=session, cache=cache) == "<p>cached</p>"
+                assert await persistent_request(site.url + "/fresh", session=session, cache=cache, raw=True) == (b"fresh", "utf-8")
+                assert await persistent_request(site.url + "/private", session=session, cache=cache) == "private"
+
+    assert statuses == [200, 304]
+    assert site.hits["/fresh"] == 1  # Served from cache while fresh
+    assert site.hits["/private"] == 2  # no-store responses are never cached
+    cache.close()
+
+@pytest.mark.asyncio
+async def test_http_cache_reopened_after_crawler_close(local_site, tmp_path):
+    async def fresh_page(request):
+        return web.Response(text="<p>fresh</p>", content_type="text/html", headers={"Cache-Control": "max-age=3600"})
+
+    crawler = Crawler(max_depth=0, delay=0, log_file=None, http_cache=str(tmp_path / "cache.sqlite"))
+    async with local_site({"/": fresh_page}) as site:
+        for _ in range(2):
+            # The cache the crawler opened is closed with it and reopened by the next crawl
+            session = await crawler.sessions.get_session()
+            assert await crawler._crawl([site.url + "/"], session=session) == ["fresh"]
+            await crawler.close()
+
+    assert site.hits["/"] == 1
@@ -0,0 +1,66 @@
+import pytest
+
+from rufus.core.checkpoint import CheckpointStore
+from rufus.core.crawler import Crawler
+
+def test_checkpoint_round_trip(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite"), interval=60)
+    checkpoint = store.job("http://a.com/", "prompt")
+    checkpoint.scheduled("http://a.com/", 0)
+    checkpoint.scheduled("http://a.com/b", 1, priority=-0.5)
+    checkpoint.scheduled("http://a.com/c", 1)
+    checkpoint.done("http://a.com/", {"url": "http://a.com/", "text": "a"})
+    checkpoint.done("http://a.com/c")  # Failed fetch, no document
+    store.close()
+
+    # Uncommitted writes are flushed on close
+    store = CheckpointStore(str(tmp_path / "checkpoints.sqlite"))
+    restored = store.job("http://a.com/", "prompt").load()
+    assert restored == {
+        "seeds": ["http://a.com/"],
+        "scheduled": ["http://a.com/", "http://a.com/b", "http://a.com/c"],
+        "pending": [("http://a.com/b", 1, -0.5)],
+        "done": 2,
+        "documents": [{"url": "http://a.com/", "text": "a"}],
+    }
+    assert store.job("http://a.com/", "other prompt").load() is None
+    store.close()
+
+def _site(pages=10):
+    site = {"/": "<p>index</p>" + "".join(f'<a href="/p{i}">p{i}</a>' for i in range(pages))}
+    site.update({f"/p{i}": f"<p>page {i}</p>" for i in range(pages)})
+    return site
+
+@pytest.mark.asyncio
+async def test_crawl_resumes_from_checkpoint(local_site, tmp_path):
+    path = str(tmp_path / "checkpoints.sqlite")
+    async with local_site(_site()) as site:
+        crawler = Crawler(max_depth=1, delay=0, log_file=None, max_concurrency=1, checkpoint=path)
+        first = []
+        async for page in crawler.iter_pages(site.url + "/", prompt="pages"):
+            first.append(page["url"])
+            if len(first) == 3:
+                break  # Interrupted crawl
+        await crawler.close()
+
+        crawler = Crawler(max_depth=1, delay=0, log_file=None, max_concurrency=1, checkpoint=path)
+        second = [page["url"] async for page in crawler.iter_pages(site.url + "/", prompt="pages", resume=True)]
+        assert crawler.checkpoints.job(site.url + "/", "pages").load() is None  # Cleared once complete
+        await crawler.close()
+
+    assert second[:3] == first
+    assert sorted(second) == sorted([site.url + "/"] + [f"{site.url}/p{i}" for i in range(10)])
+    # Pages processed before the interruption are not fetched again, nor is the start URL checked
+    assert site.hits["/"] == 2
+    assert all(site.hits[url[len(site.url):]] == 1 for url in first[1:])
+
+@pytest.mark.asyncio
+async def test_crawl_checkpoints_reopened_after_close(local_site, tmp_path):
+    crawler = Crawler(max_depth=1, delay=0, log_file=None, checkpoint=str(tmp_path / "checkpoints.sqlite"))
+    async with local_site(_site(2)) as site:
+        for _ in range(2):
+            pages = [page["url"] async for page in crawler.iter_pages(site.url + "/", prompt="pages")]
+            await crawler.close()
+            assert len(pages) == 3
+
+    assert crawler.checkpoints.job(site.url + "/", "pages").load() is None
@@ -1,7 +1,11 @@
+import os
+
 import pytest
 from rufus.core.crawler import Crawler
+from rufus.utils import load_config
 import aiohttp
 import asyncio
+from aiohttp import web
 
 @pytest.mark.asyncio
 async def test_crawl():
@@ -26,3 +30,119 @@ async def test_crawl():
         result = await crawler.start_crawl(start_url, prompt=prompt, session=session, **llm_config, **embd_config)
     
     assert len(result) > 0  # Ensure that at least one page was crawled
+
+
+def _chain_pages(n):
+    """Site where the index links to n pages and every page links back to the index."""
+    pages = {"/": "<html><body><p>index</p>" + "".join(f'<a href="/p{i}">p{i}</a>' for i in range(n)) + "</body></html>"}
+    for i in range(n):
+        pages[f"/p{i}"] = f'<html><body><p>page {i}</p><a href="/">home</a><a href="/p{i}/deep">deep</a></body></html>'
+        pages[f"/p{i}/deep"] = f"<html><body><p>deep {i}</p></body></html>"
+    return pages
+
+@pytest.mark.asyncio
+async def test_crawl_breadth_first_frontier(local_site):
+    async with local_site(_chain_pages(20)) as site:
+        crawler = Crawler(max_depth=1, delay=0, max_concurrency=4)
+        async with aiohttp.ClientSession() as session:
+            data = await crawler._crawl([site.url + "/"], session=session)
+
+    assert len(data) == 21  # Index plus its 20 children, deep pages are beyond max_depth
+    assert all(count == 1 for count in site.hits.values())  # Every page is fetched once
+    assert not any(path.endswith("/deep") for path in site.hits)
+
+@pytest.mark.asyncio
+async def test_crawl_respects_page_budget_and_concurrency(local_site):
+    in_flight = 0
+    peak = 0
+
+    async def slow_page(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return web.Response(text="<p>leaf</p>", content_type="text/html")
+
+    pages = {"/": "".join(f'<a href="/p{i}">p{i}</a>' for i in range(50))}
+    pages.update({f"/p{i}": slow_page for i in range(50)})
+
+    async with local_site(pages) as site:
+        crawler = Crawler(max_depth=2, delay=0, max_concurrency=3, max_pages=10)
+        async with aiohttp.ClientSession() as session:
+            data = await crawler._crawl([site.url + "/"], session=session)
+
+    assert len(data) == 10
+    assert sum(site.hits.values()) == 10
+    assert peak <= 3
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("parse_executor", [None, "thread", "process"])
+async def test_crawl_parse_executor(local_site, parse_executor):
+    pages = _chain_pages(5)
+    pages["/p0"] = '<html><head><meta charset="iso-8859-1"></head><body><p>caf\xe9</p></body></html>'
+
+    async def latin1_page(request):
+        return web.Response(body=pages["/p0"].encode("iso-8859-1"), content_type="text/html")
+
+    async with local_site({**pages, "/p0": latin1_page}) as site:
+        crawler = Crawler(max_depth=1, delay=0, parse_executor=parse_executor, parse_workers=2)
+        async with aiohttp.ClientSession() as session:
+            data = await crawler._crawl([site.url + "/"], session=session)
+        await crawler.close()
+
+    assert len(data) == 6
+    assert "café" in data
+
+@pytest.mark.asyncio
+async def test_crawl_ranks_passages(local_site, stub_reranker):
+    pages = {
+        "/": '<p>apple apple apple apple mango lassi</p><a href="/apples">apples</a>',
+        "/apples": "<p>apple pie apple tart</p>",
+    }
+    async with local_site(pages) as site:
+        crawler = Crawler(max_depth=1, delay=0, log_file=None, chunk_tokens=2, chunk_overlap=0, top_passages=1)
+        result = await crawler.start_crawl(site.url + "/", prompt="mango", reranker=stub_reranker())
+        await crawler.close()
+
+    best = result["results"][0]
+    assert best["doc"].startswith("apple apple")  # Ranked first by its single relevant passage
+    assert best["passages"][0]["text"] == "mango lassi"
+    assert best["passages"][0]["url"] == site.url + "/"
+    assert best["rank_score"] == best["passages"][0]["rank_score"]
+
+@pytest.mark.asyncio
+async def test_crawl_streams_per_call_top_passages(local_site, stub_reranker):
+    pages = {"/": '<p>mango lassi apple pie mango tart</p><a href="/b">b</a>', "/b": "<p>mango cake apple crumble</p>"}
+    async with local_site(pages) as site:
+        crawler = Crawler(max_depth=1, delay=0, log_file=None, chunk_tokens=2, chunk_overlap=0, top_passages=3)
+        docs = [doc async for doc in crawler.astream(site.url + "/", prompt="mango", do_rank=True, reranker=stub_reranker(), top_passages=1)]
+        await crawler.close()
+
+    assert len(docs) == 2
+    assert all(len(doc["passages"]) == 1 for doc in docs)
+
+@pytest.mark.asyncio
+async def test_crawl_with_shipped_config(local_site, tmp_path, monkeypatch, stub_reranker):
+    # scrape(url, prompt, **config) passes every config.yaml key to both the crawler and start_crawl
+    config = load_config(os.path.join(os.path.dirname(__file__), "..", "config.yaml"))
+    config.update(log_file=None, delay=0, requests_per_second=None)
+    monkeypatch.chdir(tmp_path)
+    pages = {
+        "/": '<p>apple apple mango lassi</p><a href="/apples">apples</a>',
+        "/apples": "<p>apple pie apple tart</p>",
+    }
+    async with local_site(pages) as site:
+        crawler = Crawler(**config)
+        result = await crawler.start_crawl(site.url + "/", prompt="mango", reranker=stub_reranker(), **config)
+        await crawler.close()
+
+    assert [r["doc"] for r in result["results"]] == ["apple apple mango lassi apples", "apple pie apple tart"]
+
+def test_crawl_rejects_invalid_chunking():
+    # Checked up front rather than when ranking, after the whole crawl
+    with pytest.raises(ValueError):
+        Crawler(log_file=None, chunk_tokens=32)  # Default overlap of 32 tokens
+    with pytest.raises(ValueError):
+        Crawler(log_file=None, chunk_tokens=64, chunk_overlap=-1)
+    Crawler(log_file=None, chunk_tokens=32, chunk_overlap=8)
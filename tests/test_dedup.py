@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from rufus.core.crawler import Crawler
+from rufus.core.dedup import NearDuplicateDetector, hamming_distance, simhash
+
+random.seed(0)
+WORDS = [f"word{i}" for i in range(300)]
+ARTICLE = " ".join(random.choice(WORDS) for _ in range(300))
+OTHER_ARTICLE = " ".join(random.choice(WORDS) for _ in range(300))
+
+def test_simhash_near_and_far():
+    near = ARTICLE.replace(ARTICLE.split()[5], "changed", 1) + " print version"
+    assert hamming_distance(simhash(ARTICLE), simhash(ARTICLE)) == 0
+    assert hamming_distance(simhash(ARTICLE), simhash(near)) <= 6
+    assert hamming_distance(simhash(ARTICLE), simhash(OTHER_ARTICLE)) > 12
+
+def test_detector_returns_first_copy():
+    detector = NearDuplicateDetector(threshold=0.9)
+    assert detector.add("a", ARTICLE) is None
+    assert detector.add("b", OTHER_ARTICLE) is None
+    assert detector.add("c", ARTICLE + " page 2") == "a"
+    assert len(detector) == 2  # Duplicates are not indexed
+
+def test_detector_rejects_invalid_threshold():
+    with pytest.raises(ValueError):
+        NearDuplicateDetector(threshold=1.5)
+
+def _mirrored_site():
+    return {
+        "/": f'<p>{ARTICLE}</p><a href="/print">print</a><a href="/other">other</a>',
+        "/print": f"<p>{ARTICLE} printer friendly</p>",
+        "/other": f"<p>{OTHER_ARTICLE}</p>",
+    }
+
+@pytest.mark.asyncio
+async def test_crawl_drops_near_duplicates(local_site):
+    async with local_site(_mirrored_site()) as site:
+        crawler = Crawler(max_depth=1, delay=0, log_file=None, dedup="drop")
+        pages = [page async for page in crawler.iter_pages(site.url + "/", prompt="article")]
+        await crawler.close()
+
+    assert {page["url"] for page in pages} == {site.url + "/", site.url + "/other"}
+
+@pytest.mark.asyncio
+async def test_crawl_clusters_near_duplicates_before_ranking(local_site, stub_reranker):
+    reranker = stub_reranker(embed=lambda text: [len(text) + 1.0, 1.0], model_name="length")
+    async with local_site(_mirrored_site()) as site:
+        crawler = Crawler(max_depth=1, delay=0, log_file=None, dedup="cluster")
+        result = await crawler.start_crawl(site.url + "/", prompt="article", reranker=reranker)
+        await crawler.close()
+
+    assert len(reranker.embedded) == 3  # Prompt and the two distinct articles
+    results = {r["url"]: r for r in result["results"]}
+    assert results[site.url + "/"]["duplicates"] == [site.url + "/print"]
+    assert results[site.url + "/other"]["duplicates"] == []
@@ -0,0 +1,61 @@
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from rufus.utils import persistent_request, read_body
+
+async def _endless(request):
+    # Never finishes on its own, like a stream or a tarpit
+    response = web.StreamResponse(headers={"Content-Type": "text/html"})
+    await response.prepare(request)
+    while True:
+        await response.write(b"<p>" + b"x" * 1000 + b"</p>")
+        await asyncio.sleep(0)
+
+async def _large(request):
+    return web.Response(body=b"x" * 5000, content_type="text/html")
+
+async def _latin1(request):
+    body = '<meta charset="iso-8859-1"><p>caf\xe9 cr\xe8me</p>'.encode("iso-8859-1")
+    return web.Response(body=body, headers={"Content-Type": "text/html"})
+
+async def _utf8(request):
+    return web.Response(body="<p>crème brûlée</p>".encode("utf-8"), headers={"Content-Type": "text/html"})
+
+@pytest.mark.asyncio
+async def test_persistent_request_caps_body_size(local_site):
+    async with local_site({"/endless": _endless, "/large": _large}) as site:
+        async with aiohttp.ClientSession() as session:
+            body, charset = await asyncio.wait_for(
+                persistent_request(site.url + "/endless", session=session, raw=True, max_bytes=10000), timeout=5
+            )
+            large = await persistent_request(site.url + "/large", session=session, max_bytes=1000)
+            small = await persistent_request(site.url + "/large", session=session, max_bytes=5000)
+
+    assert len(body) == 10000
+    assert large is None  # Declared Content-Length above the cap, body never downloaded
+    assert len(small) == 5000
+
+@pytest.mark.asyncio
+async def test_persistent_request_sniffs_charset(local_site):
+    async with local_site({"/latin1": _latin1}) as site:
+        async with aiohttp.ClientSession() as session:
+            text = await persistent_request(site.url + "/latin1", session=session)
+            body, charset = await persistent_request(site.url + "/latin1", session=session, raw=True)
+
+    assert "café crème" in text
+    assert charset == "iso-8859-1"
+    assert body.startswith(b"<meta")
+
+@pytest.mark.asyncio
+async def test_read_body_decodes_across_chunks(local_site):
+    async with local_site({"/utf8": _utf8}) as site:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(site.url + "/utf8") as response:
+                # Chunks of 3 bytes split the two-byte characters
+                text, charset = await read_body(response, decode=True, chunk_size=3)
+
+    assert text == "<p>crème brûlée</p>"
+    assert charset is None
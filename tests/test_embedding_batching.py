@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+
+from rufus.content_rankers.base_reranker import BaseReranker
+from rufus.content_rankers.method import arank_content
+
+class StubProvider(BaseReranker):
+    """Local stand-in for an embedding API with request limits and flaky batches."""
+    def __init__(self, max_batch=4, fail_once=(), fail_always=()):
+        self.model_name = "stub"
+        self.is_local_hosted = False
+        self.max_batch = max_batch
+        self.fail_once = set(fail_once)
+        self.fail_always = set(fail_always)
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def get_embeddings(self, texts):
+        with self._lock:
+            self.calls.append(list(texts))
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            if len(texts) > self.max_batch:
+                raise ValueError("Too many texts in one request")
+            for text in texts:
+                if text in self.fail_always or text in self.fail_once:
+                    self.fail_once.discard(text)
+                    raise ConnectionError(f"Transient failure on {text}")
+            threading.Event().wait(0.01)
+            return [[1.0, float(text.count("mango"))] for text in texts]
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+@pytest.mark.asyncio
+async def test_batched_embeddings_with_retries_and_partial_failure():
+    provider = StubProvider(max_batch=4, fail_once={"doc 1"}, fail_always={"doc 9"})
+    texts = [f"doc {i}" for i in range(12)]
+
+    embeddings = await provider.aget_embeddings(texts, batch_size=4, max_concurrency=2, retries=2, delay=0)
+
+    assert all(len(call) <= 4 for call in provider.calls)
+    assert provider.peak <= 2
+    assert embeddings[1] is not None  # Retried after a transient failure
+    assert embeddings[8:12] == [None] * 4  # Only the batch that keeps failing is lost
+    assert all(embedding is not None for embedding in embeddings[:8])
+
+@pytest.mark.asyncio
+async def test_arank_content_with_stub_provider():
+    provider = StubProvider(max_batch=2, fail_always={"broken page"})
+    candidates = ["mango mango", "apple", "mango", "broken page"]
+
+    ranked = await arank_content(
+        ref_txt=["mango"] * len(candidates),
+        candidate_txt=candidates,
+        reranker=provider,
+        embd_batch_size=1,
+        embd_retries=1,
+    )
+
+    # The candidate that cannot be embedded is left out instead of failing the whole ranking
+    assert [doc for doc, _ in ranked] == ["mango", "mango mango", "apple"]
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from rufus.content_rankers.embedding_cache import EmbeddingCache
+from rufus.content_rankers.method import aembed_texts
+
+@pytest.mark.asyncio
+async def test_embed_texts_only_embeds_cache_misses(tmp_path, stub_reranker):
+    reranker = stub_reranker(embed=lambda text: [float(len(text)), 1.0, 0.5], model_name="stub-model")
+    cache = EmbeddingCache(str(tmp_path), max_items=2)
+
+    first = await aembed_texts(reranker, ["a", "bb", "a"], cache)
+    second = await aembed_texts(reranker, ["bb", "ccc"], cache)
+
+    assert reranker.embedded == ["a", "bb", "ccc"]
+    np.testing.assert_allclose(second[0], first[1])
+
+    # A fresh cache on the same directory serves everything from the memory-mapped tier
+    reloaded = EmbeddingCache(str(tmp_path))
+    hits = reloaded.get("stub-model", ["a", "bb", "ccc"])
+    np.testing.assert_allclose(np.stack(hits), [[1, 1, 0.5], [2, 1, 0.5], [3, 1, 0.5]])
+    assert reloaded.get("other-model", ["a"]) == [None]  # Keys include the model name
+
+def test_disk_cache_skips_orphan_rows(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put("stub-model", ["a"], [[1.0, 1.0, 0.5]])
+    # A crash after writing a row but before indexing it leaves an orphan row in the matrix file
+    with open(tmp_path / "stub-model.f32", "ab") as f:
+        f.write(np.zeros(3, dtype=np.float32).tobytes())
+
+    # No in-memory tier, every lookup reads the memory-mapped file
+    reloaded = EmbeddingCache(str(tmp_path), max_items=0)
+    assert reloaded.get("stub-model", ["a"])[0].tolist() == [1.0, 1.0, 0.5]
+    reloaded.put("stub-model", ["b"], [[2.0, 1.0, 0.5]])
+    assert [vector.tolist() for vector in reloaded.get("stub-model", ["a", "b"])] == [[1.0, 1.0, 0.5], [2.0, 1.0, 0.5]]
@@ -0,0 +1,42 @@
+from rufus.core.extraction import chunk_text, extract_text, process_page
+
+HTML = """<html lang="en">
+<head><title>Mango  Facts</title><meta name="description" content="All about mangoes"><style>p {}</style></head>
+<body>
+    <nav><a href="/menu">Menu</a></nav>
+    <p>Mangoes are <b>juicy</b> fruits.</p>
+    <script>var tracking = 1;</script>
+    <a href="varieties.html">Mango   varieties</a>
+    <footer>Copyright</footer>
+</body>
+</html>"""
+
+def test_process_page_single_pass():
+    page = process_page(HTML, "https://example.com/fruits/mango")
+
+    assert page["text"] == "Mango Facts Mangoes are juicy fruits. Mango varieties"
+    # Links inside removed boilerplate (nav) are still followed
+    assert page["links"] == [
+        {"url": "https://example.com/menu", "text": "Menu", "context": ""},
+        {"url": "https://example.com/fruits/varieties.html", "text": "Mango varieties", "context": ""},
+    ]
+    assert page["metadata"]["title"] == "Mango Facts"
+    assert page["metadata"]["description"] == "All about mangoes"
+    assert page["metadata"]["language"] == "en"
+
+def test_link_context():
+    page = process_page('<ul><li>Learn about <b><a href="/a">tropical</a></b> fruit</li></ul><div><a href="/b">b</a></div>', "https://example.com/")
+
+    assert [link["context"] for link in page["links"]] == ["Learn about tropical fruit", ""]
+
+def test_extract_text_handles_empty_and_declared_documents():
+    assert extract_text("") == ""
+    assert extract_text('<?xml version="1.0" encoding="utf-8"?><p>hello</p>') == "hello"
+
+def test_chunk_text_overlapping_passages():
+    text = " ".join(f"w{i}" for i in range(10))
+    passages = chunk_text(text, "https://example.com", max_tokens=4, overlap=1)
+
+    assert [p["text"] for p in passages] == ["w0 w1 w2 w3", "w3 w4 w5 w6", "w6 w7 w8 w9"]
+    assert all(text[p["start"]:p["end"]] == p["text"] and p["url"] == "https://example.com" for p in passages)
+    assert chunk_text("", max_tokens=4, overlap=1) == []
@@ -0,0 +1,123 @@
+import gzip
+import logging
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from rufus.core.crawler import Crawler
+from rufus.core.filters import LinkFilter
+from rufus.core.robots import parse_sitemap
+
+def test_link_filter_scope_and_patterns():
+    link_filter = LinkFilter(["https://www.example.com/"], scope="subdomains", exclude=[r"/login"])
+    assert link_filter.allows("https://example.com/docs")
+    assert link_filter.allows("http://blog.example.com/post")
+    assert not link_filter.allows("https://other.com/")
+    assert not link_filter.allows("https://notexample.com/")
+    assert not link_filter.allows("mailto:team@example.com")
+    assert not link_filter.allows("javascript:void(0)")
+    assert not link_filter.allows("https://example.com/report.PDF")
+    assert not link_filter.allows("https://example.com/login?next=/")
+
+    host_only = LinkFilter(["https://example.com/"], scope="host", include=[r"/docs/"])
+    assert host_only.allows("https://example.com/docs/intro")
+    assert not host_only.allows("https://example.com/blog/")
+    assert not host_only.allows("https://blog.example.com/docs/intro")
+
+def test_link_filter_rejects_invalid_scope():
+    with pytest.raises(ValueError):
+        LinkFilter(scope="domain")
+
+def test_parse_sitemap_index_and_gzip():
+    index = b"""<?xml version="1.0"?>
+    <sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+      <sitemap><loc>https://example.com/pages.xml.gz</loc></sitemap>
+    </sitemapindex>"""
+    assert parse_sitemap(index) == ([], ["https://example.com/pages.xml.gz"])
+
+    pages = gzip.compress(b"""<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+      <url><loc>/a</loc></url><url><loc> https://example.com/b </loc></url>
+    </urlset>""")
+    assert parse_sitemap(pages, base_url="https://example.com/pages.xml.gz") == (["https://example.com/a", "https://example.com/b"], [])
+    assert parse_sitemap(b"not xml") == ([], [])
+
+@pytest.mark.asyncio
+async def test_crawl_filters_links(local_site):
+    async def image(request):
+        return web.Response(body=b"\x89PNG", content_type="image/png")
+
+    pages = {
+        "/": (
+            '<a href="/page">page</a><a href="/private/secret">secret</a><a href="/photo">photo</a>'
+            '<a href="/file.zip">zip</a><a href="mailto:a@b.c">mail</a><a href="http://localhost:1/elsewhere">off-site</a>'
+        ),
+        "/page": "<p>page</p>",
+        "/private/secret": "<p>secret</p>",
+        "/photo": image,
+        "/robots.txt": lambda request: _text("User-agent: *\nDisallow: /private/\n"),
+    }
+    async with local_site(pages) as site:
+        crawler = Crawler(max_depth=1, delay=0, log_file=None, link_scope="host", respect_robots=True)
+        async with aiohttp.ClientSession() as session:
+            data = await crawler._crawl([site.url + "/"], session=session)
+            # robots.txt is cached across crawls
+            await crawler._crawl([site.url + "/"], session=session)
+
+    assert len(data) == 2  # The index and /page, the image is fetched but its body is skipped
+    assert site.hits["/robots.txt"] == 1
+    assert "/private/secret" not in site.hits
+    assert "/file.zip" not in site.hits
+
+@pytest.mark.asyncio
+async def test_crawl_seeds_from_sitemap(local_site):
+    pages = {
+        "/": "<p>home</p>",
+        "/robots.txt": lambda request: _text(f"Sitemap: {request.url.origin()}/index.xml\n"),
+        "/index.xml": lambda request: _xml(
+            f'<sitemapindex><sitemap><loc>{request.url.origin()}/pages.xml</loc></sitemap></sitemapindex>'
+        ),
+        "/pages.xml": lambda request: _xml("<urlset><url><loc>/orphan</loc></url><url><loc>/external.pdf</loc></url></urlset>"),
+        "/orphan": "<p>orphan page</p>",
+    }
+    async with local_site(pages) as site:
+        crawler = Crawler(max_depth=1, delay=0, log_file=None, respect_robots=True, use_sitemaps=True)
+        async with aiohttp.ClientSession() as session:
+            data = await crawler._crawl([site.url + "/"], session=session)
+
+    assert sorted(data) == ["home", "orphan page"]
+
+@pytest.mark.asyncio
+async def test_crawl_without_robots_or_sitemap(local_site, caplog):
+    async with local_site({"/": '<p>home</p><a href="/page">page</a>', "/page": "<p>page</p>"}) as site:
+        crawler = Crawler(max_depth=1, delay=0, log_file=None, respect_robots=True, use_sitemaps=True)
+        async with aiohttp.ClientSession() as session:
+            with caplog.at_level(logging.DEBUG, logger="RUFUSLogger"):
+                data = await crawler._crawl([site.url + "/"], session=session)
+
+    # A missing robots.txt allows everything and a missing sitemap seeds nothing, neither is an error
+    assert sorted(data) == ["home page", "page"]
+    assert site.hits["/robots.txt"] == 1
+    assert not [record for record in caplog.records if record.levelno >= logging.ERROR]
+    assert any("robots.txt failed with status 404" in record.getMessage() for record in caplog.records)
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status", [401, 403])
+async def test_crawl_skips_sites_denying_robots(local_site, status):
+    async def denied(request):
+        return web.Response(status=status)
+
+    async with local_site({"/": '<p>home</p><a href="/page">page</a>', "/page": "<p>page</p>", "/robots.txt": denied}) as site:
+        crawler = Crawler(max_depth=1, delay=0, log_file=None, respect_robots=True)
+        async with aiohttp.ClientSession() as session:
+            data = await crawler._crawl([site.url + "/"], session=session)
+
+    # Access to robots.txt itself is denied, so nothing on the site may be crawled
+    assert data == []
+    assert set(site.hits) == {"/robots.txt"}
+
+async def _text(text):
+    return web.Response(text=text)
+
+async def _xml(text):
+    return web.Response(text=text, content_type="application/xml")
@@ -0,0 +1,46 @@
+import aiohttp
+import pytest
+
+from rufus.core.crawler import Crawler
+from rufus.core.focus import LinkScorer, tokenize
+
+def test_tokenize_drops_stopwords_and_plurals():
+    assert tokenize("What are the best Mango recipes?") == ["best", "mango", "recipe"]
+
+def test_link_scorer_prefers_relevant_evidence():
+    scorer = LinkScorer("mango chutney recipes")
+    relevant = scorer.score_link({"url": "http://a.com/recipes/mango-chutney", "text": "Mango chutney", "context": ""})
+    by_context = scorer.score_link({"url": "http://a.com/p/17", "text": "read more", "context": "Our mango chutney recipe"})
+    unrelated = scorer.score_link({"url": "http://a.com/about", "text": "About us", "context": ""})
+    assert relevant > by_context > unrelated == 0
+    # Links inherit part of the relevance of the page they were found on
+    assert scorer.score_link({"url": "http://a.com/about", "text": "About us"}, page_score=1.0) > 0
+
+def _large_site(sections=30):
+    pages = {"/": "<p>Welcome</p>" + "".join(f'<a href="/section{i}">Section {i}</a>' for i in range(sections))}
+    pages["/"] += '<a href="/food">Food and recipes</a>'
+    for i in range(sections):
+        pages[f"/section{i}"] = f'<p>Section {i}</p><a href="/section{i}/page">More</a>'
+        pages[f"/section{i}/page"] = "<p>Nothing to see</p>"
+    pages["/food"] = '<p>Our recipes</p><a href="/food/dessert">Desserts</a><a href="/food/mango">Mango chutney recipe</a>'
+    pages["/food/dessert"] = "<p>Cakes</p>"
+    pages["/food/mango"] = "<p>Mango chutney recipe: mangoes, sugar, vinegar</p>"
+    return pages
+
+async def _crawl(site, **kwargs):
+    crawler = Crawler(max_depth=2, delay=0, log_file=None, max_concurrency=1, max_pages=4, **kwargs)
+    async with aiohttp.ClientSession() as session:
+        pages = [page async for page in crawler.iter_pages(site.url + "/", prompt="mango chutney recipes", session=session)]
+    await crawler.close()
+    return [page["url"] for page in pages]
+
+@pytest.mark.asyncio
+async def test_focused_crawl_reaches_relevant_page_within_budget(local_site):
+    async with local_site(_large_site()) as site:
+        breadth_first = await _crawl(site)
+        site.hits.clear()
+        focused = await _crawl(site, focused=True)
+
+    assert site.url + "/food/mango" not in breadth_first
+    assert focused == [site.url + "/", site.url + "/food", site.url + "/food/mango", site.url + "/food/dessert"]
+    assert sum(site.hits.values()) == 4 + 1  # Pages within the budget, plus the liveness check of the start URL
@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+
+import rufus.llms.method as llm_method
+import rufus.search_engines.method as search_method
+from rufus.llms import agenerate_search_query, generate_search_query
+from rufus.search_engines import aget_search_results
+from rufus.llms.base_handler import LLMHandler
+from rufus.registry import ProviderRegistry
+from rufus.search_engines.base_handler import SearchEngineHandler
+from rufus.utils import TTLCache
+
+class CountingLLM(LLMHandler):
+    instances = 0
+    config_keys = ("llm_api_key", "llm_name")
+
+    @classmethod
+    def from_config(cls, **kwargs):
+        return cls(kwargs.get("llm_api_key"), kwargs.get("llm_name"))
+
+    def __init__(self, api_key, model_name):
+        CountingLLM.instances += 1
+        self.prompts = []
+
+    def generate_text(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return "mango names"
+
+class BlockingSearch(SearchEngineHandler):
+    def __init__(self):
+        self.calls = 0
+        self.thread = None
+
+    def get_search_results(self, query, num_results=10):
+        self.calls += 1
+        self.thread = threading.current_thread()
+        return [f"https://example.com/{i}" for i in range(num_results)]
+
+@pytest.fixture(autouse=True)
+def fresh_handlers(monkeypatch):
+    llms = ProviderRegistry("LLM provider", "rufus.test_llms", {"google": CountingLLM})
+    search_engines = ProviderRegistry("search engine", "rufus.test_search_engines", {"google": BlockingSearch})
+    monkeypatch.setattr(llm_method, "LLM_PROVIDERS", llms)
+    monkeypatch.setattr(llm_method, "query_cache", TTLCache())
+    monkeypatch.setattr(search_method, "SEARCH_ENGINES", search_engines)
+    monkeypatch.setattr(search_method, "results_cache", TTLCache())
+    CountingLLM.instances = 0
+
+def test_llm_handler_is_reused_and_queries_cached():
+    assert generate_search_query("Mango names", "https://a.com", llm_name="flash") == "mango names"
+    assert generate_search_query("mango   NAMES", "https://a.com", llm_name="flash") == "mango names"
+    generate_search_query("mango colors", "https://a.com", llm_name="flash")
+
+    handler = llm_method.get_llm_handler(llm_name="flash")
+    assert CountingLLM.instances == 1
+    assert len(handler.prompts) == 2  # The second prompt only differs in case and spacing
+
+def test_query_cache_can_be_disabled():
+    generate_search_query("mango", "https://a.com", query_cache_ttl=0)
+    generate_search_query("mango", "https://a.com", query_cache_ttl=0)
+    assert len(llm_method.get_llm_handler().prompts) == 2
+
+@pytest.mark.asyncio
+async def test_async_search_runs_off_the_loop_and_is_cached():
+    results = await aget_search_results("mango", num_results=3)
+    again = await aget_search_results("Mango", num_results=3)
+    query = await agenerate_search_query("mango", "https://a.com")
+
+    handler = search_method.get_search_handler()
+    assert results == again == [f"https://example.com/{i}" for i in range(3)]
+    assert handler.calls == 1
+    assert handler.thread is not threading.main_thread()
+    assert query == "mango names"
+
+def test_ttl_cache_expires(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("rufus.utils.time.monotonic", lambda: now[0])
+    cache = TTLCache(ttl=10, max_items=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("c", 3)  # Evicts the least recently used entry
+    assert cache.get("a") is None and cache.get("b") == 2
+    now[0] += 11
+    assert cache.get("b") is None
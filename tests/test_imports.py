@@ -0,0 +1,40 @@
+import re
+import subprocess
+import sys
+
+# Dependencies only needed by optional providers or GPU ranking
+HEAVY_MODULES = ("torch", "google.generativeai", "googlesearch", "sentence_transformers", "hnswlib")
+
+def _python(code, *flags):
+    return subprocess.run([sys.executable, *flags, "-c", code], capture_output=True, text=True, check=True)
+
+def test_import_rufus_is_lazy():
+    output = _python("import sys, rufus; print(sorted(m for m in sys.modules if m.startswith('rufus')))").stdout
+    assert output.strip() == "['rufus']"
+
+def test_client_does_not_load_heavy_dependencies():
+    code = (
+        "import sys\n"
+        "from rufus import RufusClient\n"
+        "client = RufusClient(log_file=None, embedding_cache=':memory:')\n"
+        f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    )
+    assert _python(code).stdout.strip() == "[]"
+
+def test_client_import_time_budget():
+    """Regression guard: importing the client took over 2 s when it pulled in torch."""
+    def import_time():
+        stderr = _python("import rufus.client", "-X", "importtime").stderr
+        # Cumulative microseconds of the top-level import
+        return int(re.search(r"\|\s*(\d+) \| rufus\.client$", stderr, re.MULTILINE).group(1)) / 1e6
+
+    assert min(import_time() for _ in range(3)) < 1.0
+
+def test_hashing_reranker_does_not_load_torch():
+    code = (
+        "import sys\n"
+        "from rufus.content_rankers.method import get_reranker\n"
+        "get_reranker('local').get_embeddings(['mango lassi'])\n"
+        f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    )
+    assert _python(code).stdout.strip() == "[]"
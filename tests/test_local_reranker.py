@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from rufus.content_rankers.local_text_embedding_reranker import LocalTextEmbeddingReranker, hashing_embeddings
+from rufus.content_rankers.method import arank_content, get_reranker
+
+def test_hashing_embeddings_are_normalized_and_deterministic():
+    embeddings = hashing_embeddings(["mango lassi recipe", "mango lassi recipe", ""], dim=64)
+
+    assert embeddings.shape == (3, 64) and embeddings.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(embeddings[:2], axis=1), 1, rtol=1e-6)
+    np.testing.assert_array_equal(embeddings[0], embeddings[1])
+    assert not embeddings[2].any()
+
+def test_local_reranker_is_loaded_once():
+    reranker = get_reranker("local", embd_dim=256)
+
+    assert isinstance(reranker, LocalTextEmbeddingReranker)
+    assert reranker.is_local_hosted and reranker.device == "cpu"
+    assert reranker.model_name == "hashing-256"
+    assert get_reranker("local", embd_dim=256) is reranker
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("similarity_metric", ["cosine", "euclidean"])
+async def test_rank_content_offline(similarity_metric):
+    candidates = ["apple pie with cinnamon", "how to make a mango lassi at home", "stock market news"]
+
+    ranked = await arank_content("mango lassi", candidates, embd_model_provider="local", similarity_metric=similarity_metric)
+
+    assert ranked[0][0] == "how to make a mango lassi at home"
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from rufus.content_rankers.method import aggregate_scores, arank_content, arank_passages, top_k_indices
+
+CANDIDATES = ["apple pie", "mango lassi", "mango and apple", "mango mango"]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("similarity_metric", ["cosine", "euclidean"])
+async def test_prompt_is_embedded_once(similarity_metric, stub_reranker):
+    reranker = stub_reranker()
+
+    ranked = await arank_content(ref_txt="mango", candidate_txt=CANDIDATES, reranker=reranker, similarity_metric=similarity_metric)
+
+    assert reranker.embedded.count("mango") == 1
+    assert len(ranked) == len(CANDIDATES)
+    assert ranked[0][0] == "mango lassi"
+    assert ranked[-1][0] == "apple pie"
+    scores = [score for _, score in ranked]
+    assert scores == sorted(scores, reverse=True)
+
+@pytest.mark.asyncio
+async def test_replicated_prompt_and_multiple_queries(stub_reranker):
+    reranker = stub_reranker()
+
+    ranked = await arank_content(ref_txt=["mango"] * len(CANDIDATES), candidate_txt=CANDIDATES, reranker=reranker, top_k=2)
+    assert reranker.embedded.count("mango") == 1
+    assert [doc for doc, _ in ranked] == ["mango lassi", "mango mango"]
+
+    # With several queries a candidate keeps its best score
+    ranked = await arank_content(ref_txt=["mango", "apple"], candidate_txt=CANDIDATES, reranker=reranker)
+    assert {doc for doc, _ in ranked[:3]} == {"apple pie", "mango lassi", "mango mango"}
+
+def test_top_k_indices():
+    scores = np.array([0.1, 0.9, 0.5, 0.7, 0.3])
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 2]
+    assert top_k_indices(scores).tolist() == [1, 3, 2, 4, 0]
+
+def test_aggregate_scores():
+    scores = np.array([0.2, 0.8, np.nan, 0.5, np.nan])
+    doc_ids = np.array([0, 0, 1, 2, 3])
+
+    np.testing.assert_allclose(aggregate_scores(scores, doc_ids, 4, "max"), [0.8, np.nan, 0.5, np.nan])
+    np.testing.assert_allclose(aggregate_scores(scores, doc_ids, 4, "mean"), [0.5, np.nan, 0.5, np.nan])
+
+@pytest.mark.asyncio
+async def test_rank_documents_by_best_passage(stub_reranker):
+    reranker = stub_reranker()
+    passages = [
+        [{"text": "apple pie"}, {"text": "apple tart"}],
+        [{"text": "apple crumble"}, {"text": "mango lassi"}],  # One relevant passage in a long document
+    ]
+
+    ranked = await arank_passages("mango", passages, reranker=reranker, top_passages=1)
+
+    assert [doc for doc, _, _ in ranked] == [1, 0]
+    assert ranked[0][2][0][0] == {"text": "mango lassi"}
+    assert ranked[0][1] == ranked[0][2][0][1]
@@ -0,0 +1,87 @@
+import subprocess
+import sys
+from importlib.metadata import EntryPoint
+
+import pytest
+
+import rufus.registry
+from rufus import RufusClient
+from rufus.content_rankers.vector_index import ExactIndex
+from rufus.llms.method import generate_search_query
+from rufus.registry import ProviderRegistry
+from rufus.search_engines.base_handler import SearchEngineHandler
+from rufus.search_engines.method import get_search_results
+from rufus.search_engines.offline_search_handler import OfflineSearchHandler
+
+class StaticSearch(SearchEngineHandler):
+    def get_search_results(self, query, num_results=10):
+        return ["https://example.com"]
+
+def test_providers_are_imported_on_first_use():
+    code = "import sys, rufus; from rufus.llms.method import LLM_PROVIDERS; print('google.generativeai' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.strip() == "False"
+
+def test_register_and_entry_points(monkeypatch):
+    registry = ProviderRegistry("search engine", "rufus.search_engines")
+    registry.register("static")(StaticSearch)
+    entry_point = EntryPoint("plugin", "tests.test_registry:StaticSearch", "rufus.search_engines")
+    monkeypatch.setattr(rufus.registry, "entry_points", lambda group: [entry_point] if group == "rufus.search_engines" else [])
+
+    assert registry.names() == ["plugin", "static"]
+    assert registry.get("plugin").__name__ == "StaticSearch"
+    assert registry.create("static") is registry.create("static")
+    with pytest.raises(ValueError, match="Unsupported search engine: bing"):
+        registry.get("bing")
+
+def test_template_query_generator():
+    assert generate_search_query("Mango  names?", "https://en.wikipedia.org/wiki/Mango", llm_provider="template") == "Mango names? site:en.wikipedia.org"
+    assert generate_search_query("mango names", "not a url", llm_provider="template", query_template="{prompt} {domain} wiki") == "mango names wiki"
+
+def test_template_queries_are_cached_per_template():
+    url = "https://en.wikipedia.org/wiki/Mango"
+    assert generate_search_query("mango colors", url, llm_provider="template") == "mango colors site:en.wikipedia.org"
+    assert generate_search_query("mango colors", url, llm_provider="template", query_template="{prompt} wiki") == "mango colors wiki"
+
+def test_offline_search_over_crawled_pages(tmp_path):
+    index = ExactIndex()
+    index.add([[1.0, 0.0]] * 3, [
+        {"url": "https://a.com/mango", "text": "mango lassi and mango chutney recipes"},
+        {"url": "https://a.com/apple", "text": "apple pie recipe"},
+        {"url": "https://a.com/news", "text": "market news"},
+    ])
+    index.save(tmp_path)
+
+    results = get_search_results("mango recipe", search_engine="offline", offline_search_index=str(tmp_path), search_cache_ttl=0)
+    assert results == ["https://a.com/mango", "https://a.com/apple"]
+
+def test_offline_search_sees_reindexed_pages():
+    index = ExactIndex()
+    index.add([[1.0, 0.0]] * 2, [{"url": "https://a.com/1", "text": "mango lassi"}, {"url": "https://a.com/2", "text": "apple pie"}])
+    handler = OfflineSearchHandler(index)
+    assert handler.get_search_results("mango") == ["https://a.com/1"]
+
+    # Same number of documents, changed texts
+    index.add([[1.0, 0.0]] * 2, [{"url": "https://a.com/1", "text": "stock market"}, {"url": "https://a.com/2", "text": "mango tart"}])
+    assert handler.get_search_results("mango") == ["https://a.com/2"]
+
+@pytest.mark.asyncio
+async def test_fully_offline_crawl(local_site, tmp_path):
+    pages = {
+        "/": '<p>fruit index</p><a href="/mango">mango</a>',
+        "/mango": "<p>mango lassi recipe</p>",
+    }
+    options = {
+        "llm_provider": "template",
+        "search_engine": "offline",
+        "embd_model_provider": "local",
+        "vector_index": str(tmp_path / "index"),
+        "search_cache_ttl": 0,
+    }
+    async with local_site(pages) as site:
+        client = RufusClient(max_depth=1, delay=0, log_file=None, **options)
+        await client.start(site.url + "/", "fruit", **options)
+        # An unreachable start URL falls back to generating a query and searching the crawled pages
+        result = await client.start("https://unreachable.invalid/", "mango lassi", max_depth=0, **options)
+        await client.aclose()
+
+    assert result["results"][0]["doc"] == "mango lassi recipe"
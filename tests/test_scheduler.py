@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from rufus.core.crawler import Crawler
+from rufus.core.scheduler import HostScheduler, TokenBucket
+from rufus.utils import backoff_delay, parse_retry_after, persistent_request
+
+def test_token_bucket_reservations():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)  # Burst used up, next token in 1/rate seconds
+
+def test_backoff_and_retry_after():
+    assert all(0 <= backoff_delay(attempt, base=1.0, max_delay=5.0) <= min(5.0, 2 ** (attempt - 1)) for attempt in range(1, 8))
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0  # Dates in the past mean "retry now"
+    assert parse_retry_after("soon") is None
+
+@pytest.mark.asyncio
+async def test_scheduler_rate_limits_per_host():
+    scheduler = HostScheduler(requests_per_second=20, burst=1)
+
+    async def hit(url):
+        async with scheduler.slot(url):
+            return time.monotonic()
+
+    start = time.monotonic()
+    await asyncio.gather(*(hit("http://a.test/") for _ in range(4)), *(hit("http://b.test/") for _ in range(1)))
+    # Four requests to one host at 20 rps need ~0.15s, the other host is not held back
+    assert time.monotonic() - start >= 0.14
+
+@pytest.mark.asyncio
+async def test_persistent_request_honors_retry_after(local_site):
+    calls = []
+
+    async def flaky(request):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            return web.Response(status=429, headers={"Retry-After": "1"})
+        return web.Response(text="ok")
+
+    async with local_site({"/flaky": flaky, "/missing": None}) as site:
+        scheduler = HostScheduler()
+        async with aiohttp.ClientSession() as session:
+            text = await persistent_request(site.url + "/flaky", session=session, delay=0, scheduler=scheduler)
+            missing = await persistent_request(site.url + "/missing", session=session, delay=0)
+
+    assert text == "ok"
+    assert calls[1] - calls[0] >= 0.9
+    assert missing is None
+    assert site.hits["/missing"] == 1  # 404 is not retried
+
+def test_scheduler_reused_across_event_loops():
+    scheduler = HostScheduler(max_per_host=1, max_total=1)
+
+    async def hit(url):
+        async with scheduler.slot(url):
+            await asyncio.sleep(0.01)
+
+    async def contend():
+        await asyncio.gather(*(hit(url) for url in ["http://a.test/"] * 3 + ["http://b.test/"] * 3))
+
+    asyncio.run(contend())
+    asyncio.run(contend())
+
+def test_crawl_reuses_crawler_across_event_loops(local_site):
+    # RufusClient runs each scrape on a new event loop after close()
+    pages = {"/": "".join(f'<a href="/p{i}">p{i}</a>' for i in range(8))}
+    pages.update({f"/p{i}": f"<p>page {i}</p>" for i in range(8)})
+    crawler = Crawler(max_depth=1, delay=0, log_file=None, max_per_host=2, max_total_requests=1)
+
+    async def crawl():
+        async with local_site(pages) as site:
+            urls = [page["url"] async for page in crawler.iter_pages(site.url + "/", prompt="pages")]
+            await crawler.close()
+        return len(urls)
+
+    assert asyncio.run(crawl()) == 9
+    assert asyncio.run(crawl()) == 9
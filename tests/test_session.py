@@ -0,0 +1,37 @@
+import pytest
+from aiohttp import web
+
+from rufus.core.crawler import Crawler
+from rufus.core.session import SessionManager
+
+@pytest.mark.asyncio
+async def test_session_manager_reuses_session():
+    manager = SessionManager(limit=5, limit_per_host=2)
+    session = await manager.get_session()
+    assert await manager.get_session() is session
+    assert session.connector.limit == 5
+    assert session.connector.limit_per_host == 2
+
+    await manager.close()
+    assert session.closed
+    assert await manager.get_session() is not session
+    await manager.close()
+
+@pytest.mark.asyncio
+async def test_repeated_crawls_reuse_connections(local_site):
+    peers = set()
+
+    async def page(request):
+        peers.add(request.transport.get_extra_info("peername"))
+        return web.Response(text="<p>hello</p>", content_type="text/html")
+
+    async with local_site({"/": page}) as site:
+        crawler = Crawler(max_depth=0, delay=0, max_concurrency=1)
+        for _ in range(3):
+            results = await crawler.start_crawl(site.url + "/", prompt="hello", do_rank=False, structured_output=False)
+            assert results == ["hello"]
+        await crawler.close()
+
+    # Liveness checks and page fetches of every crawl share one keep-alive connection
+    assert sum(site.hits.values()) == 6
+    assert len(peers) == 1
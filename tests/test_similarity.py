@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from rufus.utils import cosine_similarity, pairwise_distance, top_k_similarity
+
+rng = np.random.default_rng(0)
+A = rng.normal(size=(3, 16))
+B = rng.normal(size=(50, 16))
+
+def _naive_cosine(a, b):
+    return (a / np.linalg.norm(a, axis=1, keepdims=True)) @ (b / np.linalg.norm(b, axis=1, keepdims=True)).T
+
+def _naive_euclidean(a, b):
+    return 1 / (1 + np.linalg.norm(a[:, None, :] - b[None, :, :], axis=-1))
+
+@pytest.mark.parametrize("func, naive", [(cosine_similarity, _naive_cosine), (pairwise_distance, _naive_euclidean)])
+@pytest.mark.parametrize("block_size", [7, 4096])
+def test_blocked_kernels_match_naive(func, naive, block_size):
+    np.testing.assert_allclose(func(A, B, block_size=block_size), naive(A, B), rtol=1e-10)
+
+    # Lists of lists, as returned by embedding APIs, are computed in float32
+    result = func(A.tolist(), B.tolist(), block_size=block_size)
+    assert result.dtype == np.float32
+    np.testing.assert_allclose(result, naive(A, B), atol=1e-3)
+
+def test_kernels_write_to_out_buffer():
+    out = np.empty((3, 50), dtype=np.float32)
+    result = cosine_similarity(A.astype(np.float32), B.astype(np.float32), block_size=8, out=out)
+    assert result is out
+    with pytest.raises(ValueError):
+        pairwise_distance(A, B, out=np.empty((2, 50)))
+
+def test_zero_vectors_and_single_vectors():
+    assert cosine_similarity(np.zeros(16), B).shape == (1, 50)
+    assert not cosine_similarity(np.zeros(16), B).any()
+
+@pytest.mark.parametrize("similarity_metric", ["cosine", "euclidean"])
+def test_top_k_similarity(similarity_metric):
+    indices, scores = top_k_similarity(A, B, 5, similarity_metric=similarity_metric, block_size=8)
+    full = _naive_cosine(A, B) if similarity_metric == "cosine" else _naive_euclidean(A, B)
+
+    np.testing.assert_array_equal(indices, np.argsort(-full, axis=1)[:, :5])
+    np.testing.assert_allclose(scores, np.sort(full, axis=1)[:, ::-1][:, :5], rtol=1e-10)
+    assert top_k_similarity(A, B[:2], 5)[0].shape == (3, 2)
@@ -0,0 +1,69 @@
+import pytest
+
+from rufus.core.crawler import Crawler
+from rufus.core.state import CrawlState, content_hash
+
+KEYWORDS = ("mango", "apple", "fruits")
+
+def test_crawl_state_round_trip(tmp_path):
+    state = CrawlState(str(tmp_path / "state.sqlite"), recrawl_interval=60)
+    page = {"url": "http://a.com/", "text": "hello", "links": [], "metadata": {}}
+    state.put("http://A.com/#top", content_hash(b"<p>hello</p>"), page)
+
+    record = state.get("http://a.com/")
+    assert record["page"] == page
+    assert record["content_hash"] == content_hash(b"<p>hello</p>")
+    assert state.is_fresh(record)
+    assert state.get("http://a.com/other") is None
+    state.close()
+
+async def _crawl(site, path, reranker, **kwargs):
+    crawler = Crawler(max_depth=1, delay=0, log_file=None, crawl_state=path, **kwargs)
+    pages = [page async for page in crawler.iter_pages(site.url + "/", prompt="mango")]
+    result = await crawler.start_crawl(site.url + "/", prompt="mango", reranker=reranker)
+    await crawler.close()
+    return {page["url"]: page["changed"] for page in pages}, result
+
+@pytest.mark.asyncio
+async def test_crawl_incremental_recrawl(local_site, tmp_path, stub_reranker):
+    path = str(tmp_path / "state.sqlite")
+    pages = {
+        "/": '<p>fruits</p><a href="/mango">mango</a><a href="/apple">apple</a>',
+        "/mango": "<p>mango</p>",
+        "/apple": "<p>apple</p>",
+    }
+    async with local_site(pages) as site:
+        first, _ = await _crawl(site, path, stub_reranker(KEYWORDS))
+        assert all(first.values())
+
+        pages["/apple"] = "<p>apple mango</p>"
+        reranker = stub_reranker(KEYWORDS)
+        second, result = await _crawl(site, path, reranker)
+
+    assert second == {site.url + "/": False, site.url + "/mango": False, site.url + "/apple": True}
+    assert reranker.embedded == ["apple mango"]  # Only the changed page is embedded again
+    assert [doc["doc"] for doc in result["results"]] == ["mango", "apple mango", "fruits mango apple"]
+
+@pytest.mark.asyncio
+async def test_crawl_reuses_fresh_pages_without_fetching(local_site, tmp_path, stub_reranker):
+    path = str(tmp_path / "state.sqlite")
+    async with local_site({"/": '<p>home</p><a href="/a">a</a>', "/a": "<p>a</p>"}) as site:
+        await _crawl(site, path, stub_reranker(KEYWORDS), recrawl_interval=3600)
+        site.hits.clear()
+        second, result = await _crawl(site, path, stub_reranker(KEYWORDS), recrawl_interval=3600)
+
+    assert second == {site.url + "/": False, site.url + "/a": False}
+    assert set(site.hits) == {"/"}  # Only the liveness checks of the start URL
+    assert len(result["results"]) == 2
+
+@pytest.mark.asyncio
+async def test_crawl_state_reopened_after_close(local_site, tmp_path):
+    crawler = Crawler(max_depth=1, delay=0, log_file=None, crawl_state=str(tmp_path / "state.sqlite"))
+    async with local_site({"/": '<p>home</p><a href="/a">a</a>', "/a": "<p>a</p>"}) as site:
+        runs = []
+        for _ in range(2):
+            runs.append({page["url"]: page["changed"] async for page in crawler.iter_pages(site.url + "/", prompt="mango")})
+            await crawler.close()
+
+    assert runs[0] == {site.url + "/": True, site.url + "/a": True}
+    assert runs[1] == {site.url + "/": False, site.url + "/a": False}
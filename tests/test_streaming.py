@@ -0,0 +1,80 @@
+import asyncio
+import threading
+
+import pytest
+from aiohttp import web
+
+from rufus import RufusClient
+
+def _site_with_slow_tail(release):
+    async def slow_page(request):
+        await release.wait()
+        return web.Response(text="<p>slow apple</p>", content_type="text/html")
+
+    return {
+        "/": '<p>mango index</p><a href="/fast">fast</a><a href="/slow">slow</a>',
+        "/fast": "<p>fast mango</p>",
+        "/slow": slow_page,
+    }
+
+@pytest.mark.asyncio
+async def test_astream_yields_before_slow_pages_finish(local_site):
+    release = asyncio.Event()
+    async with local_site(_site_with_slow_tail(release)) as site:
+        client = RufusClient(max_depth=1, delay=0, log_file=None)
+        seen = []
+        try:
+            async for doc in client.astream(site.url + "/", prompt="mango"):
+                seen.append(doc)
+                if len(seen) == 2:
+                    # The slow page is still pending while the first documents arrive
+                    assert {doc["url"] for doc in seen} == {site.url + "/", site.url + "/fast"}
+                    release.set()
+        finally:
+            release.set()
+            await client.aclose()
+
+    assert {doc["url"] for doc in seen} == {site.url + path for path in ("/", "/fast", "/slow")}
+    assert {doc["depth"] for doc in seen} == {0, 1}
+
+@pytest.mark.asyncio
+async def test_astream_incremental_ranking(local_site, stub_reranker):
+    release = asyncio.Event()
+    release.set()
+    reranker = stub_reranker()
+    async with local_site(_site_with_slow_tail(release)) as site:
+        client = RufusClient(max_depth=1, delay=0, log_file=None)
+        docs = [doc async for doc in client.astream(site.url + "/", prompt="mango", do_rank=True, rank_batch_size=1, reranker=reranker)]
+        await client.aclose()
+
+    assert reranker.embedded.count("mango") == 1  # The prompt is embedded once per stream
+    scores = {doc["text"]: doc["rank_score"] for doc in docs}
+    assert scores["fast mango"] > scores["slow apple"]
+
+def test_iter_results_sync(local_site):
+    ready = threading.Event()
+    state = {}
+
+    def serve():
+        async def main():
+            release = asyncio.Event()
+            release.set()
+            async with local_site(_site_with_slow_tail(release)) as site:
+                state["url"] = site.url
+                state["stop"] = asyncio.Event()
+                state["loop"] = asyncio.get_running_loop()
+                ready.set()
+                await state["stop"].wait()
+        asyncio.run(main())
+
+    server = threading.Thread(target=serve)
+    server.start()
+    ready.wait()
+    try:
+        with RufusClient(max_depth=1, delay=0, log_file=None) as client:
+            docs = list(client.iter_results(state["url"] + "/", prompt="mango"))
+    finally:
+        state["loop"].call_soon_threadsafe(state["stop"].set)
+        server.join()
+
+    assert sorted(doc["depth"] for doc in docs) == [0, 1, 1]
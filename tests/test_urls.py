@@ -0,0 +1,50 @@
+import aiohttp
+import pytest
+
+from rufus.core.crawler import Crawler
+from rufus.core.seen import make_seen_set
+from rufus.core.urls import canonicalize_url
+
+def test_canonicalize_url_variants():
+    variants = [
+        "https://a.com/x",
+        "https://a.com/x#top",
+        "https://a.com/x/",
+        "HTTPS://A.com:443/x",
+        "https://a.com/x?utm_source=news&fbclid=123",
+    ]
+    assert {canonicalize_url(url) for url in variants} == {"https://a.com/x"}
+    assert canonicalize_url("http://a.com") == "http://a.com/"
+    assert canonicalize_url("http://a.com:8080/?b=2&a=1") == "http://a.com:8080/?a=1&b=2"
+    assert canonicalize_url("https://a.com/x/?id=1", drop_params=(), strip_trailing_slash=False) == "https://a.com/x/?id=1"
+
+@pytest.mark.parametrize("backend", ["memory", "fingerprint", "bloom"])
+def test_seen_set_backends(backend):
+    seen = make_seen_set(backend) if backend != "bloom" else make_seen_set(backend, capacity=1000)
+    urls = [f"https://a.com/page/{i}" for i in range(5000)]
+
+    max_false_positives = 10 if backend == "bloom" else 0
+
+    added = sum(seen.add(url) for url in urls)
+    assert added >= len(urls) - max_false_positives
+    assert len(seen) == added
+    assert not any(seen.add(url) for url in urls)  # No false negatives, every URL is remembered
+    assert sum(f"https://b.com/page/{i}" in seen for i in range(5000)) <= max_false_positives
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "fingerprint", "bloom"])
+async def test_crawl_deduplicates_url_variants(local_site, backend):
+    pages = {
+        "/": '<a href="/x">x</a><a href="/x#top">x</a><a href="/x/">x</a><a href="/x?utm_campaign=a">x</a>',
+        "/x": "<p>x</p>",
+        "/x/": "<p>x</p>",
+    }
+    async with local_site(pages) as site:
+        crawler = Crawler(max_depth=1, delay=0, seen_backend=backend)
+        async with aiohttp.ClientSession() as session:
+            for _ in range(2):
+                # Every crawl starts with an empty seen-set
+                assert len(await crawler._crawl([site.url + "/"], session=session)) == 2
+                assert len(crawler.url_tracker) == 2
+
+    assert sum(site.hits.values()) == 4
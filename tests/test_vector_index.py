@@ -0,0 +1,102 @@
+import sys
+
+import numpy as np
+import pytest
+
+from rufus import RufusClient
+from rufus.content_rankers.vector_index import ExactIndex, IVFIndex, load_vector_index, make_vector_index
+
+def _corpus(n=2000, dim=32, topics=40, seed=0):
+    """Embeddings grouped around a number of topics, like documents of a crawl."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(topics, dim))
+    embeddings = (centers[rng.integers(topics, size=n)] + 0.5 * rng.normal(size=(n, dim))).astype(np.float32)
+    documents = [{"url": f"https://example.com/{i}", "text": f"document {i}"} for i in range(n)]
+    return embeddings, documents
+
+@pytest.mark.parametrize("metric", ["cosine", "euclidean"])
+def test_exact_index_matches_brute_force(metric):
+    embeddings, documents = _corpus(500)
+    index = ExactIndex(metric=metric, block_size=64)
+    index.add(embeddings, documents)
+
+    results = index.search(embeddings[7], top_k=5)
+
+    assert results[0][0]["url"] == "https://example.com/7"
+    assert results[0][1] == pytest.approx(1.0, abs=1e-2)  # float32 rounding of the squared distance identity
+    assert [score for _, score in results] == sorted((score for _, score in results), reverse=True)
+
+def test_ivf_index_recall():
+    embeddings, documents = _corpus()
+    exact, ivf = ExactIndex(), IVFIndex(nprobe=8)
+    exact.add(embeddings, documents)
+    ivf.add(embeddings, documents)
+    queries = embeddings[:50] + 0.2 * np.random.default_rng(1).normal(size=(50, 32)).astype(np.float32)
+
+    hits = 0
+    for query in queries:
+        expected = {doc["url"] for doc, _ in exact.search(query, top_k=10)}
+        hits += len(expected & {doc["url"] for doc, _ in ivf.search(query, top_k=10)})
+    assert hits / 500 > 0.9
+
+def test_ivf_index_returns_top_k_documents():
+    embeddings, documents = _corpus()
+    ivf = IVFIndex(nprobe=2)
+    ivf.add(embeddings, documents)
+
+    assert len(ivf.search(embeddings[0], top_k=None)) == 2000  # Ranking every document, as start_crawl does
+    assert len(ivf.search(embeddings[0], top_k=500)) == 500  # More than the probed clusters hold
+    assert len(ivf.search(embeddings[0], top_k=10)) == 10
+
+@pytest.mark.parametrize("index_type", ["exact", "ivf"])
+def test_index_persists_and_updates(tmp_path, index_type):
+    embeddings, documents = _corpus(1200)
+    index = make_vector_index(index_type, model_name="test", min_train_size=100)
+    index.add(embeddings, documents)
+    index.search(embeddings[0])
+    index.save(tmp_path)
+
+    loaded = load_vector_index(tmp_path)
+    assert type(loaded) is type(index) and len(loaded) == 1200 and loaded.model_name == "test"
+    assert loaded.search(embeddings[3], top_k=1)[0][0]["url"] == "https://example.com/3"
+
+    # Re-adding a page with new text replaces its vector instead of duplicating it
+    loaded.add(embeddings[3:4], [{"url": "https://example.com/5", "text": "changed"}])
+    assert len(loaded) == 1200
+    assert loaded.search(embeddings[3], top_k=2)[1][0] == {"url": "https://example.com/5", "text": "changed"}
+
+def test_hnsw_falls_back_without_hnswlib(monkeypatch):
+    monkeypatch.setitem(sys.modules, "hnswlib", None)  # Makes the optional import fail
+    assert isinstance(make_vector_index("hnsw"), IVFIndex)
+
+@pytest.mark.asyncio
+async def test_crawl_once_query_many(local_site, tmp_path):
+    pages = {
+        "/": '<p>mango lassi recipe</p><a href="/apple">apple</a><a href="/news">news</a>',
+        "/apple": "<p>apple pie with cinnamon</p>",
+        "/news": "<p>stock market news today</p>",
+    }
+    options = {"embd_model_provider": "local", "vector_index": str(tmp_path / "index")}
+    async with local_site(pages) as site:
+        client = RufusClient(max_depth=1, delay=0, log_file=None, **options)
+        await client.start(site.url + "/", "mango lassi", **options)
+        await client.aclose()
+
+    # A new client answers later prompts from the saved index, without crawling
+    client = RufusClient(log_file=None, **options)
+    result = await client.aquery("apple pie", top_k=1, **options)
+    assert [r["url"] for r in result["results"]] == [site.url + "/apple"]
+
+@pytest.mark.asyncio
+async def test_crawl_ranks_only_its_own_documents(local_site, tmp_path):
+    options = {"embd_model_provider": "local", "vector_index": str(tmp_path / "index")}
+    client = RufusClient(max_depth=0, delay=0, log_file=None, **options)
+    async with local_site({"/": "<p>mango orchard in india</p>"}) as site:
+        await client.start(site.url + "/", "mango", **options)
+    async with local_site({"/": "<p>stock market report</p>"}) as site:
+        result = await client.start(site.url + "/", "stock market", **options)
+    await client.aclose()
+
+    # The mango page stays in the index for query_index but is not part of the second crawl
+    assert [r["doc"] for r in result["results"]] == ["stock market report"]
+    assert len(client.crawler.vector_index) == 2